@@ -0,0 +1,40 @@
+import numpy as np
+
+# Во сколько раз растёт буфер при нехватке места: амортизированно O(1) на добавленный элемент
+GROWTH_FACTOR = 2
+MIN_CAPACITY = 1024
+
+
+def replace_tail(array, start, values):
+    """
+    /**
+     * Возвращает массив array[:start] + values (по первой оси), по возможности без копирования префикса.
+     * Если array – префикс собственного буфера с запасом места, values дописываются в буфер на место
+     * хвоста, и возвращается новый срез того же буфера; иначе выделяется буфер с запасом GROWTH_FACTOR.
+     * Так дописывание в конец и замена короткого хвоста стоят пропорционально len(values).
+     * Внимание: элементы array с позиции start перезаписываются – прежний массив после вызова
+     * можно использовать только в пределах [0, start).
+     * @param array Исходный массив (numpy, по первой оси).
+     * @param start Сколько элементов array сохраняется.
+     * @param values Новый хвост.
+     * @return Массив длины start + len(values).
+     */
+    """
+    values = np.asarray(values, dtype=array.dtype)
+    length = start + len(values)
+    buffer = array.base
+    if (type(buffer) is np.ndarray and buffer.dtype == array.dtype and buffer.shape[1:] == array.shape[1:]
+            and buffer.flags.writeable and buffer.flags.c_contiguous and array.flags.c_contiguous
+            and array.ctypes.data == buffer.ctypes.data and len(buffer) >= length):
+        buffer[start:length] = values
+        return buffer[:length]
+
+    buffer = np.empty((max(length * GROWTH_FACTOR, MIN_CAPACITY),) + array.shape[1:], dtype=array.dtype)
+    buffer[:start] = array[:start]
+    buffer[start:length] = values
+    return buffer[:length]
+
+
+def append(array, values):
+    """array + values с запасом места под следующие добавления (см. replace_tail)."""
+    return replace_tail(array, len(array), values)
@@ -0,0 +1,127 @@
+import numpy as np
+
+from seqParser import TYPE_UNKNOWN, parse_seq_column, parse_seq_lists
+from timeFormat import parse_epoch_ms
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow необязателен: без него читается только CSV
+    pa = None
+    pc = None
+    pq = None
+
+# Расширения файлов, которые читаются через pyarrow
+PARQUET_SUFFIXES = (".parquet", ".pq")
+IPC_SUFFIXES = (".feather", ".arrow", ".ipc")
+ARROW_SUFFIXES = PARQUET_SUFFIXES + IPC_SUFFIXES
+
+# Читаются только эти столбцы (проекция), count необязателен
+_REQUIRED_COLUMNS = ("timestamp", "seq", "type")
+_OPTIONAL_COLUMNS = ("count",)
+
+
+def is_arrow_file(file_path):
+    """Файл Parquet или Arrow IPC / Feather (по расширению)."""
+    return file_path.lower().endswith(ARROW_SUFFIXES)
+
+
+def iter_arrow_columns(file_path, batch_rows):
+    """
+    /**
+     * Потоково читает Parquet (по row group-ам) или Arrow IPC / Feather (по record batch-ам)
+     * только со столбцами timestamp, seq, type, count.
+     * @param file_path Путь к файлу.
+     * @param batch_rows Максимум строк в порции.
+     * @return Генератор (timestamps int64 epoch-мс, types int8, counts int32, seq_offsets, seq_values, fraction),
+     *         fraction – доля прочитанных строк файла.
+     */
+    """
+    if pa is None:
+        raise ImportError("Для чтения Parquet/Arrow нужен пакет pyarrow")
+
+    if file_path.lower().endswith(PARQUET_SUFFIXES):
+        parquet = pq.ParquetFile(file_path, memory_map=True)
+        columns = _project(parquet.schema_arrow.names)
+        total_rows = parquet.metadata.num_rows
+        batches = parquet.iter_batches(batch_size=batch_rows, columns=columns)
+    else:
+        source = pa.memory_map(file_path, "r")
+        try:
+            reader = pa.ipc.open_file(source)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+            total_rows = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+        except pa.ArrowInvalid:
+            # Не файловый формат IPC – потоковый (stream)
+            source.seek(0)
+            reader = pa.ipc.open_stream(source)
+            batches = iter(reader)
+            total_rows = 0
+        columns = _project(reader.schema.names)
+
+    rows_read = 0
+    for batch in batches:
+        batch = batch.select(columns)
+        # Record batch IPC может быть больше batch_rows – режем срезами без копирования
+        for offset in range(0, max(batch.num_rows, 1), batch_rows):
+            part = batch.slice(offset, batch_rows)
+            rows_read += part.num_rows
+            yield _convert_batch(part) + ((rows_read / total_rows) if total_rows else 0.0,)
+
+
+def _project(names):
+    """Проверяет наличие обязательных столбцов и возвращает список читаемых столбцов."""
+    if not set(_REQUIRED_COLUMNS).issubset(names):
+        raise ValueError("Файл не содержит столбцы: timestamp, seq, type")
+    return list(_REQUIRED_COLUMNS) + [name for name in _OPTIONAL_COLUMNS if name in names]
+
+
+def _convert_batch(batch):
+    """
+    /**
+     * Переводит record batch в массивы CaptureData без разбора строк:
+     * timestamp – timestamp-тип Arrow или целые epoch-миллисекунды, seq – list<int64> или целое.
+     * Строковые столбцы (как в CSV) разбираются тем же колоночным парсером, что и CSV.
+     * Строки без timestamp отбрасываются.
+     */
+    """
+    timestamp = batch.column("timestamp")
+    if pa.types.is_timestamp(timestamp.type):
+        timestamp = pc.cast(timestamp, pa.timestamp("ms", tz=timestamp.type.tz), safe=False)
+        timestamp_ms = pc.cast(timestamp, pa.int64())
+    else:
+        # Целые и дробные миллисекунды и строки – тем же разбором (и проверкой диапазона), что и в CSV
+        parsed, parsed_valid = parse_epoch_ms(timestamp.to_pandas())
+        timestamp_ms = pa.array(parsed, mask=~parsed_valid)
+    valid = pc.is_valid(timestamp_ms)
+    if not pc.all(valid).as_py():
+        batch = batch.filter(valid)
+        timestamp_ms = timestamp_ms.filter(valid)
+    timestamps = timestamp_ms.to_numpy(zero_copy_only=False).astype(np.int64, copy=False)
+
+    # Через float64, как в CSV: null и NaN одинаково заменяются значением по умолчанию
+    types = np.nan_to_num(_as_float(batch.column("type")), nan=TYPE_UNKNOWN).astype(np.int8)
+    if "count" in batch.schema.names:
+        counts = np.nan_to_num(_as_float(batch.column("count")), nan=1).astype(np.int32)
+    else:
+        counts = np.ones(batch.num_rows, dtype=np.int32)
+
+    seq = batch.column("seq")
+    if pa.types.is_list(seq.type) or pa.types.is_large_list(seq.type):
+        # Нативный list<int64>: длины списков и плоские значения берутся из буферов Arrow
+        lengths = pc.fill_null(pc.list_value_length(seq), 0).to_numpy().astype(np.int64)
+        values = pc.cast(pc.list_flatten(seq), pa.int64()).to_numpy(zero_copy_only=False)
+        seq_offsets, seq_values = parse_seq_lists(lengths, values, types)
+    elif pa.types.is_integer(seq.type):
+        lengths = pc.is_valid(seq).to_numpy(zero_copy_only=False).astype(np.int64)
+        values = pc.drop_null(pc.cast(seq, pa.int64())).to_numpy()
+        seq_offsets, seq_values = parse_seq_lists(lengths, values, types)
+    else:
+        seq_offsets, seq_values = parse_seq_column(seq.to_pandas(), types)
+    return timestamps, types, counts, seq_offsets, seq_values
+
+
+def _as_float(column):
+    """Столбец Arrow как float64-массив numpy (null → NaN)."""
+    return pc.cast(column, pa.float64()).to_numpy(zero_copy_only=False)
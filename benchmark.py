@@ -0,0 +1,215 @@
+"""
+Бенчмарк горячих путей без GUI (matplotlib Agg, Tk не импортируется).
+
+    python -m benchmark                              # 10k, 1M, 10M строк; сравнение с bench_baseline.json
+    python -m benchmark --sizes 10000 1000000 --update-baseline
+
+Этапы на синтетическом захвате (captureGenerator) каждого размера:
+    load_csv              – csvLoader.load_capture (потоковое чтение, индексы, пирамида);
+    parse_seq_fast        – seqParser.parse_seq_column по всему столбцу seq;
+    cache_seq_info        – SeqInfoStore.from_capture;
+    render_visible_range  – TimelineView.render + отрисовка Agg для окон по всему захвату (и растрового окна);
+    find_tooltip          – HitTester.hit и данные tooltip-а (события seq, форматирование времени).
+Для каждого этапа пишется время (лучшее из --repeat запусков) и пик памяти (tracemalloc, отдельный запуск).
+Если базового файла нет, он создаётся; иначе код возврата 1, если этап стал медленнее
+или тяжелее базы больше чем на --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from captureGenerator import SEQ_FORMATS, generate_capture
+from csvLoader import load_capture
+from seqParser import TYPE_UNKNOWN, parse_seq_column
+from seqStore import SeqInfoStore
+from timelineLayout import NORM_HEIGHT, NORM_Y
+from timeFormat import format_timestamps_ms
+from timelineView import TimelineView
+
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+DEFAULT_BASELINE = "bench_baseline.json"
+DEFAULT_THRESHOLD = 0.25
+# Разница меньше этих порогов не считается регрессией (шум таймера и аллокатора)
+MIN_SECONDS = 0.05
+MIN_BYTES = 1 << 20
+# Окна отрисовки: RENDER_WINDOWS окон по VISIBLE_COUNT seq по всему захвату и одно окно RASTER_VISIBLE_COUNT
+RENDER_WINDOWS = 5
+VISIBLE_COUNT = 200
+RASTER_VISIBLE_COUNT = 20_000
+# Точек курсора для find_tooltip
+HOVER_POINTS = 2000
+
+
+def capture_file(work_dir, rows, seed, seq_format):
+    """Путь к синтетическому захвату; файл генерируется один раз и переиспользуется между запусками."""
+    os.makedirs(work_dir, exist_ok=True)
+    file_path = os.path.join(work_dir, f"capture_{rows}_{seed}_{seq_format}.csv")
+    if not os.path.exists(file_path):
+        print(f"[DEBUG] Генерация {file_path}")
+        temp_path = file_path + ".tmp"
+        generate_capture(temp_path, rows, seed=seed, seq_format=seq_format)
+        os.replace(temp_path, file_path)
+    return file_path
+
+
+def measure(function, repeat, trace_memory=True):
+    """
+    /**
+     * Время и пик памяти вызова function().
+     * @param function Функция без аргументов.
+     * @param repeat Сколько раз замерить время (берётся лучшее).
+     * @param trace_memory Отдельный запуск под tracemalloc для пика памяти.
+     * @return (результат последнего вызова, {"seconds": ..., "peak_bytes": ...}).
+     */
+    """
+    best = None
+    result = None
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    peak = None
+    if trace_memory:
+        result = None
+        tracemalloc.start()
+        try:
+            result = function()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result, {"seconds": best, "peak_bytes": peak}
+
+
+def render_windows(view, capture, starts, visible_count):
+    """Отрисовывает окна с позициями starts (как render_visible_range) и рисует фигуру Agg."""
+    store = capture.seq_store
+    for start in starts:
+        view.render(store, capture.nack_index, capture.data, start, store.index.window(start, visible_count))
+        view.ax.figure.canvas.draw()
+
+
+def find_tooltips(view, store, points):
+    """Попадания курсора в объекты окна и данные tooltip-а для объектов norm."""
+    found = 0
+    for x, y in points:
+        kind, idx = view.hit_tester.hit(x, y)
+        if kind != "norm" or idx is None or idx >= len(view.norm_tooltip_keys):
+            continue
+        timestamps, _, _ = store.events(store.position(view.norm_tooltip_keys[idx]))
+        found += len(format_timestamps_ms(timestamps, store.timezone))
+    return found
+
+
+def run_size(file_path, repeat, trace_memory):
+    """Прогоняет все этапы на одном файле. Возвращает {этап: замер}."""
+    results = {}
+    capture, results["load_csv"] = measure(lambda: load_capture(file_path), repeat, trace_memory)
+
+    columns = pd.read_csv(file_path, usecols=["seq", "type"])
+    types = columns["type"].astype(float).fillna(TYPE_UNKNOWN).to_numpy().astype(np.int8)
+    _, results["parse_seq_fast"] = measure(lambda: parse_seq_column(columns["seq"], types), repeat, trace_memory)
+    del columns, types
+
+    _, results["cache_seq_info"] = measure(lambda: SeqInfoStore.from_capture(capture.data), repeat, trace_memory)
+
+    figure = Figure(figsize=(8, 4))
+    FigureCanvasAgg(figure)
+    view = TimelineView(figure.add_subplot(), 0.8, 0.2)
+    total = len(capture.seq_store)
+    starts = np.linspace(0, max(total - VISIBLE_COUNT, 0), RENDER_WINDOWS).astype(int).tolist()
+
+    def render_all():
+        render_windows(view, capture, starts, VISIBLE_COUNT)
+        render_windows(view, capture, [max(total - RASTER_VISIBLE_COUNT, 0) // 2], RASTER_VISIBLE_COUNT)
+    _, results["render_visible_range"] = measure(render_all, repeat, trace_memory)
+
+    render_windows(view, capture, [starts[len(starts) // 2]], VISIBLE_COUNT)
+    rng = np.random.default_rng(0)
+    points = np.column_stack((rng.uniform(0, VISIBLE_COUNT * view.pitch, HOVER_POINTS),
+                              rng.uniform(NORM_Y, NORM_Y + NORM_HEIGHT, HOVER_POINTS))).tolist()
+    _, results["find_tooltip"] = measure(
+        lambda: find_tooltips(view, capture.seq_store, points), repeat, trace_memory)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Список регрессий: строки 'размер/этап: метрика было -> стало'."""
+    regressions = []
+    for size, stages in results.items():
+        for stage, current in stages.items():
+            base = baseline.get(size, {}).get(stage)
+            if base is None:
+                continue
+            for metric, floor in (("seconds", MIN_SECONDS), ("peak_bytes", MIN_BYTES)):
+                before, after = base.get(metric), current.get(metric)
+                if before is None or after is None:
+                    continue
+                if after > before * (1 + threshold) and after - before > floor:
+                    regressions.append(f"{size}/{stage}: {metric} {before:.6g} -> {after:.6g} "
+                                       f"(+{(after / before - 1) * 100 if before else float('inf'):.0f}%)")
+    return regressions
+
+
+def format_results(results):
+    """Таблица результатов для вывода в консоль."""
+    lines = [f"{'rows':>10} {'stage':<22} {'seconds':>10} {'peak MiB':>10}"]
+    for size, stages in results.items():
+        for stage, values in stages.items():
+            peak = values["peak_bytes"]
+            peak_text = f"{peak / (1 << 20):10.1f}" if peak is not None else f"{'-':>10}"
+            lines.append(f"{size:>10} {stage:<22} {values['seconds']:10.4f} {peak_text}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmark", description="Бенчмарк загрузки, отрисовки и hover.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Размеры захвата в строках.")
+    parser.add_argument("--work-dir", default="bench_data", help="Каталог синтетических захватов.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="JSON с базовыми замерами.")
+    parser.add_argument("--update-baseline", action="store_true", help="Записать результаты как новую базу.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Допустимый рост времени и памяти (доля, по умолчанию 0.25).")
+    parser.add_argument("--repeat", type=int, default=3, help="Замеров времени на этап (берётся лучший).")
+    parser.add_argument("--no-memory", action="store_true", help="Не замерять пик памяти (без запуска под tracemalloc).")
+    parser.add_argument("--seed", type=int, default=0, help="Зерно генератора захватов.")
+    parser.add_argument("--seq-format", choices=SEQ_FORMATS, default="bracket", help="Формат столбца seq.")
+
+    args = parser.parse_args(argv)
+    results = {}
+    for rows in args.sizes:
+        file_path = capture_file(args.work_dir, rows, args.seed, args.seq_format)
+        results[str(rows)] = run_size(file_path, args.repeat, not args.no_memory)
+    print(format_results(results))
+
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, "w", encoding="utf-8") as handle:
+            json.dump({"python": platform.python_version(), "numpy": np.__version__, "results": results},
+                      handle, indent=2)
+            handle.write("\n")
+        print(f"[DEBUG] База записана в {args.baseline}")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as handle:
+        baseline = json.load(handle)["results"]
+    regressions = compare(results, baseline, args.threshold)
+    for line in regressions:
+        print(f"[ERROR] Регрессия {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
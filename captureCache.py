@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+from csvLoader import CaptureData, LoadedCapture, LoadProgress, get_system_timezone, load_capture
+from densityPyramid import DensityPyramid
+from loadStats import LoadStats
+from nackIndex import NackIndex
+from seqStore import SeqInfoStore
+
+# Версия формата кеша: при изменении набора/смысла массивов старые кеши просто не подходят
+CACHE_VERSION = 2
+# Суффикс каталога-кеша рядом с исходным файлом: capture.csv -> capture.csv.cache/
+CACHE_SUFFIX = ".cache"
+# Сколько байт начала и конца файла входит в хеш содержимого
+HASH_BLOCK_BYTES = 1 << 20
+
+_HEADER_NAME = "header.json"
+
+
+def cache_path(file_path):
+    """Путь к каталогу кеша файла file_path."""
+    return file_path + CACHE_SUFFIX
+
+
+def file_key(file_path):
+    """
+    /**
+     * Ключ идентичности файла: путь, размер, mtime и хеш начала и конца содержимого.
+     * Хеш покрывает дописанные/перезаписанные файлы с сохранённым mtime, не читая весь файл.
+     * @param file_path Путь к файлу.
+     * @return dict.
+     */
+    """
+    stat = os.stat(file_path)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as handle:
+        digest.update(handle.read(HASH_BLOCK_BYTES))
+        if stat.st_size > HASH_BLOCK_BYTES:
+            handle.seek(max(HASH_BLOCK_BYTES, stat.st_size - HASH_BLOCK_BYTES))
+            digest.update(handle.read(HASH_BLOCK_BYTES))
+    return {
+        "version": CACHE_VERSION,
+        "path": os.path.abspath(file_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "head_tail_hash": digest.hexdigest(),
+    }
+
+
+def load_cached(file_path):
+    """
+    /**
+     * Открывает кеш файла, если ключ совпадает; массивы отображаются в память (mmap), а не читаются.
+     * @param file_path Путь к исходному файлу.
+     * @return LoadedCapture или None, если кеша нет, он устарел или повреждён.
+     */
+    """
+    directory = cache_path(file_path)
+    try:
+        with open(os.path.join(directory, _HEADER_NAME), encoding="utf-8") as handle:
+            header = json.load(handle)
+    except (OSError, ValueError):
+        return None
+    if header.get("key") != file_key(file_path):
+        return None
+
+    try:
+        arrays = {name: np.load(os.path.join(directory, name + ".npy"), mmap_mode="r")
+                  for name in header["arrays"]}
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[DEBUG] Кеш {directory} повреждён: {e}")
+        return None
+
+    timezone = get_system_timezone()
+    data = CaptureData(arrays["timestamps"], arrays["types"], arrays["counts"],
+                       arrays["seq_offsets"], arrays["seq_values"], timezone)
+    seq_store = SeqInfoStore(arrays["seqs"], arrays["final_state"], arrays["event_offsets"],
+                             arrays["event_timestamps"], arrays["event_types"], arrays["event_counts"], timezone)
+    nack_index = NackIndex(arrays["nack_rows"], arrays["nack_starts"], arrays["nack_ends"], arrays["nack_lanes"])
+    level_bounds = np.cumsum(arrays["pyramid_sizes"])[:-1]
+    pyramid = DensityPyramid(np.split(arrays["pyramid_levels"], level_bounds), len(seq_store))
+    return LoadedCapture(file_path, data, seq_store, nack_index, pyramid, source_size=header["key"]["size"])
+
+
+def save_cached(file_path, capture):
+    """
+    /**
+     * Сохраняет разобранный захват в каталог кеша: по .npy на массив и header.json с ключом файла.
+     * Запись идёт во временный каталог, который затем переименовывается, поэтому
+     * прерванная запись не оставляет полукеша. Ошибки записи (например, каталог только для чтения)
+     * не мешают работе – кеш просто не создаётся.
+     * @param file_path Путь к исходному файлу.
+     * @param capture LoadedCapture.
+     * @return True, если кеш записан.
+     */
+    """
+    data, store, nacks, pyramid = capture.data, capture.seq_store, capture.nack_index, capture.pyramid
+    arrays = {
+        "timestamps": data.timestamps,
+        "types": data.types,
+        "counts": data.counts,
+        "seq_offsets": data.seq_offsets,
+        "seq_values": data.seq_values,
+        "seqs": store.seqs,
+        "final_state": store.final_state,
+        "event_offsets": store.event_offsets,
+        "event_timestamps": store.event_timestamps,
+        "event_types": store.event_types,
+        "event_counts": store.event_counts,
+        "nack_rows": nacks.rows,
+        "nack_starts": nacks.starts,
+        "nack_ends": nacks.ends,
+        "nack_lanes": nacks.lanes,
+        "pyramid_levels": np.concatenate(pyramid.levels),
+        "pyramid_sizes": np.array([len(level) for level in pyramid.levels], dtype=np.int64),
+    }
+    directory = cache_path(file_path)
+    temp_directory = f"{directory}.tmp{os.getpid()}"
+    try:
+        shutil.rmtree(temp_directory, ignore_errors=True)
+        os.makedirs(temp_directory)
+        for name, array in arrays.items():
+            np.save(os.path.join(temp_directory, name + ".npy"), np.ascontiguousarray(array))
+        with open(os.path.join(temp_directory, _HEADER_NAME), "w", encoding="utf-8") as handle:
+            json.dump({"key": file_key(file_path), "arrays": list(arrays)}, handle, indent=2)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(temp_directory, directory)
+    except OSError as e:
+        print(f"[DEBUG] Не удалось сохранить кеш {directory}: {e}")
+        shutil.rmtree(temp_directory, ignore_errors=True)
+        return False
+    return True
+
+
+def clear_cache(file_path):
+    """Удаляет кеш файла file_path. Возвращает True, если кеш был."""
+    directory = cache_path(file_path)
+    if not os.path.isdir(directory):
+        return False
+    shutil.rmtree(directory, ignore_errors=True)
+    return True
+
+
+def load_capture_cached(file_path, report=None, cancel_event=None, on_partial=None, first_paint_seqs=200,
+                        complete_lines_only=False):
+    """
+    /**
+     * load_capture с кешем: при совпадении ключа файла данные берутся из кеша (mmap),
+     * иначе файл разбирается заново и результат сохраняется в кеш.
+     * Параметры те же, что у csvLoader.load_capture.
+     * @return LoadedCapture.
+     */
+    """
+    total_bytes = os.path.getsize(file_path)
+    stats = LoadStats().start()
+    try:
+        capture = None
+        if not complete_lines_only:
+            # Кеш соответствует всему файлу: при загрузке до последней полной строки он не подходит
+            with stats.stage("cache_load") as cache_stage:
+                capture = load_cached(file_path)
+                cache_stage.rows = len(capture.data) if capture is not None else 0
+        if capture is not None:
+            capture.load_stats = stats
+            if report is not None:
+                report(LoadProgress("Кеш", total_bytes, total_bytes, len(capture.data), 1.0))
+            return capture
+
+        capture = load_capture(file_path, report=report, cancel_event=cancel_event, on_partial=on_partial,
+                               first_paint_seqs=first_paint_seqs, stats=stats, complete_lines_only=complete_lines_only)
+        if capture.source_size != os.path.getsize(file_path):
+            return capture  # Файл дописывается прямо сейчас: кеш сразу бы устарел
+        if report is not None:
+            report(LoadProgress("Сохранение кеша", total_bytes, total_bytes, len(capture.data), 1.0))
+        with stats.stage("save_cache", len(capture.data)):
+            save_cached(file_path, capture)
+        return capture
+    finally:
+        stats.finish()
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+# Форматы столбца seq: "[1, 2]" для всех строк, "1,2" для всех строк, скаляр для обычных строк ("[...]" для NACK)
+SEQ_FORMATS = ("bracket", "comma", "scalar")
+# Сколько seq генерируется и пишется за раз: память генератора не зависит от размера файла
+GENERATE_CHUNK_SEQS = 500_000
+# Начало захвата по умолчанию (epoch-миллисекунды) и шаг времени между seq
+START_MS = 1_700_000_000_000
+SEQ_INTERVAL_MS = 1
+
+
+def generate_capture(file_path, rows, seed=0, loss_rate=0.05, resend_rate=0.5, nack_rate=0.02,
+                     nack_length=(1, 16), resend_delay_ms=(5, 50), seq_format="bracket", start_ms=START_MS):
+    """
+    /**
+     * Пишет синтетический CSV захвата (timestamp, seq, type, count), детерминированный при одинаковом seed.
+     * На каждый seq – строка received (1) или lost (-1); потерянный seq с вероятностью resend_rate
+     * получает строку resend (2) через resend_delay_ms; с вероятностью nack_rate seq получает
+     * NACK-строку (3) со списком из nack_length подряд идущих seq, заканчивающимся им самим.
+     * Внутри порции строки отсортированы по времени. Генерация векторная и идёт порциями.
+     * @param file_path Путь к создаваемому CSV.
+     * @param rows Количество строк файла.
+     * @param seed Зерно генератора случайных чисел.
+     * @param loss_rate Доля потерянных seq.
+     * @param resend_rate Доля восстановленных (resend) среди потерянных.
+     * @param nack_rate Доля seq с NACK-строкой.
+     * @param nack_length (min, max) длины списка NACK.
+     * @param resend_delay_ms (min, max) задержки resend после потери.
+     * @param seq_format Один из SEQ_FORMATS.
+     * @param start_ms Время первого seq (epoch-миллисекунды).
+     * @return Количество записанных строк.
+     */
+    """
+    if seq_format not in SEQ_FORMATS:
+        raise ValueError(f"Неизвестный формат seq: {seq_format} (ожидается один из {', '.join(SEQ_FORMATS)})")
+    rng = np.random.default_rng(seed)
+    rows_per_seq = 1 + loss_rate * resend_rate + nack_rate
+    written = 0
+    first_seq = 0
+    with open(file_path, "w", encoding="utf-8", newline="") as handle:
+        while written < rows:
+            seq_count = max(1, min(GENERATE_CHUNK_SEQS, int(np.ceil((rows - written) / rows_per_seq))))
+            chunk = _generate_chunk(rng, first_seq, seq_count, loss_rate, resend_rate, nack_rate, nack_length,
+                                    resend_delay_ms, seq_format, start_ms)
+            chunk = chunk.iloc[:rows - written]
+            chunk.to_csv(handle, header=written == 0, index=False)
+            written += len(chunk)
+            first_seq += seq_count
+    return written
+
+
+def _generate_chunk(rng, first_seq, seq_count, loss_rate, resend_rate, nack_rate, nack_length, resend_delay_ms,
+                    seq_format, start_ms):
+    """Строки seq [first_seq, first_seq + seq_count), отсортированные по времени."""
+    seqs = np.arange(first_seq, first_seq + seq_count, dtype=np.int64)
+    times = start_ms + seqs * SEQ_INTERVAL_MS
+    lost = rng.random(seq_count) < loss_rate
+    types = np.where(lost, -1, 1).astype(np.int8)
+
+    resent = lost & (rng.random(seq_count) < resend_rate)
+    resend_times = times[resent] + rng.integers(resend_delay_ms[0], resend_delay_ms[1] + 1, int(resent.sum()))
+
+    nacked = np.flatnonzero(rng.random(seq_count) < nack_rate)
+    lengths = rng.integers(nack_length[0], nack_length[1] + 1, len(nacked))
+    nack_seqs = seqs[nacked]
+    nack_text = [_format_list(np.arange(max(0, seq - length + 1), seq + 1), seq_format != "comma")
+                 for seq, length in zip(nack_seqs.tolist(), lengths.tolist())]
+
+    single = np.concatenate((seqs, seqs[resent]))
+    single_text = pd.Series(single).astype(str)
+    if seq_format == "bracket":
+        single_text = "[" + single_text + "]"
+
+    frame = pd.DataFrame({
+        "timestamp": np.concatenate((times, resend_times, times[nacked])),
+        "seq": pd.concat((single_text, pd.Series(nack_text, dtype=object)), ignore_index=True),
+        "type": np.concatenate((types, np.full(len(resend_times), 2, dtype=np.int8),
+                                np.full(len(nacked), 3, dtype=np.int8))),
+        "count": np.ones(len(single) + len(nacked), dtype=np.int32),
+    })
+    return frame.sort_values("timestamp", kind="stable")
+
+
+def _format_list(values, bracketed):
+    """Список seq NACK-строки: "[1, 2, 3]" или "1,2,3"."""
+    if bracketed:
+        return "[" + ", ".join(map(str, values.tolist())) + "]"
+    return ",".join(map(str, values.tolist()))
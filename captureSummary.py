@@ -0,0 +1,42 @@
+from seqStore import STATE_LOST, STATE_RESENT
+
+
+def summarize_counts(total_seq, total_lost, recovery_count):
+    """
+    /**
+     * Сводка потерь и восстановлений по количеству seq.
+     * Received – все seq, кроме итогово потерянных; Recovery Ratio – доля resend среди lost + resend.
+     * @param total_seq Количество seq.
+     * @param total_lost Количество seq с итоговым состоянием lost.
+     * @param recovery_count Количество seq с итоговым состоянием resend.
+     * @return dict: total_seq, total_received, total_lost, recovery_count, loss_ratio, recovery_ratio (в %).
+     */
+    """
+    total_received = total_seq - total_lost
+    loss_ratio = (total_lost / total_seq * 100) if total_seq > 0 else 0
+    denominator = (total_lost + recovery_count)
+    recovery_ratio = (recovery_count / denominator * 100) if denominator > 0 else 0
+    return {
+        "total_seq": total_seq,
+        "total_received": total_received,
+        "total_lost": total_lost,
+        "recovery_count": recovery_count,
+        "loss_ratio": loss_ratio,
+        "recovery_ratio": recovery_ratio,
+    }
+
+
+def summarize_store(seq_store, start=0, stop=None):
+    """Сводка по seq хранилища seqStore.SeqInfoStore с позициями [start, stop) (по умолчанию – по всем), O(1)."""
+    stop = len(seq_store) if stop is None else min(stop, len(seq_store))
+    state_counts = seq_store.count_states(start, stop)
+    return summarize_counts(max(stop - start, 0), state_counts[STATE_LOST], state_counts[STATE_RESENT])
+
+
+def format_summary(summary, title=None):
+    """Текст сводной таблицы GUI; title – необязательная первая строка."""
+    header = f"{title}\n" if title else ""
+    return (f"{header}Total Received: {summary['total_received']}\n"
+            f"Total Lost: {summary['total_lost']}\n"
+            f"Loss Ratio: {summary['loss_ratio']:.1f}%\n"
+            f"Recovery Ratio: {summary['recovery_ratio']:.1f}%")
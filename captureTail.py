@@ -0,0 +1,80 @@
+import io
+import os
+
+import pandas as pd
+
+from arrowReader import is_arrow_file
+from csvLoader import LoadedCapture, complete_lines_size, parse_chunk
+from seqStore import SeqInfoStore
+
+# Максимум байт, разбираемых за один опрос: большой прирост догоняется за несколько опросов
+MAX_TAIL_BYTES = 16 << 20
+
+
+class TailReset(Exception):
+    """Файл укорочен или перезаписан – продолжать с прежнего места нельзя, нужна полная загрузка."""
+
+
+class CaptureTail:
+    """
+    /**
+     * Слежение за дописываемым CSV: каждый опрос читает только байты, появившиеся после
+     * последней полной строки, и добавляет их в захват через CaptureData.append,
+     * SeqInfoStore.extend, NackIndex.extend и DensityPyramid.extend.
+     * Стоимость опроса пропорциональна объёму новых данных, а не размеру файла.
+     * Обновление перезаписывает хвосты массивов прежнего захвата на месте (arrayBuffer),
+     * поэтому poll нужно вызывать в том же потоке, который рисует (Tk main loop).
+     * @param capture LoadedCapture полностью загруженного CSV (source_size – сколько байт уже разобрано).
+     * @throws TailReset Разобранная часть файла кончается не переводом строки.
+     */
+    """
+
+    def __init__(self, capture):
+        if is_arrow_file(capture.file_path):
+            raise ValueError("Слежение возможно только за CSV-файлом")
+        self.capture = capture
+        self.file_path = capture.file_path
+        with open(self.file_path, "rb") as handle:
+            self.header = handle.readline()
+            self.offset = capture.source_size if capture.source_size is not None else complete_lines_size(handle)
+            if complete_lines_size(handle, self.offset) != self.offset:
+                # Последняя разобранная строка была без перевода строки (возможно, недописана) – её данные
+                # нельзя исправить на месте; нужна загрузка до последней полной строки (complete_lines_only)
+                raise TailReset(f"Файл {os.path.basename(self.file_path)} загружен с недописанной последней строкой")
+
+    def poll(self):
+        """
+        /**
+         * Проверяет файл и добавляет новые полные строки.
+         * @return Новый LoadedCapture или None, если новых строк нет.
+         * @throws TailReset Файл стал короче уже разобранной части.
+         */
+        """
+        size = os.path.getsize(self.file_path)
+        if size < self.offset:
+            raise TailReset(f"Файл {os.path.basename(self.file_path)} укорочен")
+        if size == self.offset:
+            return None
+
+        with open(self.file_path, "rb") as handle:
+            handle.seek(self.offset)
+            block = handle.read(min(size - self.offset, MAX_TAIL_BYTES))
+        # Последняя строка может быть ещё не дописана – берём только полные
+        end = block.rfind(b"\n")
+        if end < 0:
+            return None
+        block = block[:end + 1]
+        self.offset += len(block)
+
+        capture = self.capture
+        part = parse_chunk(pd.read_csv(io.BytesIO(self.header + block)), capture.data.timezone)
+        if len(part) == 0:
+            return None
+
+        first_new_row = len(capture.data)
+        data = capture.data.append(part)
+        seq_store, split = capture.seq_store.extend(SeqInfoStore.from_capture(part))
+        nack_index = capture.nack_index.extend(data, seq_store.index, split, first_new_row)
+        pyramid = capture.pyramid.extend(seq_store, nack_index, split)
+        self.capture = LoadedCapture(self.file_path, data, seq_store, nack_index, pyramid, source_size=self.offset)
+        return self.capture
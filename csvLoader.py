@@ -0,0 +1,356 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+import arrayBuffer
+import loadStats
+from arrowReader import is_arrow_file, iter_arrow_columns
+from densityPyramid import DensityPyramid
+from nackIndex import NackIndex
+from seqParser import TYPE_UNKNOWN, parse_seq_column
+from seqStore import SeqInfoStore
+from timeFormat import format_timestamps_ms, parse_epoch_ms
+
+# Размер порции pd.read_csv: между порциями проверяется отмена и отправляется прогресс
+READ_CHUNK_ROWS = 200_000
+# Первая порция меньше остальных, чтобы быстрее получить данные для первой отрисовки
+FIRST_CHUNK_ROWS = 20_000
+# Блок, которым с конца файла ищется последний перевод строки
+LINE_SCAN_BYTES = 64 << 10
+
+
+def get_system_timezone():
+    """
+    Пытается определить часовой пояс системы, используя /etc/localtime.
+    """
+    try:
+        localtime_path = os.readlink("/etc/localtime")
+        parts = localtime_path.split("/")
+        if len(parts) > 4 and parts[1] == "usr" and parts[2] == "share" and parts[3] == "zoneinfo":
+            return "/".join(parts[4:])  # Area/Location
+    except OSError:
+        pass  # Файл /etc/localtime не является символической ссылкой
+
+    return None  # Не удалось определить часовой пояс
+
+
+class LoadCancelled(Exception):
+    """Загрузка отменена пользователем."""
+
+
+class LoadProgress:
+    """
+    /**
+     * Снимок прогресса загрузки, передаваемый из фонового потока в GUI.
+     * @param stage Название текущего этапа.
+     * @param bytes_read Сколько байт файла уже прочитано.
+     * @param total_bytes Размер файла.
+     * @param rows Сколько строк уже разобрано.
+     * @param fraction Доля выполнения текущего этапа (0..1).
+     */
+    """
+
+    def __init__(self, stage, bytes_read, total_bytes, rows, fraction):
+        self.stage = stage
+        self.bytes_read = bytes_read
+        self.total_bytes = total_bytes
+        self.rows = rows
+        self.fraction = fraction
+
+
+class CaptureData:
+    """
+    /**
+     * Колоночное представление захвата: по одному элементу массивов на строку CSV.
+     * Заменяет полный DataFrame, чтобы память определялась компактными массивами.
+     * @param timestamps int64, epoch-миллисекунды (UTC); часовой пояс применяется только при форматировании.
+     * @param types int8, TYPE_UNKNOWN для пустого type.
+     * @param counts int32.
+     * @param seq_offsets, seq_values CSR-представление столбца seq.
+     * @param timezone Часовой пояс для отображения времени.
+     */
+    """
+
+    def __init__(self, timestamps, types, counts, seq_offsets, seq_values, timezone):
+        self.timestamps = timestamps
+        self.types = types
+        self.counts = counts
+        self.seq_offsets = seq_offsets
+        self.seq_values = seq_values
+        self.timezone = timezone
+
+    def __len__(self):
+        return len(self.types)
+
+    def row_seqs(self, row):
+        """Список seq строки row."""
+        return self.seq_values[self.seq_offsets[row]:self.seq_offsets[row + 1]]
+
+    def value_rows(self):
+        """Номер строки для каждого элемента seq_values."""
+        return np.repeat(np.arange(len(self.types)), np.diff(self.seq_offsets))
+
+    def format_timestamps(self, rows):
+        """Timestamp-ы набора строк строками 'YYYY-mm-dd HH:MM:SS:mmm' в часовом поясе захвата."""
+        return format_timestamps_ms(self.timestamps[rows], self.timezone)
+
+    def append(self, part):
+        """
+        /**
+         * Дописывает строки порции part в конец (режим слежения за файлом).
+         * Массивы растут с запасом (arrayBuffer), поэтому стоимость пропорциональна len(part).
+         * @param part CaptureData новых строк.
+         * @return Новый CaptureData; прежний остаётся корректным (его строки не меняются).
+         */
+        """
+        return CaptureData(arrayBuffer.append(self.timestamps, part.timestamps),
+                           arrayBuffer.append(self.types, part.types),
+                           arrayBuffer.append(self.counts, part.counts),
+                           arrayBuffer.append(self.seq_offsets, part.seq_offsets[1:] + self.seq_offsets[-1]),
+                           arrayBuffer.append(self.seq_values, part.seq_values),
+                           self.timezone)
+
+    @staticmethod
+    def concat(parts, timezone):
+        """Склеивает порции в один CaptureData, сдвигая смещения seq."""
+        if not parts:
+            return CaptureData(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int8),
+                               np.empty(0, dtype=np.int32), np.zeros(1, dtype=np.int64),
+                               np.empty(0, dtype=np.int64), timezone)
+        offsets = [parts[0].seq_offsets]
+        shift = parts[0].seq_offsets[-1]
+        for part in parts[1:]:
+            offsets.append(part.seq_offsets[1:] + shift)
+            shift += part.seq_offsets[-1]
+        return CaptureData(np.concatenate([part.timestamps for part in parts]),
+                           np.concatenate([part.types for part in parts]),
+                           np.concatenate([part.counts for part in parts]),
+                           np.concatenate(offsets),
+                           np.concatenate([part.seq_values for part in parts]),
+                           timezone)
+
+
+class LoadedCapture:
+    """Результат загрузки: все данные, которые GUI подменяет за один шаг."""
+
+    def __init__(self, file_path, data, seq_store, nack_index, pyramid, complete=True, source_size=None,
+                 load_stats=None):
+        self.file_path = file_path
+        self.data = data
+        self.seq_store = seq_store
+        self.nack_index = nack_index
+        self.pyramid = pyramid  # densityPyramid.DensityPyramid для обзорной полосы
+        self.complete = complete  # False – промежуточный снимок для первой отрисовки
+        self.source_size = source_size  # сколько байт файла разобрано (с него продолжает слежение за файлом)
+        self.load_stats = load_stats  # loadStats.LoadStats загрузки (None – без замеров)
+
+
+def parse_chunk(chunk, timezone, stats=None):
+    """
+    /**
+     * Переводит порцию pd.read_csv в CaptureData.
+     * Строки без корректного timestamp отбрасываются.
+     * @param chunk DataFrame со столбцами timestamp, seq, type и необязательным count.
+     * @param timezone Часовой пояс захвата.
+     * @param stats loadStats.LoadStats для замеров этапов timestamps, astype, parse_seq (None – без замеров).
+     * @return CaptureData порции.
+     */
+    """
+    if not {"timestamp", "seq", "type"}.issubset(chunk.columns):
+        raise ValueError("CSV не содержит столбцы: timestamp, seq, type")
+
+    # Время хранится как int64 epoch-миллисекунды: без datetime-объектов и перевода в часовой пояс
+    with loadStats.stage(stats, "timestamps", len(chunk)):
+        timestamps, valid = parse_epoch_ms(chunk["timestamp"])
+        chunk = chunk[valid]
+        timestamps = timestamps[valid]
+
+    with loadStats.stage(stats, "astype", len(chunk)):
+        types = chunk["type"].astype(float).fillna(TYPE_UNKNOWN).to_numpy().astype(np.int8)
+        if "count" in chunk.columns:
+            counts = chunk["count"].fillna(1).to_numpy().astype(np.int32)
+        else:
+            counts = np.ones(len(chunk), dtype=np.int32)
+
+    # Столбец seq разбирается целиком в CSR-массивы (offsets, values)
+    with loadStats.stage(stats, "parse_seq", len(chunk)):
+        seq_offsets, seq_values = parse_seq_column(chunk["seq"], types)
+    return CaptureData(timestamps, types, counts, seq_offsets, seq_values, timezone)
+
+
+def load_capture(file_path, report=None, cancel_event=None, on_partial=None, first_paint_seqs=200, stats=None,
+                 complete_lines_only=False):
+    """
+    /**
+     * Потоково загружает CSV (или Parquet / Arrow IPC через pyarrow) порциями
+     * и проверяет наличие столбцов 'timestamp', 'seq', 'type'.
+     * Каждая порция сразу сворачивается в компактные массивы и SeqInfoStore, полный DataFrame не создаётся.
+     * Не обращается к Tk, поэтому может выполняться в фоновом потоке.
+     * @param file_path Путь к CSV, .parquet/.pq или .feather/.arrow/.ipc.
+     * @param report Callback, получающий LoadProgress.
+     * @param cancel_event threading.Event; если установлен – загрузка прерывается LoadCancelled.
+     * @param on_partial Callback, получающий промежуточный LoadedCapture, как только
+     *                   набрано first_paint_seqs seq (вызывается не более одного раза).
+     * @param first_paint_seqs Сколько seq нужно для первой отрисовки (visible_count).
+     * @param stats loadStats.LoadStats, в который пишутся замеры этапов; None – создаётся свой.
+     * @param complete_lines_only Разбирать CSV только до последнего перевода строки (для слежения за файлом:
+     *                            недописанная строка не попадает в данные, её дочитает captureTail).
+     * @return LoadedCapture (замеры – в load_stats).
+     */
+    """
+    if stats is None:
+        stats = loadStats.LoadStats().start()
+        try:
+            return load_capture(file_path, report, cancel_event, on_partial, first_paint_seqs, stats,
+                                complete_lines_only)
+        finally:
+            stats.finish()
+
+    total_bytes = os.path.getsize(file_path)
+    timezone = get_system_timezone()
+
+    def progress(stage, bytes_read, rows, fraction):
+        if cancel_event is not None and cancel_event.is_set():
+            raise LoadCancelled()
+        if report is not None:
+            report(LoadProgress(stage, bytes_read, total_bytes, rows, fraction))
+
+    parts = []
+    stores = []
+    rows = 0
+    partial_sent = on_partial is None
+    stage = "Чтение Arrow" if is_arrow_file(file_path) else "Чтение CSV"
+    source_size = [total_bytes]  # читатель порций записывает сюда фактически прочитанный размер
+    if is_arrow_file(file_path):
+        read_parts = _arrow_parts(file_path, timezone, source_size, stats)
+    else:
+        read_parts = _csv_parts(file_path, timezone, source_size, stats, complete_lines_only)
+    progress(stage, 0, 0, 0.0)
+    for part, fraction in read_parts:
+        parts.append(part)
+        with stats.stage("seq_store", len(part)):
+            stores.append(SeqInfoStore.from_capture(part))
+        rows += len(part)
+        progress(stage, int(fraction * total_bytes), rows, fraction)
+
+        if not partial_sent and sum(len(store) for store in stores) >= first_paint_seqs:
+            # Снимок собирается из неизменяемых хранилищ порций: с GUI ничего не разделяется
+            with stats.stage("first_paint", rows):
+                snapshot_store = SeqInfoStore.merge(stores, timezone)
+                if len(snapshot_store) >= first_paint_seqs:
+                    snapshot = CaptureData.concat(parts, timezone)
+                    snapshot_nacks = NackIndex.from_capture(snapshot, snapshot_store.index)
+                    on_partial(LoadedCapture(file_path, snapshot, snapshot_store, snapshot_nacks,
+                                             DensityPyramid.from_store(snapshot_store, snapshot_nacks),
+                                             complete=False))
+                    partial_sent = True
+
+    progress("Индекс seq", total_bytes, rows, 1.0)
+    with stats.stage("merge", rows):
+        data = CaptureData.concat(parts, timezone)
+        del parts
+        seq_store = SeqInfoStore.merge(stores, timezone)
+        del stores
+
+    progress("Индекс NACK", total_bytes, rows, 1.0)
+    with stats.stage("nack_index", rows):
+        nack_index = NackIndex.from_capture(data, seq_store.index)
+
+    progress("Пирамида плотности", total_bytes, rows, 1.0)
+    with stats.stage("pyramid", len(seq_store)):
+        pyramid = DensityPyramid.from_store(seq_store, nack_index)
+
+    progress("Готово", total_bytes, rows, 1.0)
+    return LoadedCapture(file_path, data, seq_store, nack_index, pyramid, source_size=source_size[0],
+                         load_stats=stats)
+
+
+def _csv_parts(file_path, timezone, source_size, stats=None, complete_lines_only=False):
+    """
+    /**
+     * Порции CSV: генератор (CaptureData, доля прочитанных байт файла).
+     * Разбирается файл того размера, который был при открытии (дописанное позже читает слежение за файлом),
+     * а при complete_lines_only – только до последнего перевода строки: незаконченная последняя строка
+     * (файл ещё пишется) не попадает в данные. source_size[0] – сколько байт разобрано.
+     */
+    """
+    read_any = False
+    with open(file_path, "rb") as handle:
+        total_bytes = complete_lines_size(handle) if complete_lines_only else os.fstat(handle.fileno()).st_size
+        source_size[0] = total_bytes
+        reader = pd.read_csv(io.BufferedReader(_LimitedReader(handle, total_bytes)), chunksize=READ_CHUNK_ROWS)
+        # Первая порция маленькая, чтобы первая отрисовка не ждала полноразмерной порции
+        chunk_size = FIRST_CHUNK_ROWS
+        while True:
+            try:
+                with loadStats.stage(stats, "read_csv") as read_stage:
+                    chunk = reader.get_chunk(chunk_size)
+                    read_stage.rows = len(chunk)
+            except StopIteration:
+                break
+            chunk_size = READ_CHUNK_ROWS
+            read_any = True
+            yield parse_chunk(chunk, timezone, stats), handle.tell() / total_bytes if total_bytes else 1.0
+
+    if not read_any:
+        # Пустой файл: read_csv не вернул ни одной порции, проверяем хотя бы заголовок
+        parse_chunk(pd.read_csv(file_path), timezone)
+
+
+def complete_lines_size(handle, size=None):
+    """
+    /**
+     * Размер части файла из полных строк: позиция сразу после последнего перевода строки.
+     * Файл без единого перевода строки (только заголовок) считается полным.
+     * @param handle Файл, открытый в режиме "rb"; позиция после вызова – начало файла.
+     * @param size Учитывать только первые size байт (None – весь файл).
+     * @return int, байт.
+     */
+    """
+    if size is None:
+        size = handle.seek(0, os.SEEK_END)
+    end = size
+    while end > 0:
+        start = max(0, end - LINE_SCAN_BYTES)
+        handle.seek(start)
+        newline = handle.read(end - start).rfind(b"\n")
+        if newline >= 0:
+            handle.seek(0)
+            return start + newline + 1
+        end = start
+    handle.seek(0)
+    return size
+
+
+class _LimitedReader(io.RawIOBase):
+    """Чтение файла handle только до байта limit: pd.read_csv не видит дописываемый хвост."""
+
+    def __init__(self, handle, limit):
+        self.handle = handle
+        self.limit = limit
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = min(len(buffer), self.limit - self.handle.tell())
+        if count <= 0:
+            return 0
+        return self.handle.readinto(memoryview(buffer)[:count])
+
+
+def _arrow_parts(file_path, timezone, source_size, stats=None):
+    """Порции Parquet / Arrow IPC: генератор (CaptureData, доля прочитанных строк файла)."""
+    columns = iter_arrow_columns(file_path, READ_CHUNK_ROWS)
+    while True:
+        # Чтение и разбор порции идут внутри iter_arrow_columns, поэтому замеряются одним этапом read_arrow
+        with loadStats.stage(stats, "read_arrow") as read_stage:
+            item = next(columns, None)
+            if item is not None:
+                read_stage.rows = len(item[1])
+        if item is None:
+            break
+        timestamps, types, counts, seq_offsets, seq_values, fraction = item
+        yield CaptureData(timestamps, types, counts, seq_offsets, seq_values, timezone), fraction
@@ -0,0 +1,109 @@
+import numpy as np
+
+import arrayBuffer
+from seqStore import STATE_LOST, STATE_RESENT
+
+# Размер бакета нижнего уровня (в seq); уровень k агрегирует BASE_BUCKET * 2**k seq
+BASE_BUCKET = 16
+
+# Столбцы агрегатов бакета
+COL_RECEIVED = 0
+COL_LOST = 1
+COL_RESENT = 2
+COL_NACK = 3
+COLUMN_COUNT = 4
+
+
+class DensityPyramid:
+    """
+    /**
+     * Многоуровневая пирамида агрегатов по позициям индекса seq.
+     * Уровень k – int32-массив (бакеты, 4): сколько seq received/lost/resent в бакете
+     * и сколько NACK начинается в бакете; размер бакета BASE_BUCKET * 2**k.
+     * Каждый следующий уровень – попарная сумма предыдущего, последний уровень – один бакет.
+     * Строится один раз на загрузку; обзорная полоса берёт уровень с ограниченным числом бакетов,
+     * поэтому её отрисовка не зависит от размера захвата.
+     * @param levels Список уровней, от самого детального.
+     * @param total Количество seq в захвате.
+     */
+    """
+
+    def __init__(self, levels, total):
+        self.levels = levels
+        self.total = total
+
+    def bucket_size(self, level):
+        """Сколько seq в бакете уровня level."""
+        return BASE_BUCKET << level
+
+    def level_for(self, max_buckets):
+        """Самый детальный уровень, в котором не больше max_buckets бакетов."""
+        base_buckets = len(self.levels[0])
+        level = 0
+        while base_buckets > max_buckets and level < len(self.levels) - 1:
+            base_buckets = (base_buckets + 1) // 2
+            level += 1
+        return level
+
+    @staticmethod
+    def from_store(seq_store, nack_index):
+        """
+        /**
+         * Строит пирамиду векторно: нижний уровень – bincount по номерам бакетов, остальные – суммы пар.
+         * @param seq_store seqStore.SeqInfoStore.
+         * @param nack_index nackIndex.NackIndex (в позициях того же индекса seq).
+         * @return DensityPyramid.
+         */
+        """
+        total = len(seq_store)
+        levels = [_base_counts(seq_store.final_state, nack_index.starts, max(1, -(-total // BASE_BUCKET)))]
+        while len(levels[-1]) > 1:
+            levels.append(_pair_sums(levels[-1]))
+        return DensityPyramid(levels, total)
+
+    def extend(self, seq_store, nack_index, split):
+        """
+        /**
+         * Обновляет пирамиду после SeqInfoStore.extend / NackIndex.extend (режим слежения за файлом):
+         * пересчитываются только бакеты, начиная с бакета позиции split, на каждом уровне.
+         * @param seq_store Новый seqStore.SeqInfoStore.
+         * @param nack_index Новый nackIndex.NackIndex.
+         * @param split Позиция, с которой изменился индекс seq.
+         * @return DensityPyramid.
+         */
+        """
+        total = len(seq_store)
+        first_bucket = split // BASE_BUCKET
+        first_pos = first_bucket * BASE_BUCKET
+        nack_from = int(np.searchsorted(nack_index.starts, first_pos))
+        tail = _base_counts(seq_store.final_state[first_pos:], nack_index.starts[nack_from:] - first_pos,
+                            max(1, -(-total // BASE_BUCKET)) - first_bucket)
+        levels = [arrayBuffer.replace_tail(self.levels[0], first_bucket, tail)]
+        while len(levels[-1]) > 1:
+            # Бакет first_bucket уровня k входит в бакет first_bucket // 2 уровня k + 1
+            first_bucket //= 2
+            sums = _pair_sums(levels[-1][2 * first_bucket:])
+            level_number = len(levels)
+            if level_number < len(self.levels):
+                levels.append(arrayBuffer.replace_tail(self.levels[level_number], first_bucket, sums))
+            else:
+                levels.append(sums)
+        return DensityPyramid(levels, total)
+
+
+def _base_counts(final_state, nack_starts, bucket_count):
+    """Нижний уровень: bincount итоговых состояний и начал NACK по бакетам BASE_BUCKET."""
+    bucket = np.arange(len(final_state)) // BASE_BUCKET
+    column = np.where(final_state == STATE_RESENT, COL_RESENT,
+                      np.where(final_state == STATE_LOST, COL_LOST, COL_RECEIVED))
+    counts = np.bincount(bucket * COLUMN_COUNT + column, minlength=bucket_count * COLUMN_COUNT)
+    counts = counts.reshape(bucket_count, COLUMN_COUNT)
+    counts[:, COL_NACK] = np.bincount(nack_starts // BASE_BUCKET, minlength=bucket_count)[:bucket_count]
+    return counts.astype(np.int32)
+
+
+def _pair_sums(level):
+    """Следующий уровень: суммы пар бакетов (нечётный последний бакет дополняется нулями)."""
+    if len(level) % 2:
+        level = np.vstack((level, np.zeros((1, COLUMN_COUNT), dtype=np.int32)))
+    return level.reshape(-1, 2, COLUMN_COUNT).sum(axis=1, dtype=np.int32)
@@ -1,23 +1,199 @@
 import cProfile
-import pstats
 import functools
-import io
+import marshal
+import os
+import sys
+import threading
+import time
+
+PROFILE_MODES = ("cprofile", "sampling")
+DEFAULT_PROFILE_DIR = "profiles"
+# Период сэмплирования стеков (с)
+SAMPLE_INTERVAL = 0.005
+
+
+class ProfileSession:
+    """
+    /**
+     * Сессия профилирования, которую включают и выключают по требованию (горячая клавиша, флаг запуска).
+     * Режим "cprofile": один cProfile.Profile на всю сессию, включается только на время вызовов,
+     * помеченных profile_detailed, – профиль накапливается по всем вызовам сессии.
+     * Режим "sampling": фоновый поток раз в SAMPLE_INTERVAL снимает стеки всех потоков;
+     * накладные расходы не зависят от числа вызовов, подходит для работы под реальной нагрузкой.
+     * stop() пишет стандартный .prof (pstats / snakeviz) в output_dir.
+     * Вне сессии profile_detailed стоит одну проверку атрибута.
+     */
+    """
+
+    def __init__(self):
+        self.mode = None
+        self.profiler = None
+        self.sampler = None
+        self.output_dir = DEFAULT_PROFILE_DIR
+        self.started_at = None
+        self._lock = threading.Lock()
+        self._owner = None
+        self._depth = 0
+
+    @property
+    def active(self):
+        return self.mode is not None
+
+    def start(self, mode="cprofile", output_dir=DEFAULT_PROFILE_DIR, interval=SAMPLE_INTERVAL):
+        """
+        /**
+         * Начинает сессию (если она ещё не идёт).
+         * @param mode "cprofile" или "sampling".
+         * @param output_dir Каталог для .prof.
+         * @param interval Период сэмплирования (с), только для "sampling".
+         */
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Неизвестный режим профилирования: {mode}")
+        if self.active:
+            return
+        self.mode = mode
+        self.output_dir = output_dir
+        self.started_at = time.strftime("%Y%m%d-%H%M%S")
+        if mode == "cprofile":
+            self.profiler = cProfile.Profile()
+        else:
+            self.sampler = _StackSampler(interval)
+            self.sampler.start()
+        print(f"[DEBUG] Профилирование ({mode}) начато")
+
+    def stop(self):
+        """
+        /**
+         * Завершает сессию и сохраняет профиль.
+         * @return Путь к .prof или None, если сессии не было или сохранить не удалось.
+         */
+        """
+        if not self.active:
+            return None
+        with self._lock:
+            profiler, self.profiler = self.profiler, None
+        sampler, self.sampler = self.sampler, None
+        path = os.path.join(self.output_dir, f"profile-{self.started_at}-{self.mode}.prof")
+        self.mode = None
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            if profiler is not None:
+                profiler.dump_stats(path)
+            else:
+                sampler.stop()
+                sampler.dump_stats(path)
+        except OSError as e:
+            print(f"[ERROR] Не удалось сохранить профиль {path}: {e}")
+            return None
+        print(f"[DEBUG] Профиль сохранён: {path}")
+        return path
+
+    def toggle(self, mode="cprofile", output_dir=DEFAULT_PROFILE_DIR):
+        """Начинает сессию или завершает текущую. Возвращает путь к .prof при завершении."""
+        if self.active:
+            return self.stop()
+        self.start(mode, output_dir)
+        return None
+
+    def profile_call(self, func, args, kwargs):
+        """Вызов func под профилировщиком сессии; вложенные и параллельные вызовы не переключают его."""
+        ident = threading.get_ident()
+        with self._lock:
+            profiler = self.profiler
+            owned = profiler is not None and self._owner in (None, ident)
+            if owned:
+                if self._depth == 0:
+                    self._owner = ident
+                    profiler.enable()
+                self._depth += 1
+        if not owned:
+            # Профилировщик уже работает в другом потоке – этот вызов идёт без замера
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._depth -= 1
+                if self._depth == 0:
+                    profiler.disable()
+                    self._owner = None
+
+
+session = ProfileSession()
+
 
 def profile_detailed(func):
-    """Декоратор для детального профилирования метода с фильтрацией"""
+    """Помечает функцию для сессии профилирования "cprofile": вне сессии вызов идёт напрямую."""
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        profiler = cProfile.Profile()
-        profiler.enable()
-        result = func(*args, **kwargs)
-        profiler.disable()
+        if session.profiler is None:
+            return func(*args, **kwargs)
+        return session.profile_call(func, args, kwargs)
 
-        # Фильтруем только функции, относящиеся к твоему коду
-        stream = io.StringIO()
-        stats = pstats.Stats(profiler, stream=stream)
-        stats.strip_dirs().sort_stats("cumulative").print_stats(10)  # ТОП-10 вызовов
+    return wrapper
 
-        print(stream.getvalue())  # Выводим отфильтрованные данные
-        return result
 
-    return wrapper
+class _StackSampler(threading.Thread):
+    """
+    /**
+     * Сэмплирующий профилировщик: периодически снимает стеки всех потоков (sys._current_frames)
+     * и накапливает статистику в формате pstats: для функции – число сэмплов, собственное время
+     * (функция на вершине стека) и кумулятивное время (функция где-либо в стеке), а также вызывающих.
+     * Время – реальные интервалы между сэмплами.
+     */
+    """
+
+    def __init__(self, interval):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.stats = {}
+
+    def run(self):
+        own = threading.get_ident()
+        last = time.perf_counter()
+        while not self.stop_event.wait(self.interval):
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self._record(frame, elapsed)
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+    def _record(self, frame, elapsed):
+        """Добавляет один стек: frame – вершина стека потока."""
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+        seen = set()
+        for depth, func in enumerate(stack):
+            entry = self.stats.get(func)
+            if entry is None:
+                entry = self.stats[func] = [0, 0, 0.0, 0.0, {}]
+            leaf = elapsed if depth == 0 else 0.0
+            entry[2] += leaf
+            if func in seen:
+                continue  # Рекурсия: кумулятивное время и сэмпл считаются один раз
+            seen.add(func)
+            entry[0] += 1
+            entry[1] += 1
+            entry[3] += elapsed
+            if depth + 1 < len(stack):
+                caller = entry[4].setdefault(stack[depth + 1], [0, 0, 0.0, 0.0])
+                caller[0] += 1
+                caller[1] += 1
+                caller[2] += leaf
+                caller[3] += elapsed
+
+    def dump_stats(self, path):
+        """Пишет статистику в .prof (marshal-словарь pstats, как cProfile.Profile.dump_stats)."""
+        stats = {func: (cc, nc, tt, ct, {caller: tuple(values) for caller, values in callers.items()})
+                 for func, (cc, nc, tt, ct, callers) in self.stats.items()}
+        with open(path, "wb") as handle:
+            marshal.dump(stats, handle)
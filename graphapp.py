@@ -0,0 +1,125 @@
+"""
+Пакетный анализ захватов без GUI (Tk/TkAgg не импортируются).
+
+    python -m graphapp summarize capture1.csv captures/*.parquet -o report.json
+    python -m graphapp summarize captures/*.csv -f csv -o report.csv -j 8
+    python -m graphapp generate synthetic.csv --rows 1000000 --loss-rate 0.05 --seq-format scalar
+
+Для каждого файла считается та же сводка, что и в сводной таблице GUI
+(тот же загрузчик и та же логика итоговых состояний seq); файлы распределяются по пулу процессов.
+generate пишет детерминированный синтетический захват (captureGenerator) для тестов и бенчмарков.
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from captureCache import load_capture_cached
+from captureGenerator import SEQ_FORMATS, generate_capture
+from captureSummary import summarize_store
+from csvLoader import load_capture
+
+# Столбцы отчёта (JSON-ключи и заголовок CSV)
+REPORT_FIELDS = ["file", "total_seq", "total_received", "total_lost", "recovery_count", "loss_ratio",
+                 "recovery_ratio", "error"]
+
+
+def summarize_file(file_path, use_cache=False):
+    """
+    /**
+     * Загружает один захват и считает его сводку; выполняется в процессе пула.
+     * Ошибка загрузки не прерывает пакет – она попадает в поле error строки отчёта.
+     * @param file_path Путь к CSV / Parquet / Arrow.
+     * @param use_cache Читать и сохранять кеш рядом с файлом (captureCache).
+     * @return dict строки отчёта.
+     */
+    """
+    try:
+        capture = load_capture_cached(file_path) if use_cache else load_capture(file_path)
+    except Exception as e:
+        return {"file": file_path, "error": f"{type(e).__name__}: {e}"}
+    return {"file": file_path, **summarize_store(capture.seq_store), "error": None}
+
+
+def expand_paths(patterns):
+    """Раскрывает шаблоны (для оболочек, которые не делают этого сами), сохраняя порядок и убирая дубли."""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        paths.extend(path for path in matches if path not in paths)
+    return paths
+
+
+def summarize_files(paths, jobs=None, use_cache=False):
+    """Сводки по файлам в порядке paths; jobs – число процессов (None – по числу ядер)."""
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(paths) <= 1:
+        return [summarize_file(path, use_cache) for path in paths]
+    with ProcessPoolExecutor(max_workers=min(jobs, len(paths))) as pool:
+        return list(pool.map(summarize_file, paths, repeat(use_cache)))
+
+
+def write_report(rows, output, report_format):
+    """Пишет отчёт в файл output (или stdout, если output – None) в формате json или csv."""
+    handle = open(output, "w", encoding="utf-8", newline="") if output else sys.stdout
+    try:
+        if report_format == "csv":
+            writer = csv.DictWriter(handle, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            json.dump(rows, handle, ensure_ascii=False, indent=2)
+            handle.write("\n")
+    finally:
+        if output:
+            handle.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m graphapp", description="Пакетный анализ захватов без GUI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    summarize = commands.add_parser("summarize", help="Сводка потерь и восстановлений по файлам.")
+    summarize.add_argument("files", nargs="+", help="Файлы или шаблоны (*.csv, *.parquet, ...).")
+    summarize.add_argument("-o", "--output", help="Файл отчёта (по умолчанию stdout).")
+    summarize.add_argument("-f", "--format", choices=["json", "csv"],
+                           help="Формат отчёта (по умолчанию – по расширению --output, иначе json).")
+    summarize.add_argument("-j", "--jobs", type=int, default=None, help="Число процессов (по умолчанию – число ядер).")
+    summarize.add_argument("--cache", action="store_true", help="Использовать кеш рядом с файлами (captureCache).")
+
+    generate = commands.add_parser("generate", help="Синтетический захват CSV.")
+    generate.add_argument("output", help="Создаваемый CSV.")
+    generate.add_argument("--rows", type=int, default=1_000_000, help="Количество строк.")
+    generate.add_argument("--seed", type=int, default=0, help="Зерно генератора.")
+    generate.add_argument("--loss-rate", type=float, default=0.05, help="Доля потерянных seq.")
+    generate.add_argument("--resend-rate", type=float, default=0.5, help="Доля resend среди потерянных.")
+    generate.add_argument("--nack-rate", type=float, default=0.02, help="Доля seq с NACK-строкой.")
+    generate.add_argument("--nack-length", type=int, nargs=2, default=(1, 16), metavar=("MIN", "MAX"),
+                          help="Длина списка NACK.")
+    generate.add_argument("--seq-format", choices=SEQ_FORMATS, default="bracket", help="Формат столбца seq.")
+
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        rows = generate_capture(args.output, args.rows, seed=args.seed, loss_rate=args.loss_rate,
+                                resend_rate=args.resend_rate, nack_rate=args.nack_rate,
+                                nack_length=tuple(args.nack_length), seq_format=args.seq_format)
+        print(f"[DEBUG] {args.output}: {rows} строк")
+        return 0
+
+    report_format = args.format or ("csv" if args.output and args.output.lower().endswith(".csv") else "json")
+    paths = expand_paths(args.files)
+    if not paths:
+        parser.error("нет файлов для анализа")
+
+    rows = summarize_files(paths, jobs=args.jobs, use_cache=args.cache)
+    write_report(rows, args.output, report_format)
+    # Ненулевой код возврата, если хотя бы один файл не удалось разобрать
+    return 1 if any(row["error"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+import contextlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+try:
+    import psutil
+except ImportError:  # psutil необязателен: без него RSS читается из /proc (Linux)
+    psutil = None
+
+# GRAPHAPP_LOAD_TRACEMALLOC=1 – память этапов через tracemalloc (точно, но загрузка медленнее);
+# иначе – по RSS процесса, который фоновый поток опрашивает раз в RSS_SAMPLE_INTERVAL
+TRACEMALLOC_ENV = "GRAPHAPP_LOAD_TRACEMALLOC"
+RSS_SAMPLE_INTERVAL = 0.01
+# Отчёты загрузок дописываются рядом с файлом: capture.csv -> capture.csv.loadreport.jsonl
+REPORT_SUFFIX = ".loadreport.jsonl"
+
+
+def rss_bytes():
+    """Текущий RSS процесса в байтах или None, если узнать его нечем."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class StageStats:
+    """Накопленные замеры одного этапа: время, строки, вызовы, пик и прирост памяти (байты, None – не измерено)."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.rows = 0
+        self.calls = 0
+        self.peak_bytes = None
+        self.retained_bytes = None
+
+    def as_dict(self):
+        return {"seconds": self.seconds, "rows": self.rows, "calls": self.calls,
+                "peak_bytes": self.peak_bytes, "retained_bytes": self.retained_bytes}
+
+
+class _StageRows:
+    """Счётчик строк, который этап заполняет внутри with stats.stage(...)."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+
+class LoadStats:
+    """
+    /**
+     * Поэтапные замеры конвейера загрузки: время, строки, пик и остаточная память каждого этапа.
+     * Этапы, выполняемые по порциям (чтение, разбор seq, ...), накапливаются: время и строки суммируются,
+     * пик – максимум по порциям, остаток – сумма приростов.
+     * Пик считается относительно памяти в начале этапа; этапы не вкладываются друг в друга.
+     * @param trace_memory Мерить память через tracemalloc (None – по переменной GRAPHAPP_LOAD_TRACEMALLOC).
+     */
+    """
+
+    def __init__(self, trace_memory=None):
+        if trace_memory is None:
+            trace_memory = os.environ.get(TRACEMALLOC_ENV) == "1"
+        self.trace_memory = trace_memory
+        self.memory_source = "tracemalloc" if trace_memory else ("rss" if rss_bytes() is not None else None)
+        self.stages = {}
+        self.started_at = time.time()
+        self.total_seconds = 0.0
+        self._start = None
+        self._own_tracing = False
+        self._sampler = None
+        self._sampler_stop = None
+        self._rss_peak = 0
+
+    def start(self):
+        """Начинает замеры (запускает tracemalloc или опрос RSS)."""
+        self._start = time.perf_counter()
+        if self.memory_source == "tracemalloc" and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._own_tracing = True
+        elif self.memory_source == "rss":
+            self._sampler_stop = threading.Event()
+            self._sampler = threading.Thread(target=self._sample_rss, name="rss-sampler", daemon=True)
+            self._sampler.start()
+        return self
+
+    def finish(self):
+        """Завершает замеры."""
+        if self._start is not None:
+            self.total_seconds = time.perf_counter() - self._start
+        if self._own_tracing:
+            tracemalloc.stop()
+            self._own_tracing = False
+        if self._sampler is not None:
+            self._sampler_stop.set()
+            self._sampler.join()
+            self._sampler = None
+        return self
+
+    def _sample_rss(self):
+        while not self._sampler_stop.wait(RSS_SAMPLE_INTERVAL):
+            rss = rss_bytes()
+            if rss is not None and rss > self._rss_peak:
+                self._rss_peak = rss
+
+    def _memory(self):
+        """(текущая память, пик с последнего сброса) в выбранном источнике."""
+        if self.memory_source == "tracemalloc" and tracemalloc.is_tracing():
+            return tracemalloc.get_traced_memory()
+        if self.memory_source == "rss":
+            current = rss_bytes()
+            self._rss_peak = max(self._rss_peak, current)
+            return current, self._rss_peak
+        return None, None
+
+    def _reset_peak(self, current):
+        if self.memory_source == "tracemalloc" and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        elif current is not None:
+            self._rss_peak = current
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=0):
+        """
+        /**
+         * Замер этапа name: with stats.stage("read_csv") as stage: ...; stage.rows = len(chunk).
+         * @param name Имя этапа.
+         * @param rows Количество строк этапа (можно задать позже через stage.rows).
+         */
+        """
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats()
+        before, _ = self._memory()
+        self._reset_peak(before)
+        counter = _StageRows(rows)
+        start = time.perf_counter()
+        try:
+            yield counter
+        finally:
+            stats.seconds += time.perf_counter() - start
+            stats.rows += counter.rows
+            stats.calls += 1
+            current, peak = self._memory()
+            if before is not None and current is not None:
+                stats.peak_bytes = max(stats.peak_bytes or 0, peak - before)
+                stats.retained_bytes = (stats.retained_bytes or 0) + current - before
+
+    def as_dict(self):
+        """Отчёт для JSON."""
+        return {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "total_seconds": self.total_seconds,
+            "memory_source": self.memory_source,
+            "stages": {name: stats.as_dict() for name, stats in self.stages.items()},
+        }
+
+    def format_table(self):
+        """Текстовая таблица этапов для GUI и консоли."""
+        lines = [f"{'stage':<14} {'s':>8} {'rows':>10} {'peak MiB':>9} {'kept MiB':>9}"]
+        for name, stats in self.stages.items():
+            lines.append(f"{name:<14} {stats.seconds:8.3f} {stats.rows:>10} {_mebibytes(stats.peak_bytes):>9} "
+                         f"{_mebibytes(stats.retained_bytes):>9}")
+        lines.append(f"{'total':<14} {self.total_seconds:8.3f}   (память: {self.memory_source or 'нет данных'})")
+        return "\n".join(lines)
+
+
+def _mebibytes(value):
+    return "-" if value is None else f"{value / (1 << 20):.1f}"
+
+
+@contextlib.contextmanager
+def _no_stage():
+    yield _StageRows(0)
+
+
+def stage(stats, name, rows=0):
+    """stats.stage(name, rows) или пустой контекст, если stats – None (загрузка без замеров)."""
+    return stats.stage(name, rows) if stats is not None else _no_stage()
+
+
+def report_path(file_path):
+    """Путь к журналу отчётов загрузки файла file_path."""
+    return file_path + REPORT_SUFFIX
+
+
+def save_report(file_path, stats, rows, extra=None):
+    """
+    /**
+     * Дописывает отчёт загрузки строкой JSON в журнал рядом с файлом: отчёты разных загрузок
+     * одного захвата накапливаются, и их можно сравнивать. Ошибки записи не мешают работе.
+     * @param file_path Путь к загруженному файлу.
+     * @param stats LoadStats.
+     * @param rows Сколько строк загружено.
+     * @param extra Дополнительные поля отчёта (dict).
+     * @return True, если отчёт записан.
+     */
+    """
+    try:
+        record = {"file": os.path.basename(file_path), "size": os.path.getsize(file_path), "rows": rows,
+                  **stats.as_dict(), **(extra or {})}
+        with open(report_path(file_path), "a", encoding="utf-8") as handle:
+            handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError as e:
+        print(f"[DEBUG] Не удалось сохранить отчёт загрузки {report_path(file_path)}: {e}")
+        return False
+    return True
@@ -1,78 +1,68 @@
+import argparse
+import functools
 import os
+import queue
+import threading
 import time
 import tkinter as tk
-import numpy as np
 from tkinter import filedialog, ttk
-import pandas as pd
 import matplotlib
 import matplotlib.pyplot as plt
-import ast
 from typing import Any
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
-from matplotlib.collections import PatchCollection
 
-from detailProfile import profile_detailed
-from showProfile import profile_time
+from captureCache import clear_cache, load_capture_cached
+from captureTail import CaptureTail, TailReset
+from captureSummary import format_summary, summarize_store
+from csvLoader import LoadCancelled, LoadProgress
+from detailProfile import DEFAULT_PROFILE_DIR, PROFILE_MODES, profile_detailed, session as profile_session
+from loadStats import save_report as save_load_report
+from seqParser import TYPE_UNKNOWN
+from seqStore import STATE_LOST, STATE_RESENT, SeqInfoStore
+from showProfile import METRICS_ENABLED, profile_time, registry
+from overviewView import OverviewView
+from timeAxisView import TimeAxisView
+from timeFormat import format_timestamp_ms, format_timestamps_ms
+from timeIndex import TimeIndex, parse_time
+from timelineView import TimelineView
 
 # Используем TkAgg и темную тему
 matplotlib.use("TkAgg")
 plt.style.use('dark_background')
 
-def _format_final_state_2(seq, events):
+def _format_final_state_2(seq, events, timezone):
     """
     /**
      * Форматирует tooltip для final_state == 2.
      * Находит первый event с type=2 и последний event с type=-1, предшествующий ему.
      * @param seq Значение seq.
-     * @param events Список событий.
+     * @param events События seq из SeqInfoStore.events: (timestamps, types, counts).
+     * @param timezone Часовой пояс захвата.
      * @return Отформатированный текст tooltip.
      */
     """
-    resend_event = None
-    lost_event = None
-    for event in events:
-        if event["type"] == 2:
-            resend_event = event
+    timestamps, types, _ = events
+    resend_index = None
+    lost_index = None
+    for i, event_type in enumerate(types.tolist()):
+        if event_type == 2:
+            resend_index = i
             break
-        elif event["type"] == -1:
-            lost_event = event
-
-    def format_timestamp(event_value):
-        """Форматирует timestamp с миллисекундами."""
-        formatted_time = event_value['timestamp'].strftime('%Y-%m-%d %H:%M:%S')
-        milliseconds = int(event_value['timestamp'].microsecond / 1000)
-        return f"{formatted_time}:{milliseconds:03d}"
+        elif event_type == -1:
+            lost_index = i
 
-    if lost_event is not None and resend_event is not None:
+    if lost_index is not None and resend_index is not None:
+        # Оба времени форматируются одним вызовом
+        lost_time, resend_time = format_timestamps_ms(timestamps[[lost_index, resend_index]], timezone)
         return (f"Seq: {seq}\n"
-                f"Lost: {format_timestamp(lost_event)}\n"
-                f"Recovered: {format_timestamp(resend_event)}")
-    elif resend_event is not None:
-        return f"Seq: {seq}\nResend at: {format_timestamp(resend_event)}"
+                f"Lost: {lost_time}\n"
+                f"Recovered: {resend_time}")
+    elif resend_index is not None:
+        return f"Seq: {seq}\nResend at: {format_timestamp_ms(timestamps[resend_index], timezone)}"
     else:
         return f"Seq: {seq}"
 
 
-def get_system_timezone():
-    """
-    Пытается определить часовой пояс системы, используя /etc/localtime.
-    """
-    try:
-        localtime_path = os.readlink("/etc/localtime")
-        parts = localtime_path.split("/")
-        if len(parts) > 4 and parts[1] == "usr" and parts[2] == "share" and parts[3] == "zoneinfo":
-            return "/".join(parts[4:])  # Area/Location
-    except OSError:
-        pass  # Файл /etc/localtime не является символической ссылкой
-
-    return None  # Не удалось определить часовой пояс
-
-
-def intervals_overlap(a1, b1, a2, b2):
-    """Проверяет, перекрываются ли два интервала"""
-    return not (b1 < a2 or a1 > b2)
-
-
 class CSVGraphApp:
     """
     CSVGraphApp – отображает state timeline из CSV.
@@ -92,17 +82,25 @@ class CSVGraphApp:
           */
         """
         self.root = master
-        self.root.title("State Timeline из CSV")
+        self.title = "State Timeline из CSV"
+        self.root.title(self.title)
         self.root.update_idletasks()
         self.center_half_screen()
         self.root.configure(bg="#2E2E2E")
 
         self.font = ("Segoe UI", 12)
+
+        # Сессия профилирования: F9 – cProfile по помеченным методам, Shift+F9 – сэмплирование
+        self.profile_dir = DEFAULT_PROFILE_DIR
+        self.root.bind("<F9>", lambda _: self.toggle_profiling("cprofile"))
+        self.root.bind("<Shift-F9>", lambda _: self.toggle_profiling("sampling"))
         self.button_font = ("Segoe UI", 12, "bold")
 
         # Инициализация атрибутов для избежания предупреждений
         self.check_vars = {}
         self.summary_label = None
+        self.window_summary_label = None
+        self.load_report_label = None
 
         # --- Верхняя панель: навигационная панель (toolbar) ---
         self.toolbar_frame = tk.Frame(self.root, bg="#2E2E2E")
@@ -123,6 +121,62 @@ class CSVGraphApp:
         )
         self.file_label.pack(side=tk.LEFT, padx=10)
 
+        # Кеш разобранного файла лежит рядом с ним (<файл>.cache); кнопка удаляет кеш текущего файла
+        self.clear_cache_button = tk.Button(
+            self.control_frame, text="Очистить кеш", command=self.clear_file_cache,
+            font=self.button_font, bg="#555555", fg="white", relief=tk.FLAT
+        )
+        self.clear_cache_button.pack(side=tk.LEFT, padx=5)
+
+        # Панель статистики задержек (showProfile.registry); при GRAPHAPP_METRICS=0 замеров нет
+        self.metrics_window = None
+        self.metrics_text = None
+        self.metrics_job = None
+        self.METRICS_REFRESH_INTERVAL = 1000  # мс
+        if METRICS_ENABLED:
+            tk.Button(
+                self.control_frame, text="Метрики", command=self.show_metrics_panel,
+                font=self.button_font, bg="#555555", fg="white", relief=tk.FLAT
+            ).pack(side=tk.LEFT, padx=5)
+
+        # Слежение за дописываемым CSV: новые строки добавляются без полной перезагрузки
+        self.follow_var = tk.BooleanVar(value=False)
+        self.follow_check = tk.Checkbutton(
+            self.control_frame, text="Следить за файлом", variable=self.follow_var, command=self.toggle_follow,
+            bg="#2E2E2E", fg="white", selectcolor="#2E2E2E", font=self.font
+        )
+        self.follow_check.pack(side=tk.LEFT, padx=5)
+        self.tail = None  # captureTail.CaptureTail, пока включено слежение
+        self.follow_after_load = False  # включить слежение после текущей загрузки
+        self.follow_job = None
+        self.TAIL_POLL_INTERVAL = 1000  # мс
+
+        # Режим оси времени и переход ко времени: 'T' или интервал 't0 .. t1'
+        self.time_mode_var = tk.BooleanVar(value=False)
+        self.time_mode_check = tk.Checkbutton(
+            self.control_frame, text="Ось времени", variable=self.time_mode_var, command=self.toggle_time_mode,
+            bg="#2E2E2E", fg="white", selectcolor="#2E2E2E", font=self.font
+        )
+        self.time_mode_check.pack(side=tk.LEFT, padx=5)
+        tk.Label(self.control_frame, text="Время:", font=self.font, bg="#2E2E2E", fg="white").pack(side=tk.LEFT)
+        self.time_entry = tk.Entry(self.control_frame, width=28, font=self.font, bg="#555555", fg="white",
+                                   insertbackground="white", relief=tk.FLAT)
+        self.time_entry.pack(side=tk.LEFT, padx=5)
+        self.time_entry.bind("<Return>", self.on_time_entry)
+
+        # Индикатор фоновой загрузки: этап, прогресс-бар и кнопка отмены (видны только во время загрузки)
+        self.load_status_label = tk.Label(self.control_frame, text="", font=self.font, bg="#2E2E2E", fg="white")
+        self.load_progress = ttk.Progressbar(self.control_frame, orient=tk.HORIZONTAL, length=200,
+                                             mode="determinate", maximum=1.0)
+        self.cancel_button = tk.Button(
+            self.control_frame, text="Отмена", command=self.cancel_load,
+            font=self.button_font, bg="#555555", fg="white", relief=tk.FLAT
+        )
+        self.load_thread = None
+        self.load_queue = queue.Queue()
+        self.load_cancel_event = None
+        self.LOAD_POLL_INTERVAL = 50  # мс
+
         # Чекбоксы для отображения информации в tooltip
         self.create_checkboxes()
 
@@ -130,6 +184,10 @@ class CSVGraphApp:
         self.main_frame = tk.Frame(self.root, bg="#2E2E2E")
         # Отображаем main_frame только после загрузки CSV
 
+        # Обзорная полоса всего захвата: клик переносит окно timeline
+        self.overview_frame = tk.Frame(self.main_frame, bg="#2E2E2E")
+        self.overview_frame.pack(side=tk.TOP, fill=tk.X, padx=10, pady=(10, 0))
+
         # Фрейм для графика
         self.graph_frame = tk.Frame(self.main_frame, bg="#2E2E2E")
         self.graph_frame.pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -149,6 +207,28 @@ class CSVGraphApp:
         self.slider.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5)
         self.slider_value_label = tk.Label(self.nav_frame, text="", bg="#2E2E2E", fg="white")
         self.slider_value_label.pack(side=tk.LEFT, padx=5)
+        # Масштаб: сколько seq в окне (большие окна рисуются растром)
+        self.zoom_in_button = tk.Button(self.nav_frame, text="+", command=self.zoom_in,
+                                        font=self.button_font, bg="#555555", fg="white", relief=tk.FLAT)
+        self.zoom_in_button.pack(side=tk.RIGHT, padx=5)
+        self.zoom_label = tk.Label(self.nav_frame, text="", bg="#2E2E2E", fg="white")
+        self.zoom_label.pack(side=tk.RIGHT, padx=5)
+        self.zoom_out_button = tk.Button(self.nav_frame, text="−", command=self.zoom_out,
+                                         font=self.button_font, bg="#555555", fg="white", relief=tk.FLAT)
+        self.zoom_out_button.pack(side=tk.RIGHT, padx=5)
+
+        # Переход к seq (бинарный поиск по индексу) и к соседним lost / recovered seq
+        self.jump_frame = tk.Frame(self.root, bg="#2E2E2E")
+        self.jump_frame.pack(fill=tk.X, padx=10, pady=(0, 5))
+        tk.Label(self.jump_frame, text="Seq:", font=self.font, bg="#2E2E2E", fg="white").pack(side=tk.LEFT)
+        self.seq_entry = tk.Entry(self.jump_frame, width=14, font=self.font, bg="#555555", fg="white",
+                                  insertbackground="white", relief=tk.FLAT)
+        self.seq_entry.pack(side=tk.LEFT, padx=5)
+        self.seq_entry.bind("<Return>", self.on_seq_entry)
+        for text, state, forward in (("◀ Lost", STATE_LOST, False), ("Lost ▶", STATE_LOST, True),
+                                     ("◀ Recovered", STATE_RESENT, False), ("Recovered ▶", STATE_RESENT, True)):
+            tk.Button(self.jump_frame, text=text, command=functools.partial(self.jump_to_state, state, forward),
+                      font=self.button_font, bg="#555555", fg="white", relief=tk.FLAT).pack(side=tk.LEFT, padx=5)
 
         # Фрейм для сводной таблицы
         self.summary_frame = tk.Frame(self.main_frame, bg="#2E2E2E", height=50)
@@ -159,6 +239,14 @@ class CSVGraphApp:
         self.figure, self.ax = plt.subplots(figsize=(8, 4), facecolor="#2E2E2E")
         self.canvas = FigureCanvasTkAgg(self.figure, master=self.graph_frame)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        # Фигура обзорной полосы отдельная: её перерисовка не трогает основной график
+        self.overview_figure, overview_ax = plt.subplots(figsize=(8, 0.5), facecolor="#2E2E2E")
+        self.overview_figure.subplots_adjust(left=0.01, right=0.99, top=0.95, bottom=0.05)
+        self.overview = OverviewView(overview_ax)
+        self.overview_canvas = FigureCanvasTkAgg(self.overview_figure, master=self.overview_frame)
+        self.overview_canvas.get_tk_widget().config(height=50)
+        self.overview_canvas.get_tk_widget().pack(fill=tk.X, expand=True)
+        self.overview_canvas.mpl_connect("button_press_event", self.on_overview_click)
         # Панель инструментов
         self.toolbar = NavigationToolbar2Tk(self.canvas, self.toolbar_frame, pack_toolbar=False)
         self.toolbar.pack(side=tk.TOP, fill=tk.X)
@@ -171,375 +259,371 @@ class CSVGraphApp:
         self.tooltip_label.pack(padx=5, pady=5)
 
         # Выделение при hover
-        self.face_colors = {}
         self.tooltip_window = None
         self.tooltip_label = None
         self.last_patch = None
         self.update_interval = 0  # 100 мс
         self.last_update_time = 0
-        self.norm_tooltips = []
-        self.norm_collection = None
-        self.nack_tooltips = []
-        self.nack_collection = None
-        self.nack_points_collection = None
-        self.nack_lines = []
-        self.frame_collection = None
-        self.frame_tooltips = []
-        self.seq_info: dict = {}  # агрегированная информация по seq
-        self.generated_color = 'lime'
-        self.un_generated_color = 'orangered'
+        self.TOOLTIP_CACHE_SIZE = 1024
+        self.tooltip_text = functools.lru_cache(maxsize=self.TOOLTIP_CACHE_SIZE)(self._build_tooltip_text)
+        self.seq_store = None  # агрегированная информация по seq (seqStore.SeqInfoStore)
         self.last_event = None
-        self.all_seq = None
-        self.isLoadTable = False
+        self.seq_index = None  # seqStore.SeqIndex, строится один раз на загрузку
+        self.nack_index = None  # nackIndex.NackIndex, интервалы NACK в позициях seq_index
         self.HOVER_UPDATE_INTERVAL = 0.1  # 100 мс
         self.highlighted_object = None
         self.hover_job = None
 
-        self.data = None  # данные CSV
+        self.data = None  # данные CSV (csvLoader.CaptureData)
+        self.capture = None  # текущий LoadedCapture
+        self.previous_capture = None  # набор данных до начала загрузки (для отмены после первой отрисовки)
         self.canvas.mpl_connect("motion_notify_event", self.on_hover)
         self.canvas.mpl_connect("figure_leave_event", self.on_leave)
+        self.canvas.mpl_connect("draw_event", lambda _: self.view.capture_background())
 
-        self.colors = {
-            -1: "#FF0000",  # lost – красный
-            1: "#00FF00",  # received – зеленый
-            2: "#FFD700"  # resend – желтый
-        }
-
-        # Оптимизация отрисовки
+        # Оптимизация отрисовки: artist-ы окна создаются один раз и обновляются на месте
         self.square_width = 0.8
         self.gap = 0.2
+        self.view = TimelineView(self.ax, self.square_width, self.gap)
+        # Ось режима времени лежит на месте основной и видна только в этом режиме
+        self.time_ax = self.figure.add_axes(self.ax.get_position(), facecolor=self.ax.get_facecolor())
+        self.time_ax.set_visible(False)
+        self.time_view = TimeAxisView(self.time_ax, self.view.colors)
+        self.canvas.mpl_connect("button_press_event", self.on_canvas_click)
+        self.time_mode = False
+        self.time_index = None  # timeIndex.TimeIndex, строится при первом обращении к времени
+        self.time_window = None  # (t0, t1) окна режима времени, мс
+        self.MIN_TIME_SPAN = 10  # мс
 
         # Параметры lazy rendering
         self.visible_count = 200
         self.current_start = 0
+        self.MIN_VISIBLE_COUNT = 50
+        self.MAX_VISIBLE_COUNT = 204_800
+        self.ZOOM_FACTOR = 2
+        self.zoom_label.config(text=f"Окно: {self.visible_count}")
+        self.focus_position = None  # позиция seq последнего перехода (поиск, lost / recovered)
 
     # ============================================================================
     # Методы управления (слайдер, стрелки, обновление диапазона)
     # ============================================================================
 
     def slider_update(self, val):
-        self.current_start = int(val)
-        self.render_visible_range()
-        # Обновляем метку, показывающую реальный seq первого norm-объекта
-        if self.all_seq:
-            self.slider_value_label.config(text=f"Seq: {self.all_seq[self.current_start]}")
+        new_start = int(float(val))
+        if self.time_mode:
+            t0, t1 = self.time_window
+            if new_start != t0:
+                self.show_time_range(new_start, new_start + t1 - t0)
+            return
+        if new_start == self.current_start:
+            return  # Значение выставлено программно из go_to – окно уже отрисовано
+        self.go_to(new_start)
 
 
     def move_left(self):
-        new_start = max(0, self.current_start - self.visible_count)
-        self.current_start = new_start
-        self.slider.set(new_start)
-        self.render_visible_range()
+        if self.time_mode:
+            t0, t1 = self.time_window
+            self.show_time_range(2 * t0 - t1, t0)
+            return
+        self.go_to(self.current_start - self.visible_count)
 
 
     def move_right(self):
         if self.data is None:
             return
-        total = len(self.all_seq)
-        new_start = min(total - self.visible_count, self.current_start + self.visible_count)
-        self.current_start = new_start
-        self.slider.set(new_start)
+        if self.time_mode:
+            t0, t1 = self.time_window
+            self.show_time_range(t1, 2 * t1 - t0)
+            return
+        self.go_to(self.current_start + self.visible_count)
+
+
+    def go_to(self, new_start):
+        """Переходит к окну, начинающемуся с позиции new_start: одна отрисовка на переход."""
+        if self.seq_index is None or len(self.seq_index) == 0:
+            return
+        self.current_start = max(0, min(new_start, len(self.seq_index) - self.visible_count))
+        self.slider.set(self.current_start)
+        # Обновляем метку, показывающую реальный seq первого norm-объекта
+        self.slider_value_label.config(text=f"Seq: {self.seq_index.seqs[self.current_start]}")
         self.render_visible_range()
 
-    def get_all_seq(self):
-        """Возвращает отсортированный список всех seq через `numpy` (в 5-10 раз быстрее)."""
-        seq_column = self.data["seq_list"].values  # Получаем столбец как `numpy` массив
-        flat_seq = np.concatenate(seq_column)  # Разворачиваем списки в один массив
-        return sorted(set(flat_seq))  # Убираем дубликаты и сортируем
 
+    def show_position(self, position):
+        """Открывает окно seq с позицией position в центре (одна отрисовка) и выделяет её."""
+        self.focus_position = position
+        start = position - self.visible_count // 2
+        if self.time_mode:
+            # Выход из режима времени сам отрисует окно с current_start
+            self.current_start = start
+            self.set_time_mode(False)
+        else:
+            self.go_to(start)
+        self.highlighted_object = ("norm", position - self.current_start)
+        self.view.show_highlight(*self.highlighted_object)
 
-    def cache_seq_info(self, all_seq):
-        """Кеширует seq_info при первой загрузке. Оптимизировано для скорости."""
-        if self.seq_info:
-            return  # Уже закешировано, ничего не делаем
 
-        self.seq_info = {seq: {"final_state": 1, "events": []} for seq in all_seq}
-        normal_df = self.data[self.data["type"] != 3]
+    def focus_reference(self):
+        """Позиция, от которой ищутся соседние lost / recovered: последний переход, если он в окне, иначе центр окна."""
+        if self.focus_position is not None and 0 <= self.focus_position - self.current_start < self.visible_count:
+            return self.focus_position
+        return self.current_start + self.visible_count // 2
 
-        # Используем itertuples (быстрее, чем iterrows)
-        for row in normal_df.itertuples(index=False, name=None):
-            timestamp, seq_list, event_type, count = row[0], row[5], row[2], row[6]
-            for seq in seq_list:
-                if seq in self.seq_info:
-                    self.seq_info[seq]["events"].append({
-                        "timestamp": timestamp,
-                        "type": event_type,
-                        "count": count
-                    })
-                    self._update_final_state(seq, event_type)
 
+    def on_seq_entry(self, _=None):
+        """Переход к seq из поля поиска; если такого seq нет – к ближайшему следующему."""
+        if self.seq_index is None or len(self.seq_index) == 0:
+            return
+        try:
+            seq = int(self.seq_entry.get().strip())
+        except ValueError:
+            print(f"[ERROR] Некорректный seq: {self.seq_entry.get()!r}")
+            return
+        position = self.seq_index.position(seq)
+        if position is None:
+            position = min(int(self.seq_index.positions(seq)), len(self.seq_index) - 1)
+        self.show_position(position)
 
-    def _update_final_state(self, seq, event_type):
-        """Обновляет final_state для события."""
-        if event_type == 2:
-            self.seq_info[seq]["final_state"] = 2
-        elif event_type == -1 and self.seq_info[seq]["final_state"] != 2:
-            self.seq_info[seq]["final_state"] = -1
-        elif event_type == 1 and self.seq_info[seq]["final_state"] == 1:
-            self.seq_info[seq]["final_state"] = 1
 
+    def jump_to_state(self, state, forward):
+        """Переход к следующему (forward) или предыдущему seq с итоговым состоянием state – O(log n)."""
+        if self.seq_store is None or len(self.seq_store) == 0:
+            return
+        reference = self.focus_reference()
+        if forward:
+            position = self.seq_store.next_state(state, reference)
+        else:
+            position = self.seq_store.previous_state(state, reference)
+        if position is not None:
+            self.show_position(position)
 
-    def draw_normal_events(self, visible_seq, seq_to_index):
-        """Отрисовывает нормальные события."""
-        norm_rects, norm_colors = [], []
-        self.norm_tooltips = []
 
-        for seq in visible_seq:
-            idx = seq_to_index.get(seq)
-            if idx is None:
-                continue
+    def cache_seq_info(self):
+        """Строит SeqInfoStore при первой загрузке, если загрузчик его ещё не построил."""
+        if self.seq_store is not None:
+            return  # Уже закешировано, ничего не делаем
 
-            x_coord = idx * (self.square_width + self.gap)
-            norm_rects.append(plt.Rectangle((x_coord, 0.5), self.square_width, 0.5))
-            norm_colors.append(self.colors.get(self.seq_info[seq]["final_state"], "#FFFFFF"))
-            self.norm_tooltips.append(self.get_tooltip_text(seq))
-
-        if self.norm_collection:
-            self.norm_collection.remove()
-        self.norm_collection = PatchCollection(norm_rects, facecolors=norm_colors, edgecolors='none', picker=True)
-        self.ax.add_collection(self.norm_collection)
-
-
-    def draw_nack_events(self, seq_to_index):
-        """Отрисовывает NACK-события с корректным растяжением за границы."""
-        nack_df = self.data[self.data["type"] == 3]
-        nack_boxes = []
-        nack_tooltips = []
-        nack_points = []
-        lines = []  # Для вычисления вертикального сдвига
-
-        rect_height = 0.07
-        line_spacing = 0.01
-        first_line_offset = 0.075
-
-        # Границы видимой области
-        min_visible_seq = min(seq_to_index.keys(), default=None)
-        max_visible_seq = max(seq_to_index.keys(), default=None)
-        if min_visible_seq is None or max_visible_seq is None:
-            return  # Нет данных для отрисовки
-
-        for _, row in nack_df.iterrows():
-            seq_list = row["seq_list"]
-            formatted_time = row["timestamp"].strftime('%Y-%m-%d %H:%M:%S')
-            milliseconds = int(row["timestamp"].microsecond / 1000)
-            formatted_time += f":{milliseconds:03d}"
-
-            # Определяем реальные границы NACK
-            min_seq = min(seq_list)
-            max_seq = max(seq_list)
-
-            # Определяем начало и конец отрисовки
-            start_seq = max(min_seq, min_visible_seq)  # Если NACK выходит влево – тянем с начала области
-            end_seq = max_seq  # Если NACK уходит вправо – пусть продолжается
-
-            # Если конец за границами видимой области, то продолжаем тянуть до конца текущей области
-            if end_seq > max_visible_seq:
-                end_seq = max_visible_seq
-
-            min_idx = seq_to_index.get(start_seq)
-            max_idx = seq_to_index.get(end_seq)
-            if min_idx is None or max_idx is None:
-                continue
+        self.seq_store = SeqInfoStore.from_capture(self.data)
 
-            start_interval = min_idx
-            end_interval = max_idx
-            line_index = None
-
-            # Проверяем пересечение с уже занятыми линиями
-            for i, intervals in enumerate(lines):
-                if all(not intervals_overlap(start_interval, end_interval, a, b) for (a, b) in intervals):
-                    line_index = i
-                    intervals.append((start_interval, end_interval))
-                    break
-
-            if line_index is None:
-                line_index = len(lines)
-                lines.append([(start_interval, end_interval)])
-
-            # Корректируем x-координаты, растягивая NACK на всю видимую область
-            x_start = min_idx * (self.square_width + self.gap)
-            x_end = max_idx * (self.square_width + self.gap) + self.square_width
-            width_rect = x_end - x_start
-
-            # Расположение прямоугольника по вертикали
-            rect_y = 0.5 - first_line_offset - line_index * (rect_height + line_spacing)
-
-            # Создание прямоугольника для NACK
-            box = plt.Rectangle((x_start, rect_y), width_rect, rect_height, color="cyan", alpha=0.7)
-            box.tooltip = f"NACK: {seq_list}\n Timestamp: {formatted_time}"
-            nack_boxes.append(box)
-            nack_tooltips.append(box.tooltip)
-
-            # Точки (расположены строго под seq)
-            for s in seq_list:
-                idx = seq_to_index.get(s)
-                if idx is None:
-                    continue
-                x_center = idx * (self.square_width + self.gap) + self.square_width / 2
-                y_center = rect_y + rect_height / 2
-                nack_points.append((x_center, y_center))
 
-        # Обновляем уровни NACK, чтобы update_axes получил актуальное значение
-        self.nack_lines = lines
-        # Обновляем коллекцию NACK (боксы и точки)
-        self._update_nack_collection(nack_boxes, nack_tooltips, nack_points)
+    @profile_time
+    @profile_detailed
+    def render_visible_range(self):
+        if self.data is None:
+            return
+        if self.time_mode:
+            self.render_time_range()
+            return
 
+        if self.seq_index is None or len(self.seq_index) == 0:
+            return
+        visible_seq = self.seq_index.window(self.current_start, self.visible_count)
 
-    def _update_nack_collection(self, nack_boxes, nack_tooltips, nack_points):
-        """Обновляет коллекцию NACK-событий, корректно перерисовывая точки."""
+        # 1. Кеширование seq_info
+        self.cache_seq_info()
 
-        # Удаляем старые NACK-боксы
-        if self.nack_collection:
-            self.nack_collection.remove()
-            self.nack_collection = None
+        # 2. Нормальные события, NACK, Frame-боксы и оси – обновление artist-ов на месте
+        self.view.render(self.seq_store, self.nack_index, self.data, self.current_start, visible_seq)
+        self.overview.set_viewport(self.current_start, len(visible_seq))
+        self.overview_canvas.draw_idle()
 
-        if nack_boxes:
-            self.nack_collection = PatchCollection(nack_boxes, facecolors="cyan", alpha=0.7, edgecolor="none",
-                                                   picker=True)
-            self.ax.add_collection(self.nack_collection)
-            self.nack_tooltips = nack_tooltips
-        else:
-            self.nack_collection = None
+        # 3. Обновление сводных таблиц (O(1) по префиксным суммам – можно на каждый сдвиг окна)
+        self.update_summary_table()
 
-        # Удаляем старые NACK-точки
-        if self.nack_points_collection:
-            self.nack_points_collection.remove()
-            self.nack_points_collection = None
+        # 4. Обновление графика
+        self.canvas.draw_idle()
 
-        # Добавляем новые точки
-        if nack_points:
-            x, y = zip(*nack_points) if nack_points else ([], [])
-            self.nack_points_collection = self.ax.scatter(x, y, s=25, marker="o", color="red", zorder=3)
-        else:
-            self.nack_points_collection = None
-
-
-    def draw_frame_boxes(self, visible_seq):
-        """Отрисовывает Frame-боксы."""
-        frame_boxes, frame_colors, frame_tooltips = [], [], []
-        block_size = 10
-        for i in range(0, len(visible_seq), block_size):
-            block = visible_seq[i:i + block_size]
-            block_state = "Generated"
-            block_color = self.generated_color
-
-            for s in block:
-                if self.seq_info.get(s, {}).get("final_state") == -1:
-                    block_state = "UnGenerated"
-                    block_color = self.un_generated_color
-                    break
-
-            x_start = i * (self.square_width + self.gap)
-            block_width = len(block) * (self.square_width + self.gap)
-
-            rect = plt.Rectangle((x_start, 1.1), block_width, 0.2)
-            frame_boxes.append(rect)
-            frame_colors.append(block_color)
-            frame_tooltips.append(f"Frame: {block_state} ({block[0]} - {block[-1]})")
-
-            self.ax.text(x_start + block_width / 2, 1.2, f"Frame: {block_state}", color="white",
-                         fontsize=10, ha="center", va="center", zorder=2)
-
-        self._update_frame_collection(frame_boxes, frame_colors, frame_tooltips)
-
-
-    def _update_frame_collection(self, frame_boxes, frame_colors, frame_tooltips):
-        """Обновляет коллекцию Frame-боксов."""
-        if self.frame_collection:
-            self.frame_collection.remove()
-        if frame_boxes:
-            self.frame_collection = PatchCollection(frame_boxes, facecolors=frame_colors, alpha=0.5, edgecolor="none",
-                                                    picker=True)
-            self.ax.add_collection(self.frame_collection)
-            self.frame_tooltips = frame_tooltips
-        else:
-            self.frame_collection = None
-
-
-    def update_axes(self, visible_seq, lines):
-        """Обновляет оси графика с динамическим нижним пределом для nack-событий."""
-        total_visible = len(visible_seq)
-        total_width = total_visible * (self.square_width + self.gap)
-
-        # Если nack-события есть, вычисляем нижнюю границу оси Y
-        if len(lines) > 0:
-            max_nack_level = len(lines)
-            lowest_line_index = max_nack_level - 1
-            rect_height = 0.07
-            line_spacing = 0.01
-            first_line_offset = 0.075
-            # Координата y для самой верхней точки нижней nack-линии (rect_y)
-            lowest_y = 0.5 - first_line_offset - lowest_line_index * (rect_height + line_spacing)
-            margin = 0.05  # Дополнительный запас
-            min_y = lowest_y - margin
-        else:
-            # Если нет nack, нижняя граница чуть ниже нормальных объектов
-            min_y = 0.5 - 0.05
 
-        self.ax.set_xlim(0, total_width)
-        self.ax.set_ylim(min_y, 1.5)
-        self.ax.get_yaxis().set_visible(False)
+    def setup_slider(self):
+        """Настраивает слайдер по индексам (а не по значениям seq); вызывается один раз на загрузку."""
+        if self.seq_index is None or len(self.seq_index) == 0:
+            return  # Если данных нет, ничего не делаем
+        if self.time_mode:
+            self.setup_time_slider()
+            return
+
+        slider_from = 0
+        slider_to = max(0, len(self.seq_index) - self.visible_count)
+        self.slider.config(from_=slider_from, to=slider_to, resolution=1)
+        self.slider.set(self.current_start)
+        self.slider_value_label.config(text=f"Seq: {self.seq_index.seqs[self.current_start]}")
+        if not self.slider.winfo_ismapped():
+            self.slider.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5)
 
-        x_ticks = [i * (self.square_width + self.gap) + self.square_width / 2 for i in range(total_visible)]
-        x_labels = [str(seq) for seq in visible_seq]
 
-        self.ax.set_xticks(x_ticks)
-        self.ax.set_xticklabels(x_labels, color="white", fontsize=10, rotation=90)
+    def zoom_in(self):
+        if self.time_mode:
+            self.zoom_time(1 / self.ZOOM_FACTOR)
+            return
+        self.set_visible_count(self.visible_count // self.ZOOM_FACTOR)
 
 
-    def render_visible_range(self):
-        if self.data is None:
+    def zoom_out(self):
+        if self.time_mode:
+            self.zoom_time(self.ZOOM_FACTOR)
             return
+        self.set_visible_count(self.visible_count * self.ZOOM_FACTOR)
+
 
-        self.all_seq = self.get_all_seq()
-        if not self.all_seq:
+    def set_visible_count(self, count):
+        """Меняет размер окна, сохраняя его центр; окна больше RASTER_THRESHOLD рисуются растром."""
+        count = max(self.MIN_VISIBLE_COUNT, min(count, self.MAX_VISIBLE_COUNT))
+        if count == self.visible_count:
             return
+        center = self.current_start + self.visible_count // 2
+        self.visible_count = count
+        self.zoom_label.config(text=f"Окно: {count}")
+        if self.seq_index is None or len(self.seq_index) == 0:
+            return
+        # Диапазон слайдера зависит от размера окна
         self.setup_slider()
-        visible_seq = self.all_seq[self.current_start:self.current_start + self.visible_count]
-        seq_to_index = {seq: i for i, seq in enumerate(visible_seq)}
+        self.go_to(center - count // 2)
 
-        # 1. Кеширование seq_info
-        self.cache_seq_info(self.all_seq)
 
-        # 2. Отрисовка нормальных событий
-        self.draw_normal_events(visible_seq, seq_to_index)
+    def on_overview_click(self, event):
+        """Клик по обзорной полосе: центрирует окно timeline на выбранной позиции."""
+        if event.inaxes is not self.overview.ax or event.xdata is None:
+            return
+        position = self.overview.position_at(event.xdata)
+        if self.time_mode:
+            # В режиме времени окно центрируется на первом событии ближайшего seq с событиями
+            offsets = self.seq_store.event_offsets
+            first_event = min(int(offsets[position]), len(self.seq_store.event_timestamps) - 1)
+            if first_event >= 0:
+                t0, t1 = self.time_window
+                center = int(self.seq_store.event_timestamps[first_event])
+                self.show_time_range(center - (t1 - t0) // 2, center + (t1 - t0) // 2)
+            return
+        self.go_to(position - self.visible_count // 2)
+
+    # ============================================================================
+    # Режим оси времени
+    # ============================================================================
 
-        # 3. Отрисовка NACK-событий
-        self.draw_nack_events(seq_to_index)
+    def ensure_time_index(self):
+        """TimeIndex текущего захвата (строится при первом обращении, O(n log n) один раз)."""
+        if self.time_index is None and self.data is not None:
+            self.time_index = TimeIndex.from_capture(self.data)
+        return self.time_index
 
-        # 4. Отрисовка Frame-боксов
-        self.draw_frame_boxes(visible_seq)
 
-        # 5. Обновление осей
-        self.update_axes(visible_seq, self.nack_lines)
+    def toggle_time_mode(self):
+        """Переключает основную ось между окном по seq и окном по времени."""
+        self.set_time_mode(self.time_mode_var.get())
 
-        # 6. Обновление сводной таблицы
-        if not self.isLoadTable:
-            self.update_summary_table()
-            self.isLoadTable = True
 
-        # 7. Обновление графика
+    def set_time_mode(self, enabled):
+        """
+         /**
+          * Включает или выключает режим оси времени.
+          * Окно времени при включении покрывает события текущего окна seq.
+          * @param enabled Новый режим.
+          */
+        """
+        time_index = self.ensure_time_index() if enabled else None
+        if enabled and (time_index is None or len(time_index) == 0):
+            enabled = False
+        self.time_mode_var.set(enabled)
+        if enabled == self.time_mode:
+            return
+        self.time_mode = enabled
+        self.remove_tooltip()
+        self.view.hide_highlight()
+        self.highlighted_object = None
+        self.ax.set_visible(not enabled)
+        self.time_ax.set_visible(enabled)
+        if not enabled:
+            self.setup_slider()
+            self.go_to(self.current_start)
+            return
+        stop = min(self.current_start + self.visible_count, len(self.seq_store))
+        offsets = self.seq_store.event_offsets
+        times = self.seq_store.event_timestamps[offsets[self.current_start]:offsets[stop]]
+        if len(times):
+            self.time_window = (int(times.min()), int(times.max()) + 1)
+        else:
+            self.time_window = (time_index.start, time_index.end + 1)
+        self.show_time_range(*self.time_window)
+
+
+    def setup_time_slider(self):
+        """Слайдер режима времени – начало окна в мс, от первого события до последнего."""
+        t0, t1 = self.time_window
+        self.slider.config(from_=self.time_index.start,
+                           to=max(self.time_index.start, self.time_index.end + 1 - (t1 - t0)), resolution=1)
+        self.slider.set(t0)
+        self.slider_value_label.config(text=f"Время: {format_timestamp_ms(t0, self.seq_store.timezone)}")
+
+
+    def show_time_range(self, t0, t1):
+        """Показывает окно времени [t0, t1), сдвинутое в пределы захвата."""
+        time_index = self.ensure_time_index()
+        span = min(max(int(t1) - int(t0), self.MIN_TIME_SPAN), time_index.end + 1 - time_index.start)
+        span = max(span, self.MIN_TIME_SPAN)
+        t0 = max(time_index.start, min(int(t0), time_index.end + 1 - span))
+        self.time_window = (t0, t0 + span)
+        self.setup_time_slider()
+        self.render_time_range()
+
+
+    def zoom_time(self, factor):
+        """Меняет длительность окна времени в factor раз, сохраняя его центр."""
+        t0, t1 = self.time_window
+        span = int((t1 - t0) * factor)
+        center = (t0 + t1) // 2
+        self.show_time_range(center - span // 2, center - span // 2 + span)
+
+
+    def render_time_range(self):
+        """Отрисовка окна времени: выборки по searchsorted, стоимость не зависит от длины окна."""
+        t0, t1 = self.time_window
+        self.time_view.render(self.time_index, t0, t1, self.seq_store.timezone)
         self.canvas.draw_idle()
 
 
-    def setup_slider(self):
-        """Создаёт слайдер, который работает по индексам, а не по значениям seq."""
-        if not self.all_seq:
-            return  # Если данных нет, ничего не делаем
+    def jump_to_time(self, t):
+        """Окно seq, начинающееся с seq первого события не раньше t (в режиме времени – окно с начала t)."""
+        if self.time_mode:
+            t0, t1 = self.time_window
+            self.show_time_range(t, t + t1 - t0)
+            return
+        seq = self.ensure_time_index().seq_at(t)
+        position = self.seq_index.position(seq) if seq is not None else None
+        if position is not None:
+            self.go_to(position)
 
-        slider_from = 0
-        slider_to = max(0, len(self.all_seq) - self.visible_count)
-        self.slider.config(from_=slider_from, to=slider_to, resolution=1)
-        self.slider.set(self.current_start)
-        self.slider_value_label.config(text=f"Seq: {self.all_seq[self.current_start]}")
-        if not self.slider.winfo_ismapped():
-            self.slider.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5)
+
+    def on_time_entry(self, _=None):
+        """Разбирает поле времени: 'T' – переход ко времени, 't0 .. t1' – показать интервал в режиме времени."""
+        time_index = self.ensure_time_index()
+        if time_index is None or len(time_index) == 0:
+            return
+        try:
+            bounds = [parse_time(part, self.seq_store.timezone, time_index.start)
+                      for part in self.time_entry.get().split("..")]
+        except ValueError as e:
+            print(f"[ERROR] Не удалось разобрать время: {e}")
+            return
+        if len(bounds) == 1:
+            self.jump_to_time(bounds[0])
+        elif len(bounds) == 2 and bounds[1] > bounds[0]:
+            self.set_time_mode(True)
+            self.show_time_range(bounds[0], bounds[1])
+
+
+    def on_canvas_click(self, event):
+        """Двойной клик по оси времени открывает окно seq с событием в этот момент."""
+        if not self.time_mode or not event.dblclick or event.inaxes is not self.time_ax or event.xdata is None:
+            return
+        seq = self.time_index.seq_at(self.time_view.time_at(event.xdata))
+        position = self.seq_index.position(seq) if seq is not None else None
+        if position is not None:
+            self.show_position(position)
 
 
     def update_visible_range(self, new_start):
         """Обновляет отображаемый диапазон, устанавливая новый current_start и перерисовывая видимую область."""
-        self.current_start = new_start
-        self.render_visible_range()
+        self.go_to(new_start)
 
 
     def center_half_screen(self):
@@ -585,7 +669,18 @@ class CSVGraphApp:
         ttk.Checkbutton(check_frame, text="Show count", variable=self.check_vars["count"], style="TCheckbutton").pack(
             side=tk.LEFT, padx=5)
         for var in self.check_vars.values():
-            var.trace_add("write", lambda name, index, mode: self.update_visible_tooltip())
+            var.trace_add("write", lambda name, index, mode: self.on_check_vars_changed())
+
+
+    def on_check_vars_changed(self):
+        """Сбрасывает кеш tooltip-ов (их текст зависит от чекбоксов) и обновляет открытый tooltip."""
+        self.tooltip_text.cache_clear()
+        self.update_visible_tooltip()
+
+
+    def check_state(self):
+        """Текущее состояние чекбоксов – часть ключа кеша tooltip-ов."""
+        return tuple(var.get() for var in self.check_vars.values())
 
 
     def update_visible_tooltip(self):
@@ -608,183 +703,431 @@ class CSVGraphApp:
 
     def clear_graph(self):
         """Очищает график и все связанные коллекции перед построением нового графика."""
-        self.ax.clear()
-        # Сброс всех коллекций, если они используются
-        self.norm_collection = None
-        self.nack_collection = None
-        self.frame_collection = None
-        # Можно сбросить и другие переменные, связанные с предыдущей отрисовкой
-        self.norm_tooltips = []
-        self.nack_tooltips = []
-        self.frame_tooltips = []
-        self.seq_info = {}
+        # Artist-ы не пересоздаются: содержимое окна просто прячется
+        self.view.clear()
+        self.overview.clear()
+        self.highlighted_object = None
+        self.tooltip_text.cache_clear()
+        self.seq_store = None
         # Обновляем canvas, чтобы изменения отобразились
         self.canvas.draw()
+        self.overview_canvas.draw_idle()
 
 
     def load_csv(self):
         """
          /**
-          * Загружает CSV и проверяет наличие столбцов 'timestamp', 'seq', 'type'.
+          * Выбирает CSV и запускает его загрузку в фоновом потоке.
+          * Результат попадает в GUI только через опрос очереди в root.after (_poll_load).
           */
         """
-        file_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
+        if self.load_thread is not None:
+            return  # Загрузка уже идёт
+        file_path = filedialog.askopenfilename(filetypes=[
+            ("CSV files", "*.csv"),
+            ("Parquet / Arrow files", "*.parquet *.pq *.feather *.arrow *.ipc"),
+        ])
         if not file_path:
             return
+        self.start_load(file_path)
+
+
+    def start_load(self, file_path, follow=False):
+        """
+         /**
+          * Запускает загрузку файла в фоновом потоке.
+          * @param file_path Путь к файлу.
+          * @param follow Загрузить до последней полной строки и после загрузки включить слежение за файлом.
+          */
+        """
+        self.stop_follow()
+        self.follow_after_load = follow
+        self.load_cancel_event = threading.Event()
+        self.load_queue = queue.Queue()
+        load_queue, cancel_event = self.load_queue, self.load_cancel_event
+
+        def worker():
+            try:
+                capture = load_capture_cached(file_path, report=load_queue.put, cancel_event=cancel_event,
+                                              on_partial=lambda partial: load_queue.put(("partial", partial)),
+                                              first_paint_seqs=self.visible_count, complete_lines_only=follow)
+                if capture.load_stats is not None:
+                    save_load_report(file_path, capture.load_stats, len(capture.data))
+                load_queue.put(("done", capture))
+            except LoadCancelled:
+                load_queue.put(("cancelled", None))
+            except Exception as e:
+                load_queue.put(("error", e))
+
+        self.previous_capture = self.capture
+        self.show_load_progress()
+        self.load_thread = threading.Thread(target=worker, name="csv-loader", daemon=True)
+        self.load_thread.start()
+        self.root.after(self.LOAD_POLL_INTERVAL, self._poll_load)
+
+
+    def toggle_profiling(self, mode):
+        """Начинает или завершает сессию профилирования; состояние видно в заголовке окна."""
+        path = profile_session.toggle(mode, self.profile_dir)
+        if profile_session.active:
+            self.root.title(f"{self.title} – профилирование ({profile_session.mode})")
+        else:
+            self.root.title(self.title if path is None else f"{self.title} – профиль: {path}")
+
+
+    def show_metrics_panel(self):
+        """Открывает (или поднимает) окно статистики задержек; таблица обновляется раз в секунду."""
+        if self.metrics_window is not None:
+            self.metrics_window.deiconify()
+            self.metrics_window.lift()
+            return
+        self.metrics_window = tk.Toplevel(self.root, bg="#2E2E2E")
+        self.metrics_window.title("Метрики")
+        self.metrics_window.protocol("WM_DELETE_WINDOW", self.close_metrics_panel)
+        buttons = tk.Frame(self.metrics_window, bg="#2E2E2E")
+        buttons.pack(side=tk.TOP, fill=tk.X)
+        tk.Button(buttons, text="Сохранить JSON", command=self.save_metrics, font=self.button_font,
+                  bg="#555555", fg="white", relief=tk.FLAT).pack(side=tk.LEFT, padx=5, pady=5)
+        tk.Button(buttons, text="Сбросить", command=registry.reset, font=self.button_font,
+                  bg="#555555", fg="white", relief=tk.FLAT).pack(side=tk.LEFT, padx=5, pady=5)
+        self.metrics_text = tk.Text(self.metrics_window, width=110, height=16, font=("Consolas", 10),
+                                    bg="#1E1E1E", fg="white", relief=tk.FLAT)
+        self.metrics_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self._refresh_metrics_panel()
+
+
+    def _refresh_metrics_panel(self):
+        """Перерисовывает таблицу метрик, пока окно открыто."""
+        self.metrics_job = None
+        if self.metrics_window is None:
+            return
+        self.metrics_text.config(state=tk.NORMAL)
+        self.metrics_text.delete("1.0", tk.END)
+        self.metrics_text.insert(tk.END, registry.format_table())
+        self.metrics_text.config(state=tk.DISABLED)
+        self.metrics_job = self.root.after(self.METRICS_REFRESH_INTERVAL, self._refresh_metrics_panel)
+
+
+    def close_metrics_panel(self):
+        """Закрывает окно метрик (замеры продолжаются)."""
+        if self.metrics_job is not None:
+            self.root.after_cancel(self.metrics_job)
+            self.metrics_job = None
+        self.metrics_window.destroy()
+        self.metrics_window = None
+        self.metrics_text = None
+
+
+    def save_metrics(self):
+        """Сохраняет текущие метрики в выбранный JSON-файл."""
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON", "*.json")])
+        if not path:
+            return
         try:
-            df = pd.read_csv(file_path)
-            seq_lists = []
-            for row in df.itertuples(index=False, name="Row"):
-                seq_val = getattr(row, 'seq')
-                type_val = getattr(row, 'type')
-                seq_lists.append(self.parse_seq_fast(seq_val, type_val))
-            df["seq_list"] = seq_lists
-            if not {"timestamp", "seq", "type"}.issubset(df.columns):
-                raise ValueError("CSV не содержит столбцы: timestamp, seq, type")
-            df["type"] = df["type"].astype(float)
-            if "count" not in df.columns:
-                df["count"] = 1
-            df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms", errors="coerce", utc=True).dt.tz_convert(get_system_timezone())
-            df = df.dropna(subset=["timestamp"])
-            self.data = df
-            # Проверяем, что файл file_path - строка
-            if isinstance(file_path, str):
-                filename = os.path.basename(file_path)
-                self.file_label.config(text=f"Выбран файл: {filename}")
-            else:
-                self.file_label.config(text="Ошибка: Некорректный путь к файлу")
-            # Отображаем основной контейнер, если он ещё не показан
-            if not self.main_frame.winfo_ismapped():
-                self.main_frame.pack(fill=tk.BOTH, expand=True)
-            # Очищаем график перед построением нового
-            self.clear_graph()
-            self.render_visible_range()
+            registry.dump_json(path)
+        except OSError as e:
+            print(f"[ERROR] Не удалось сохранить метрики: {e}")
+
+
+    def clear_file_cache(self):
+        """Удаляет кеш текущего файла: следующее открытие заново разберёт CSV."""
+        if self.capture is None or not isinstance(self.capture.file_path, str):
+            return
+        filename = os.path.basename(self.capture.file_path)
+        if clear_cache(self.capture.file_path):
+            self.file_label.config(text=f"Выбран файл: {filename} (кеш удалён)")
+        else:
+            self.file_label.config(text=f"Выбран файл: {filename} (кеша нет)")
+
+
+    def toggle_follow(self):
+        """Включает или выключает слежение за текущим файлом."""
+        if not self.follow_var.get():
+            self.stop_follow()
+            return
+        if self.capture is None or not self.capture.complete or self.load_thread is not None:
+            self.follow_var.set(False)
+            return
+        try:
+            self.tail = CaptureTail(self.capture)
+        except TailReset as e:
+            # Файл был загружен с недописанной последней строкой: перезагружаем до последней полной строки
+            print(f"[DEBUG] {e}: перезагрузка для слежения")
+            self.start_load(self.capture.file_path, follow=True)
+            return
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] Слежение за файлом невозможно: {e}")
+            self.follow_var.set(False)
+            return
+        self.follow_job = self.root.after(self.TAIL_POLL_INTERVAL, self._poll_tail)
+
+
+    def stop_follow(self):
+        """Останавливает слежение за файлом."""
+        if self.follow_job is not None:
+            self.root.after_cancel(self.follow_job)
+            self.follow_job = None
+        self.tail = None
+        self.follow_var.set(False)
+
+
+    def _poll_tail(self):
+        """
+         /**
+          * Опрос дописываемого файла (в потоке Tk: обновление меняет массивы захвата на месте).
+          * Новые строки добавляются в индексы инкрементально, окно и сводка обновляются без clear_graph.
+          */
+        """
+        self.follow_job = None
+        if self.tail is None:
+            return
+        try:
+            capture = self.tail.poll()
+        except TailReset as e:
+            self.stop_follow()
+            self.file_label.config(text=f"{e}: загрузите файл заново")
+            return
         except Exception as e:
-            self.file_label.config(text=f"Ошибка: {e}")
-
-    @staticmethod
-    def parse_seq_fast(seq, event_type):
-        """
-        Быстрый парсер для столбца seq.
-        Для event_type == 3 – возвращает список чисел, иначе – только первый элемент.
-        """
-        if pd.isna(seq):
-            return []
-        # Если seq – строка, убираем лишние пробелы
-        if isinstance(seq, str):
-            seq = seq.strip()
-            # Если строка выглядит как список: "[...]"
-            if seq.startswith("[") and seq.endswith("]"):
-                try:
-                    parsed = ast.literal_eval(seq)
-                except Exception as e:
-                    print(f"[DEBUG] Ошибка парсинга: {seq}: {e}")
-                    return []
-                return [int(x) for x in parsed] if event_type == 3 else ([int(parsed[0])] if parsed else [])
-            # Если строка содержит запятую, разделяем по ней
-            elif "," in seq:
-                try:
-                    parts = [part.strip() for part in seq.split(",")]
-                    numbers = [int(part) for part in parts if part]
-                except Exception as e:
-                    print(f"[DEBUG] Ошибка разделения: {seq}: {e}")
-                    return []
-                return numbers if event_type == 3 else numbers[:1]
-            else:
-                try:
-                    return [int(seq)]
-                except Exception as e:
-                    print(f"[DEBUG] Ошибка преобразования: {seq}: {e}")
-                    return []
-        # Если уже число или список – пытаемся привести к числам
-        elif isinstance(seq, list):
-            if event_type == 3:
-                try:
-                    return [int(x) for x in seq]
-                except Exception as e:
-                    print(f"[DEBUG] Ошибка при обработке списка: {seq}: {e}")
-                    return []
-            else:
-                try:
-                    return [int(seq[0])] if seq else []
-                except Exception as e:
-                    print(f"[DEBUG] Ошибка при обработке списка: {seq}: {e}")
-                    return []
+            print(f"[ERROR] Ошибка при чтении новых строк: {e}")
+            self.stop_follow()
+            return
+        if capture is not None:
+            self.apply_tail_capture(capture)
+        self.follow_job = self.root.after(self.TAIL_POLL_INTERVAL, self._poll_tail)
+
+
+    @profile_detailed
+    def apply_tail_capture(self, capture):
+        """Подменяет захват дополненным; если окно было в конце данных, оно следует за новыми seq."""
+        at_end = self.current_start + self.visible_count >= len(self.seq_index)
+        at_time_end = self.time_mode and self.time_window[1] > self.time_index.end
+        first_new_row = len(self.data)
+        self.capture = capture
+        self.data = capture.data
+        self.seq_store = capture.seq_store
+        self.seq_index = capture.seq_store.index
+        self.nack_index = capture.nack_index
+        self.overview.set_pyramid(capture.pyramid)
+        if self.time_index is not None:
+            self.time_index = self.time_index.extend(capture.data, first_new_row)
+        self.tooltip_text.cache_clear()
+        self.highlighted_object = None
+        self.setup_slider()
+        if self.time_mode:
+            t0, t1 = self.time_window
+            if at_time_end:
+                t0 = self.time_index.end + 1 - (t1 - t0)
+            self.show_time_range(t0, t0 + self.time_window[1] - self.time_window[0])
+        elif at_end:
+            self.go_to(len(self.seq_index))
         else:
-            try:
-                return [int(seq)]
-            except Exception as e:
-                print(f"[DEBUG] Ошибка преобразования: {seq}: {e}")
-                return []
+            self.render_visible_range()
+        # Сводка обновляется при каждом дописывании в обоих режимах (режим времени её не перерисовывает; O(1))
+        self.update_summary_table()
+
+
+    def cancel_load(self):
+        """Просит фоновый поток прервать загрузку; текущие данные остаются нетронутыми."""
+        if self.load_cancel_event is not None:
+            self.load_cancel_event.set()
+            self.load_status_label.config(text="Отмена...")
+
+
+    def _poll_load(self):
+        """Забирает сообщения фонового потока из очереди (выполняется в главном потоке Tk)."""
+        last_progress = None
+        try:
+            while True:
+                message = self.load_queue.get_nowait()
+                if isinstance(message, LoadProgress):
+                    last_progress = message
+                    continue
+                kind, payload = message
+                if kind == "partial":
+                    # Первая отрисовка, пока остальной файл ещё читается
+                    self.apply_capture(payload)
+                    continue
+                self.hide_load_progress()
+                if kind == "done":
+                    self.apply_capture(payload, keep_position=self.capture is not self.previous_capture)
+                    self.show_load_report(payload)
+                    if self.follow_after_load:
+                        self.follow_var.set(True)
+                        self.toggle_follow()
+                else:
+                    self.restore_previous_capture()
+                    if kind == "error":
+                        self.file_label.config(text=f"Ошибка: {payload}")
+                self.previous_capture = None
+                return
+        except queue.Empty:
+            pass
+
+        if last_progress is not None:
+            self.update_load_progress(last_progress)
+        self.root.after(self.LOAD_POLL_INTERVAL, self._poll_load)
+
+
+    def restore_previous_capture(self):
+        """После отмены или ошибки возвращает набор данных, который был до загрузки."""
+        if self.capture is self.previous_capture:
+            return  # Промежуточный снимок не показывался – текущие данные не тронуты
+        if self.previous_capture is not None:
+            self.apply_capture(self.previous_capture)
+            return
+        self.set_time_mode(False)
+        self.clear_graph()
+        self.time_index = None
+        self.capture = None
+        self.data = None
+        self.seq_index = None
+        self.nack_index = None
+        self.file_label.config(text="Файл не выбран")
+
+
+    def show_load_progress(self):
+        """Показывает индикатор загрузки и блокирует повторный выбор файла."""
+        self.select_button.config(state=tk.DISABLED)
+        self.load_progress["value"] = 0
+        self.load_status_label.config(text="Загрузка...")
+        self.load_status_label.pack(side=tk.LEFT, padx=5)
+        self.load_progress.pack(side=tk.LEFT, padx=5)
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+
+
+    def update_load_progress(self, progress):
+        """Отображает этап, прочитанные байты и разобранные строки."""
+        self.load_progress["value"] = progress.fraction
+        megabytes = progress.bytes_read / (1024 * 1024)
+        total_megabytes = progress.total_bytes / (1024 * 1024)
+        self.load_status_label.config(
+            text=f"{progress.stage}: {megabytes:.1f}/{total_megabytes:.1f} МБ, строк: {progress.rows}")
+
+
+    def hide_load_progress(self):
+        """Прячет индикатор загрузки после завершения, ошибки или отмены."""
+        self.load_thread = None
+        self.load_cancel_event = None
+        self.load_status_label.pack_forget()
+        self.load_progress.pack_forget()
+        self.cancel_button.pack_forget()
+        self.select_button.config(state=tk.NORMAL)
+
+
+    @profile_detailed
+    def apply_capture(self, capture, keep_position=False):
+        """
+         /**
+          * Подменяет текущий набор данных загруженным и перерисовывает график.
+          * @param capture LoadedCapture (полный или промежуточный снимок).
+          * @param keep_position Сохранить current_start (финальные данные после первой отрисовки).
+          */
+        """
+        # Очищаем график перед построением нового
+        self.set_time_mode(False)
+        self.clear_graph()
+        self.time_index = None
+        self.focus_position = None
+        self.capture = capture
+        self.data = capture.data
+        self.seq_store = capture.seq_store
+        self.seq_index = capture.seq_store.index
+        self.nack_index = capture.nack_index
+        self.overview.set_pyramid(capture.pyramid)
+        if not keep_position:
+            self.current_start = 0
+        self.current_start = max(0, min(self.current_start, len(self.seq_index) - self.visible_count))
+        self.setup_slider()
+
+        # Проверяем, что файл file_path - строка
+        if isinstance(capture.file_path, str):
+            filename = os.path.basename(capture.file_path)
+            self.file_label.config(text=f"Выбран файл: {filename}")
+        else:
+            self.file_label.config(text="Ошибка: Некорректный путь к файлу")
+        # Отображаем основной контейнер, если он ещё не показан
+        if not self.main_frame.winfo_ismapped():
+            self.main_frame.pack(fill=tk.BOTH, expand=True)
+        self.render_visible_range()
 
 
     def update_summary_table(self):
         """
-        Вычисляет и обновляет сводную таблицу подсчёта для всех seq,
-        присутствующих в загруженных данных.
-        """
-        all_seq = self.all_seq
-        total_seq = len(all_seq)
-        total_received = sum(1 for info in self.seq_info.values() if info["final_state"] in [1, 2])
-        total_lost = sum(1 for info in self.seq_info.values() if info["final_state"] == -1)
-        recovery_count = sum(1 for info in self.seq_info.values() if info["final_state"] == 2)
-        loss_ratio = (total_lost / total_seq * 100) if total_seq > 0 else 0
-        denominator = (total_lost + recovery_count)
-        recovery_ratio = (recovery_count / denominator * 100) if denominator > 0 else 0
-        summary_text = (f"Total Received: {total_received}\n"
-                        f"Total Lost: {total_lost}\n"
-                        f"Loss Ratio: {loss_ratio:.1f}%\n"
-                        f"Recovery Ratio: {recovery_ratio:.1f}%")
+        Обновляет две сводные таблицы: по всем seq загруженных данных и по видимому окну.
+        Обе считаются по префиксным суммам SeqInfoStore за O(1), без прохода по seq.
+        """
+        stop = min(self.current_start + self.visible_count, len(self.seq_store))
+        summary_text = format_summary(summarize_store(self.seq_store), "Весь захват")
+        window_text = format_summary(summarize_store(self.seq_store, self.current_start, stop),
+                                     f"Окно: seq {self.seq_store.seqs[self.current_start]} – "
+                                     f"{self.seq_store.seqs[stop - 1]}")
         if self.summary_label is None:
-            self.summary_label = tk.Label(self.summary_frame, text=summary_text, font=self.font,
+            self.summary_label = tk.Label(self.summary_frame, text=summary_text, font=self.font, justify=tk.LEFT,
                                           bg="#2E2E2E", fg="white", bd=1, relief=tk.SOLID, padx=5, pady=5)
-            self.summary_label.pack(side=tk.BOTTOM, anchor="w", padx=5, pady=5)
+            self.summary_label.pack(side=tk.LEFT, anchor="sw", padx=5, pady=5)
+            self.window_summary_label = tk.Label(self.summary_frame, text=window_text, font=self.font,
+                                                 justify=tk.LEFT, bg="#2E2E2E", fg="white", bd=1,
+                                                 relief=tk.SOLID, padx=5, pady=5)
+            self.window_summary_label.pack(side=tk.LEFT, anchor="sw", padx=5, pady=5)
         else:
             self.summary_label.config(text=summary_text)
+            self.window_summary_label.config(text=window_text)
+
+
+    def show_load_report(self, capture):
+        """Показывает под сводкой поэтапный отчёт загрузки (время, строки, память) и печатает его в консоль."""
+        if capture.load_stats is None:
+            return
+        report_text = capture.load_stats.format_table()
+        print(f"[DEBUG] Загрузка {os.path.basename(capture.file_path)}:\n{report_text}")
+        if self.load_report_label is None:
+            self.load_report_label = tk.Label(self.summary_frame, text=report_text, font=("Consolas", 9),
+                                              justify=tk.LEFT, bg="#2E2E2E", fg="white", bd=1,
+                                              relief=tk.SOLID, padx=5, pady=5)
+            self.load_report_label.pack(side=tk.RIGHT, anchor="se", padx=5, pady=5)
+        else:
+            self.load_report_label.config(text=report_text)
 
 
     def get_tooltip_text(self, seq):
         """
         Возвращает текст tooltip для конкретного seq.
         """
-        if seq not in self.seq_info:
+        pos = self.seq_store.position(seq)
+        if pos is None:
             return "Нет данных для tooltip"
 
-        info = self.seq_info[seq]
-        events = info["events"]
-        final_state = info["final_state"]
+        events = self.seq_store.events(pos)
+        timestamps, types, counts = events
+        final_state = self.seq_store.final_state[pos]
 
         tooltip_parts = []
 
         if final_state == 2:
-            return _format_final_state_2(seq, events)
+            return _format_final_state_2(seq, events, self.seq_store.timezone)
 
         if self.check_vars["seq"].get():
             tooltip_parts.append(f"Seq: {seq}")
 
         if self.check_vars["timestamp"].get():
-            timestamps = []
-            for event in events:
-                # Форматируем дату и время с миллисекундами
-                formatted_time = event['timestamp'].strftime('%Y-%m-%d %H:%M:%S')
-                milliseconds = int(event['timestamp'].microsecond / 1000)
-                formatted_time += f":{milliseconds:03d}"
-
-                if event["type"] in (1, -1):
-                    timestamps.append("Timestamp: " + formatted_time)
+            timestamp_lines = []
+            # Все времена seq форматируются одним векторным вызовом
+            formatted_times = format_timestamps_ms(timestamps, self.seq_store.timezone)
+            for formatted_time, event_type in zip(formatted_times, types.tolist()):
+                if event_type in (1, -1):
+                    timestamp_lines.append("Timestamp: " + formatted_time)
                 else:
-                    timestamps.append(formatted_time)
-            tooltip_parts.append("\n".join(timestamps))
+                    timestamp_lines.append(formatted_time)
+            tooltip_parts.append("\n".join(timestamp_lines))
 
         if self.check_vars["events"].get():
             mapping = {-1: "Lost", 1: "Received", 2: "Resend"}
-            event_types = [mapping.get(event["type"], str(event["type"])) for event in events if
-                           not pd.isna(event["type"])]
+            event_types = [mapping.get(event_type, str(event_type)) for event_type in types.tolist()
+                           if event_type != TYPE_UNKNOWN]
             tooltip_parts.append("Events: " + ", ".join(event_types))
 
         if self.check_vars["count"].get():
-            counts = [str(event["count"]) for event in events]
-            tooltip_parts.append("Count: " + ", ".join(counts))
+            tooltip_parts.append("Count: " + ", ".join(str(count) for count in counts.tolist()))
 
         return "\n".join(tooltip_parts)
 
@@ -800,6 +1143,7 @@ class CSVGraphApp:
         self.hover_job = self.root.after(200, lambda: self._handle_hover(event))
 
     @profile_time
+    @profile_detailed
     def _handle_hover(self, event: Any):
         """Основная логика hover-а, которая вызывается `after()` (раз в 200 мс)."""
         self.hover_job = None  # Очищаем `after()` (он выполнен)
@@ -811,119 +1155,92 @@ class CSVGraphApp:
 
         self.last_event = event  # Запоминаем последнее событие
 
-        # Проверяем, внутри ли курсор области графика
-        if not self.ax.get_window_extent().contains(event.x, event.y):
+        # Проверяем, внутри ли курсор области графика (в режиме времени tooltip-ов нет)
+        if self.time_mode or not self.ax.get_window_extent().contains(event.x, event.y):
             self.remove_tooltip()
             return
 
         # Проверяем, есть ли данные для hover
-        if not any([self.norm_collection, self.nack_collection, self.frame_collection]):
+        if not any([self.view.norm_tooltip_keys, self.view.nack_tooltip_keys, self.view.frame_tooltip_keys]):
             self.remove_tooltip()
             return
 
         # Находим объект под курсором
-        highlight_index, tooltip_text, current_coll = self._find_tooltip(event)
+        highlight_index, tooltip_text, kind = self._find_tooltip(event)
 
-        if current_coll is None:  # ДОБАВЬТЕ ЭТУ ПРОВЕРКУ!
+        if kind is None:
             self.remove_tooltip()
+            self.view.hide_highlight()
+            self.highlighted_object = None
             return
 
         # Проверяем, уже ли выделен этот же объект
-        if hasattr(self, "highlighted_object") and self.highlighted_object == (highlight_index, current_coll):
+        if self.highlighted_object == (kind, highlight_index):
             return  # Уже выделен — ничего не делаем
 
+        self.highlighted_object = (kind, highlight_index)
 
-        self.highlighted_object = (highlight_index, current_coll)
-
-        # Если нашли объект — выделяем его и показываем tooltip
-        try:
-            new_edge_colors = current_coll.get_edgecolors()
-            new_line_widths = current_coll.get_linewidths()
-            if current_coll not in self.face_colors:
-                orig_fc = current_coll.get_edgecolors()
-                orig_lw = current_coll.get_linewidths()
-
-                orig_fc = orig_fc.copy() if orig_fc is not None else None
-                orig_lw = orig_lw.copy() if orig_lw is not None else None
-
-                self.face_colors[current_coll] = (orig_fc, orig_lw)
-
-            if new_edge_colors is not None and new_edge_colors.size > highlight_index:
-                new_edge_colors = new_edge_colors.copy()
-                new_edge_colors[highlight_index] = (1, 1, 1, 1)  # Белый контур
-
-            if new_line_widths is not None and new_line_widths.size > highlight_index:
-                new_line_widths = new_line_widths.copy()
-                new_line_widths[highlight_index] = 3
-
-            if new_edge_colors is not None:
-                current_coll.set_edgecolors(new_edge_colors)
-            if new_line_widths is not None:
-                current_coll.set_linewidths(new_line_widths)
-
-
-        except (AttributeError, ValueError, IndexError) as e:
-            print(f"[ERROR] Ошибка при выделении объекта: {e}")
-
+        # Если нашли объект — выделяем его (blit только контура) и показываем tooltip
+        self.view.show_highlight(kind, highlight_index)
+        if tooltip_text:
             self.show_tooltip(tooltip_text)
-
-            # Восстановить исходные цвета лица (только если был установлен цвет лица для объекта)
-            for coll, (orig_fc, orig_lw) in self.face_colors.items():
-                try:
-                    if orig_fc is not None:
-                        coll.set_edgecolors(orig_fc)
-                    if orig_lw is not None:
-                        coll.set_linewidths(orig_lw)
-                except Exception as e:
-                    print(f"[INFO] Exception: {e}")
-
-            self.face_colors.clear()
-            self.highlighted_object = None
-            self.canvas.draw_idle()
+        else:
+            self.remove_tooltip()
 
 
     def _find_tooltip(self, event, apply_check_vars=True):
         """
         Оптимизированный поиск tooltip-а: сначала проверяет, внутри ли графика курсор,
-        затем сразу возвращает первый найденный объект без лишних проверок.
+        затем находит объект арифметически по сетке (HitTester), без обхода патчей коллекций.
 
         :param event: Событие курсора
         :param apply_check_vars: Нужно ли применять фильтрацию полей согласно чекбоксам
-        :return: (index, tooltip_text, collection)
+        :return: (index, tooltip_text, kind)
         """
         # Быстрая проверка: находимся ли мы вообще внутри области графика?
         if not self.ax.get_window_extent().contains(event.x, event.y):
             return None, None, None
 
-        if self.norm_collection is None and self.nack_collection is None and self.frame_collection is None:
-            return None, None, None
 
-        # Коллекции для проверки
-        collections = [
-            (self.norm_collection, self.norm_tooltips),
-            (self.nack_collection, self.nack_tooltips),
-            (self.frame_collection, self.frame_tooltips)
-        ]
-
-        # Перебираем коллекции вручную, чтобы избежать ошибки с присвоением
-        for collection, tooltips in collections:
-            if collection is None:
-                continue
-
-            contains_info = collection.contains(event)  # Вызываем 1 раз
-            if not contains_info[0]:  # Если курсор не попал в объект — пропускаем
-                continue
+        # Координаты курсора в данных оси -> (тип объекта, индекс в коллекции)
+        x, y = self.ax.transData.inverted().transform((event.x, event.y))
+        kind, idx = self.view.hit_tester.hit(x, y)
+        tooltip_keys = {
+            "norm": self.view.norm_tooltip_keys,
+            "nack": self.view.nack_tooltip_keys,
+            "frame": self.view.frame_tooltip_keys
+        }
+        if kind is None:
+            return None, None, None  # Если ничего не нашли
 
-            info = contains_info[1]  # Вытаскиваем вторую часть ответа
-            if info is None or "ind" not in info or len(info["ind"]) == 0:
-                continue
+        keys = tooltip_keys[kind]
+        if idx >= len(keys):
+            return None, None, None
 
-            idx = info["ind"][0]
-            tooltip_text = self._filter_tooltip(tooltips[idx]) if apply_check_vars else tooltips[idx]
+        tooltip_text = self.tooltip_text(kind, keys[idx], self.check_state(), apply_check_vars)
+        return idx, tooltip_text, kind  # Нашли объект — возвращаем
 
-            return idx, tooltip_text, collection  # Нашли объект — возвращаем
 
-        return None, None, None  # Если ничего не нашли
+    def _build_tooltip_text(self, kind, key, check_state, apply_check_vars):
+        """
+        /**
+         * Строит текст tooltip-а объекта под курсором; вызывается через LRU-кеш self.tooltip_text.
+         * @param kind "norm", "nack" или "frame".
+         * @param key Ключ объекта: seq, номер NACK-строки или (состояние, первый seq, последний seq).
+         * @param check_state Состояние чекбоксов (используется только как часть ключа кеша).
+         * @param apply_check_vars Нужно ли применять фильтрацию полей согласно чекбоксам.
+         * @return Текст tooltip.
+         */
+        """
+        if kind == "norm":
+            tooltip_text = self.get_tooltip_text(key)
+        elif kind == "nack":
+            formatted_time = format_timestamp_ms(self.data.timestamps[key], self.data.timezone)
+            tooltip_text = f"NACK: {self.data.row_seqs(key).tolist()}\n Timestamp: {formatted_time}"
+        else:
+            block_state, first_seq, last_seq = key
+            tooltip_text = f"Frame: {block_state} ({first_seq} - {last_seq})"
+        return self._filter_tooltip(tooltip_text) if apply_check_vars else tooltip_text
 
 
     def _filter_tooltip(self, tooltip_text):
@@ -982,10 +1299,22 @@ class CSVGraphApp:
         """
         self.remove_tooltip()
         self.highlighted_object = None  # Сбрасываем выделенный объект
-        self.canvas.draw_idle()
+        self.view.hide_highlight()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="State Timeline из CSV.")
+    parser.add_argument("--profile", choices=PROFILE_MODES,
+                        help="Начать сессию профилирования при запуске (вручную – F9 / Shift+F9): "
+                             "cprofile – только функции с @profile_detailed (отрисовка, hover, загрузка), "
+                             "sampling – стеки всех потоков.")
+    parser.add_argument("--profile-dir", default=DEFAULT_PROFILE_DIR, help="Каталог для .prof.")
+    args = parser.parse_args()
+
     root = tk.Tk()
     app = CSVGraphApp(root)
+    app.profile_dir = args.profile_dir
+    if args.profile:
+        app.toggle_profiling(args.profile)
     root.mainloop()
+    profile_session.stop()
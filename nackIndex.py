@@ -0,0 +1,178 @@
+import heapq
+
+import numpy as np
+
+import arrayBuffer
+
+
+class NackIndex:
+    """
+    /**
+     * Интервальный индекс NACK-строк (type == 3) в координатах позиций индекса seq.
+     * Интервалы отсортированы по началу; prefix_max_end – накопленный максимум концов.
+     * Запрос окна: бинарный поиск по starts и prefix_max_end, затем фильтр кандидатов,
+     * т.е. O(log n + k) для коротких NACK.
+     * Линия (lane) каждого NACK назначается один раз на весь захват, поэтому при
+     * перемещении по графику NACK не перескакивает между линиями.
+     * @param rows Номера NACK-строк в CaptureData.
+     * @param starts Позиция минимального seq NACK в индексе seq.
+     * @param ends Позиция максимального seq NACK в индексе seq.
+     * @param lanes Номер линии каждого NACK; если None – считается assign_lanes.
+     * @param prefix_max_end Готовый накопленный максимум концов; если None – считается по ends.
+     */
+    """
+
+    def __init__(self, rows, starts, ends, lanes=None, prefix_max_end=None):
+        self.rows = rows
+        self.starts = starts
+        self.ends = ends
+        if prefix_max_end is None:
+            prefix_max_end = np.maximum.accumulate(ends) if len(ends) else ends
+        self.prefix_max_end = prefix_max_end
+        self.lanes = assign_lanes(starts, ends) if lanes is None else lanes
+
+    def __len__(self):
+        return len(self.rows)
+
+    def query(self, lo, hi):
+        """
+        Номера интервалов (в порядке starts), пересекающих окно позиций [lo, hi] включительно.
+        """
+        right = int(np.searchsorted(self.starts, hi, side="right"))
+        # Интервалы левее left заканчиваются до lo: prefix_max_end у них < lo
+        left = int(np.searchsorted(self.prefix_max_end[:right], lo, side="left"))
+        candidates = np.arange(left, right)
+        return candidates[self.ends[candidates] >= lo]
+
+    def lane_count(self, lo, hi):
+        """Сколько линий нужно окну позиций [lo, hi]: максимальная линия пересекающих NACK + 1."""
+        hits = self.query(lo, hi)
+        return int(self.lanes[hits].max()) + 1 if len(hits) else 0
+
+    @staticmethod
+    def from_capture(data, seq_index):
+        """
+        /**
+         * Считает границы всех NACK-строк одним векторным проходом.
+         * @param data csvLoader.CaptureData.
+         * @param seq_index seqStore.SeqIndex (содержит все seq NACK-строк).
+         * @return NackIndex.
+         */
+        """
+        rows = _nack_rows(data, 0)
+        if len(rows) == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return NackIndex(empty, empty, empty)
+
+        starts, ends = _row_positions(data, rows, seq_index)
+        order = np.argsort(starts, kind="stable")
+        return NackIndex(rows[order], starts[order], ends[order])
+
+    def extend(self, data, seq_index, split, first_new_row):
+        """
+        /**
+         * Добавляет NACK-строки, дописанные в data начиная с first_new_row (режим слежения за файлом).
+         * seq_index изменился только с позиции split (см. SeqInfoStore.extend), поэтому NACK,
+         * целиком лежащие левее split, остаются как есть; пересчитываются только NACK с концом >= split
+         * и новые. Линии старых NACK сохраняются (вставка seq не меняет взаимного порядка границ),
+         * новым NACK достаётся наименьшая линия, свободная на всём их интервале.
+         * @param data csvLoader.CaptureData с новыми строками.
+         * @param seq_index Новый seqStore.SeqIndex.
+         * @param split Позиция, с которой изменился seq_index.
+         * @param first_new_row Номер первой новой строки data.
+         * @return NackIndex.
+         */
+        """
+        keep = int(np.searchsorted(self.prefix_max_end, split, side="left"))
+        new_rows = _nack_rows(data, first_new_row)
+        rows = np.concatenate((self.rows[keep:], new_rows))
+        if len(rows) == 0:
+            return self
+
+        starts, ends = _row_positions(data, rows, seq_index)
+        lanes = np.concatenate((self.lanes[keep:], np.full(len(new_rows), -1, dtype=self.lanes.dtype)))
+        order = np.argsort(starts, kind="stable")
+        rows, starts, ends, lanes = rows[order], starts[order], ends[order], lanes[order]
+        _assign_new_lanes(starts, ends, lanes)
+
+        tail_max_end = np.maximum.accumulate(ends)
+        if keep:
+            tail_max_end = np.maximum(tail_max_end, self.prefix_max_end[keep - 1])
+        return NackIndex(arrayBuffer.replace_tail(self.rows, keep, rows),
+                         arrayBuffer.replace_tail(self.starts, keep, starts),
+                         arrayBuffer.replace_tail(self.ends, keep, ends),
+                         arrayBuffer.replace_tail(self.lanes, keep, lanes),
+                         arrayBuffer.replace_tail(self.prefix_max_end, keep, tail_max_end))
+
+
+def _nack_rows(data, first_row):
+    """Номера непустых NACK-строк (type == 3) data, начиная с first_row."""
+    lengths = np.diff(data.seq_offsets[first_row:])
+    return np.flatnonzero((data.types[first_row:] == 3) & (lengths > 0)) + first_row
+
+
+def _row_positions(data, rows, seq_index):
+    """
+    Позиции минимального и максимального seq каждой (непустой) строки rows в seq_index.
+    Значения строк собираются подряд, и min/max считаются reduceat по началам строк,
+    поэтому стоимость пропорциональна числу значений только этих строк.
+    """
+    lengths = data.seq_offsets[rows + 1] - data.seq_offsets[rows]
+    gathered_starts = np.cumsum(lengths) - lengths
+    value_index = np.repeat(data.seq_offsets[rows] - gathered_starts, lengths) + np.arange(lengths.sum())
+    values = data.seq_values[value_index]
+    min_seq = np.minimum.reduceat(values, gathered_starts)
+    max_seq = np.maximum.reduceat(values, gathered_starts)
+    return seq_index.positions(min_seq), seq_index.positions(max_seq)
+
+
+def _assign_new_lanes(starts, ends, lanes):
+    """
+    Назначает линии NACK с lanes == -1, не трогая уже назначенные.
+    Интервалы отсортированы по началу; новому достаётся наименьшая линия,
+    не занятая ни одним пересекающимся с ним интервалом (уже назначенным или назначенным раньше).
+    """
+    new = np.flatnonzero(lanes < 0)
+    if len(new) == 0:
+        return
+    prefix_max_end = np.maximum.accumulate(ends)
+    for i in new.tolist():
+        # Пересекающие интервалы: начало <= ends[i] и конец >= starts[i] (как в NackIndex.query)
+        right = int(np.searchsorted(starts, ends[i], side="right"))
+        left = int(np.searchsorted(prefix_max_end[:right], starts[i], side="left"))
+        candidates = np.arange(left, right)
+        overlapping = candidates[(ends[left:right] >= starts[i]) & (lanes[left:right] >= 0)]
+        taken = set(lanes[overlapping].tolist())
+        lane = 0
+        while lane in taken:
+            lane += 1
+        lanes[i] = lane
+
+
+def assign_lanes(starts, ends):
+    """
+    /**
+     * Разбиение интервалов на линии (interval partitioning) за O(n log n).
+     * Интервалы обходятся по возрастанию начала; куча занятых линий хранит (конец, линия),
+     * освободившиеся линии переиспользуются начиная с наименьшего номера.
+     * Интервалы на одной линии не пересекаются (границы включительно).
+     * @param starts Начала интервалов, отсортированные по возрастанию.
+     * @param ends Концы интервалов.
+     * @return int32-массив номеров линий.
+     */
+    """
+    lanes = np.empty(len(starts), dtype=np.int32)
+    busy = []  # (конец, линия) занятых линий
+    free = []  # номера освободившихся линий
+    lane_total = 0
+    for i, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+        while busy and busy[0][0] < start:
+            heapq.heappush(free, heapq.heappop(busy)[1])
+        if free:
+            lane = heapq.heappop(free)
+        else:
+            lane = lane_total
+            lane_total += 1
+        lanes[i] = lane
+        heapq.heappush(busy, (end, lane))
+    return lanes
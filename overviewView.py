@@ -0,0 +1,72 @@
+import numpy as np
+from matplotlib.colors import to_rgb
+from matplotlib.patches import Rectangle
+
+from densityPyramid import COL_LOST, COL_NACK, COL_RECEIVED, COL_RESENT
+
+
+class OverviewView:
+    """
+    /**
+     * Обзорная полоса (мини-карта) всего захвата на отдельной оси matplotlib, без зависимости от Tk.
+     * Три строки картинки: доля lost, доля resend и количество NACK в бакете пирамиды,
+     * яркость нормирована по максимуму уровня. Рамка показывает текущее окно timeline.
+     * Картинка строится из уровня пирамиды с не более чем MAX_BUCKETS бакетами.
+     * @param ax Ось matplotlib.
+     */
+    """
+
+    MAX_BUCKETS = 512
+    ROWS = 3
+
+    def __init__(self, ax):
+        self.ax = ax
+        self.total = 0
+        # Цвета строк (снизу вверх): NACK, resend, lost – как на timeline
+        self.row_colors = [to_rgb("cyan"), to_rgb("#FFD700"), to_rgb("#FF0000")]
+        self.image = ax.imshow(np.zeros((self.ROWS, 1, 4)), aspect="auto", interpolation="nearest",
+                               origin="lower", extent=(0, 1, 0, self.ROWS))
+        self.viewport = Rectangle((0, 0), 0, self.ROWS, fill=False, edgecolor="white", linewidth=1.5)
+        ax.add_patch(self.viewport)
+        ax.set_xticks([])
+        ax.set_yticks([])
+        ax.set_ylim(0, self.ROWS)
+        self.clear()
+
+    def clear(self):
+        """Прячет картинку и рамку (нет данных)."""
+        self.total = 0
+        self.image.set_visible(False)
+        self.viewport.set_visible(False)
+
+    def set_pyramid(self, pyramid):
+        """Строит картинку обзора по уровню пирамиды с не более чем MAX_BUCKETS бакетами."""
+        self.total = pyramid.total
+        if self.total == 0:
+            self.clear()
+            return
+        level = pyramid.level_for(self.MAX_BUCKETS)
+        counts = pyramid.levels[level].astype(float)
+        seqs = np.maximum(counts[:, [COL_RECEIVED, COL_LOST, COL_RESENT]].sum(axis=1), 1)
+
+        rows = [counts[:, COL_NACK], counts[:, COL_RESENT] / seqs, counts[:, COL_LOST] / seqs]
+        rgba = np.zeros((self.ROWS, len(counts), 4))
+        for row, (values, color) in enumerate(zip(rows, self.row_colors)):
+            peak = values.max()
+            rgba[row, :, :3] = color
+            rgba[row, :, 3] = values / peak if peak > 0 else 0.0
+
+        self.image.set_data(rgba)
+        self.image.set_extent((0, len(counts) * pyramid.bucket_size(level), 0, self.ROWS))
+        self.image.set_visible(True)
+        self.ax.set_xlim(0, self.total)
+        self.ax.set_ylim(0, self.ROWS)
+
+    def set_viewport(self, start, count):
+        """Двигает рамку текущего окна [start, start + count)."""
+        self.viewport.set_bounds(start, 0, count, self.ROWS)
+        self.viewport.set_visible(self.total > 0)
+
+    def position_at(self, x):
+        """Позиция seq под координатой x обзорной оси."""
+        return int(np.clip(x, 0, max(self.total - 1, 0)))
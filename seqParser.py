@@ -0,0 +1,145 @@
+import ast
+
+import numpy as np
+import pandas as pd
+
+# Значение type для строк с пустым type
+TYPE_UNKNOWN = 0
+
+# Содержимое ячейки seq, которое разбирается векторно: "12" или "12,13,-14" (только ASCII-цифры).
+# Остальные строки ("1_000", "[1e3]", "[True]", "[1.5]", ...) разбираются построчно по прежним правилам
+_SEQ_BODY_PATTERN = r"[-+]?[0-9]+(?:,[-+]?[0-9]+)*"
+
+
+def parse_seq_column(seq_column, event_types):
+    """
+    /**
+     * Колоночный парсер столбца seq.
+     * Разбирает весь столбец за один проход и возвращает CSR-представление:
+     * значения seq строки i лежат в values[offsets[i]:offsets[i + 1]].
+     * Для event_type == 3 строка сохраняет весь список, иначе – только первый элемент.
+     * @param seq_column Столбец seq (pd.Series или массив).
+     * @param event_types Массив type той же длины.
+     * @return (offsets, values) – два массива int64.
+     */
+    """
+    seq = pd.Series(seq_column).reset_index(drop=True)
+    event_types = np.asarray(event_types)
+    row_count = len(seq)
+    if row_count == 0:
+        return np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    if pd.api.types.is_numeric_dtype(seq.dtype):
+        # Скалярный столбец: одно значение на строку, пропуски дают пустой список
+        valid = seq.notna().to_numpy()
+        lengths = valid.astype(np.int64)
+        values = seq[valid].to_numpy().astype(np.int64)
+    else:
+        lengths, values = _parse_text_column(seq, event_types == 3)
+
+    return _apply_type_rule(lengths, values, event_types == 3)
+
+
+def parse_seq_lists(lengths, values, event_types):
+    """
+    /**
+     * CSR-представление seq по уже разобранным спискам (например, столбец list<int64> из Arrow).
+     * Правило type то же, что у parse_seq_column.
+     * @param lengths Длина списка seq каждой строки.
+     * @param values Плоский массив значений всех списков в порядке строк.
+     * @param event_types Массив type той же длины, что lengths.
+     * @return (offsets, values) – два массива int64.
+     */
+    """
+    return _apply_type_rule(np.asarray(lengths, dtype=np.int64), np.asarray(values, dtype=np.int64),
+                            np.asarray(event_types) == 3)
+
+
+def _parse_text_column(seq, is_nack):
+    """Разбирает текстовый столбец seq ("[1, 2]", "1,2", "1") в длины строк и плоский массив значений."""
+    is_text = seq.map(lambda value: isinstance(value, str)).to_numpy(dtype=bool)
+    lengths = np.zeros(len(seq), dtype=np.int64)
+    fast = np.zeros(len(seq), dtype=bool)
+    fast_values = np.empty(0, dtype=np.int64)
+
+    text = seq[is_text].astype(str).str.strip()
+    if len(text):
+        bracketed = text.str.startswith("[") & text.str.endswith("]")
+        body = text.where(~bracketed, text.str.slice(1, -1))
+        # Пробелы убираются только у скобок и запятых; пробел внутри числа ("1 2") делает строку невалидной.
+        # Пустые элементы выбрасываются ("1,,2" → "1,2")
+        body = (body.str.strip()
+                    .str.replace(r"\s*,\s*", ",", regex=True)
+                    .str.replace(r",+", ",", regex=True)
+                    .str.strip(","))
+        valid = body.str.fullmatch(_SEQ_BODY_PATTERN).fillna(False).to_numpy(dtype=bool)
+        empty = (body == "").to_numpy(dtype=bool)
+
+        body = body[valid]
+        text_lengths = np.zeros(len(text), dtype=np.int64)
+        text_lengths[valid] = body.str.count(",").to_numpy(dtype=np.int64) + 1
+        lengths[is_text] = text_lengths
+        fast[np.flatnonzero(is_text)[valid | empty]] = True
+        if len(body):
+            fast_values = np.fromstring(",".join(body), dtype=np.int64, sep=",")
+
+    # Редкие строки: нестандартный текст, числа или списки в object-столбце – разбираются построчно
+    slow = np.flatnonzero(~fast)
+    if len(slow):
+        per_row = [_parse_value(seq.iat[i], is_nack[i]) for i in slow]
+        bad = [seq.iat[i] for i, row in zip(slow, per_row) if not row and isinstance(seq.iat[i], str)]
+        if bad:
+            print(f"[DEBUG] Ошибка парсинга seq в {len(bad)} строках, например: {bad[0]}")
+        lengths[slow] = [len(row) for row in per_row]
+        flat = np.fromiter((x for row in per_row for x in row), dtype=np.int64)
+        # Значения должны идти в порядке строк: собираем заново по смещениям
+        return _interleave(lengths, fast, fast_values, flat)
+
+    return lengths, fast_values
+
+
+def _parse_value(value, is_nack):
+    """
+    /**
+     * Построчный разбор значения seq по правилам прежнего парсера: строка "[...]" – через ast.literal_eval,
+     * строка с запятыми – int() каждого элемента, иначе int() значения; дробные значения усекаются.
+     * Для не-NACK строки берётся только первый элемент. Ошибка разбора даёт пустой список.
+     */
+    """
+    try:
+        if isinstance(value, str):
+            value = value.strip()
+            if value.startswith("[") and value.endswith("]"):
+                value = ast.literal_eval(value)
+            elif "," in value:
+                value = [part.strip() for part in value.split(",") if part.strip()]
+        if isinstance(value, (list, tuple, np.ndarray)):
+            items = value if is_nack else value[:1]
+            return [int(x) for x in items]
+        if pd.isna(value):
+            return []
+        return [int(value)]
+    except (TypeError, ValueError, SyntaxError, MemoryError, RecursionError):
+        return []
+
+
+def _interleave(lengths, is_fast, fast_values, other_values):
+    """Сливает значения строк векторного разбора (is_fast) и построчного в единый массив в порядке строк."""
+    row_of_value = np.repeat(np.arange(len(lengths)), lengths)
+    from_fast = is_fast[row_of_value]
+    values = np.empty(len(row_of_value), dtype=np.int64)
+    values[from_fast] = fast_values
+    values[~from_fast] = other_values
+    return lengths, values
+
+
+def _apply_type_rule(lengths, values, is_nack):
+    """Оставляет весь список для NACK-строк (type == 3) и только первый элемент для остальных."""
+    keep = np.where(is_nack, lengths, np.minimum(lengths, 1))
+    starts = np.cumsum(lengths) - lengths
+    position_in_row = np.arange(len(values)) - np.repeat(starts, lengths)
+    values = values[position_in_row < np.repeat(keep, lengths)]
+
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(keep, out=offsets[1:])
+    return offsets, values
@@ -0,0 +1,262 @@
+import numpy as np
+
+import arrayBuffer
+
+# Итоговые состояния seq
+STATE_RECEIVED = 1
+STATE_LOST = -1
+STATE_RESENT = 2
+
+# Приоритет состояний: resend перекрывает lost, lost перекрывает received.
+# Итоговое состояние seq – состояние события с максимальным приоритетом,
+# поэтому его можно считать векторно и сливать между порциями через maximum.
+_RANK_TO_STATE = np.array([STATE_RECEIVED, STATE_LOST, STATE_RESENT], dtype=np.int8)
+
+# Столбцы префиксных сумм итоговых состояний (SeqInfoStore.state_prefix)
+PREFIX_LOST = 0
+PREFIX_RESENT = 1
+_PREFIX_COLUMN = {STATE_LOST: PREFIX_LOST, STATE_RESENT: PREFIX_RESENT}
+
+
+def _state_rank(states):
+    """Приоритет состояния/типа события: 2 → 2, -1 → 1, остальное → 0."""
+    return np.where(states == STATE_RESENT, 2, np.where(states == STATE_LOST, 1, 0)).astype(np.int8)
+
+
+class SeqIndex:
+    """
+    /**
+     * Неизменяемый индекс seq: отсортированный массив уникальных seq и поиск seq → позиция.
+     * Строится один раз на загрузку; навигация по окнам работает только со срезами.
+     * @param seqs int64, отсортированные уникальные seq.
+     */
+    """
+
+    def __init__(self, seqs):
+        self.seqs = seqs
+        self.seqs.flags.writeable = False
+
+    def __len__(self):
+        return len(self.seqs)
+
+    def position(self, seq):
+        """Позиция seq или None, если такого seq нет (бинарный поиск)."""
+        pos = int(np.searchsorted(self.seqs, seq))
+        if pos < len(self.seqs) and self.seqs[pos] == seq:
+            return pos
+        return None
+
+    def positions(self, seqs):
+        """Векторный поиск: позиция вставки каждого seq из seqs."""
+        return np.searchsorted(self.seqs, seqs)
+
+    def window(self, start, count):
+        """seq окна [start, start + count) в виде списка."""
+        return self.seqs[start:start + count].tolist()
+
+
+class SeqInfoStore:
+    """
+    /**
+     * Колоночное хранилище агрегированной информации по seq.
+     * index – SeqIndex отсортированных уникальных seq, final_state выровнен с ним (int8).
+     * События (type != 3) отсортированы по seq: события seq с позицией i лежат в
+     * event_*[event_offsets[i]:event_offsets[i + 1]] в порядке строк файла.
+     * @param seqs int64, отсортированные уникальные seq.
+     * @param final_state int8, итоговое состояние каждого seq.
+     * @param event_offsets int64, len(seqs) + 1 смещений в массивы событий.
+     * @param event_timestamps int64, epoch-миллисекунды.
+     * @param event_types int8.
+     * @param event_counts int32.
+     * @param timezone Часовой пояс для форматирования времени.
+     * @param state_prefix int32 (len(seqs) + 1, 2): сколько seq lost/resent среди позиций [0, i);
+     *        None – посчитать при первом обращении.
+     */
+    """
+
+    def __init__(self, seqs, final_state, event_offsets, event_timestamps, event_types, event_counts, timezone,
+                 state_prefix=None):
+        self.index = SeqIndex(seqs)
+        self.final_state = final_state
+        self.event_offsets = event_offsets
+        self.event_timestamps = event_timestamps
+        self.event_types = event_types
+        self.event_counts = event_counts
+        self.timezone = timezone
+        self._state_prefix = state_prefix
+
+    @property
+    def seqs(self):
+        return self.index.seqs
+
+    def __len__(self):
+        return len(self.index)
+
+    def position(self, seq):
+        """Позиция seq в отсортированном массиве seqs или None, если seq нет."""
+        return self.index.position(seq)
+
+    def events(self, pos):
+        """События seq с позицией pos: (timestamps, types, counts)."""
+        start, stop = self.event_offsets[pos], self.event_offsets[pos + 1]
+        return self.event_timestamps[start:stop], self.event_types[start:stop], self.event_counts[start:stop]
+
+    @property
+    def state_prefix(self):
+        """Префиксные суммы итоговых состояний (строятся один раз, дальше поддерживаются extend)."""
+        if self._state_prefix is None:
+            self._state_prefix = _state_prefix(self.final_state)
+        return self._state_prefix
+
+    def count_states(self, start=0, stop=None):
+        """
+        /**
+         * Количество seq в каждом итоговом состоянии среди позиций [start, stop) – за O(1)
+         * по префиксным суммам, без прохода по final_state.
+         * @param start Первая позиция.
+         * @param stop Позиция за последней (None – до конца).
+         * @return {state: count}.
+         */
+        """
+        total = len(self)
+        stop = total if stop is None else min(max(stop, 0), total)
+        start = min(max(start, 0), stop)
+        lost, resent = (self.state_prefix[stop] - self.state_prefix[start]).tolist()
+        return {STATE_RECEIVED: stop - start - lost - resent, STATE_LOST: lost, STATE_RESENT: resent}
+
+    def next_state(self, state, pos):
+        """Позиция первого seq с итоговым состоянием state после pos (STATE_LOST / STATE_RESENT) или None."""
+        prefix = self.state_prefix[:, _PREFIX_COLUMN[state]]
+        # Первая граница, перед которой состояний на одно больше, чем в [0, pos]
+        found = int(np.searchsorted(prefix, prefix[min(max(pos + 1, 0), len(self))] + 1))
+        return found - 1 if found <= len(self) else None
+
+    def previous_state(self, state, pos):
+        """Позиция последнего seq с итоговым состоянием state до pos (STATE_LOST / STATE_RESENT) или None."""
+        prefix = self.state_prefix[:, _PREFIX_COLUMN[state]]
+        count = prefix[min(max(pos, 0), len(self))]
+        if count == 0:
+            return None
+        return int(np.searchsorted(prefix, count)) - 1
+
+    @staticmethod
+    def from_capture(data):
+        """
+        /**
+         * Строит хранилище по CaptureData одной векторной сборкой, без цикла по событиям.
+         * Все seq, включая seq из NACK-строк, попадают в seqs; события – только из строк type != 3.
+         * @param data csvLoader.CaptureData.
+         * @return SeqInfoStore.
+         */
+        """
+        seqs = np.unique(data.seq_values)
+        row_of_value = data.value_rows()
+        normal = data.types[row_of_value] != 3
+        rows = row_of_value[normal]
+
+        # Стабильная сортировка по seq сохраняет порядок строк внутри одного seq
+        order = np.argsort(data.seq_values[normal], kind="stable")
+        rows = rows[order]
+        positions = np.searchsorted(seqs, data.seq_values[normal][order])
+
+        event_timestamps = data.timestamps[rows]
+        event_types = data.types[rows]
+        event_counts = data.counts[rows]
+        return SeqInfoStore._assemble(seqs, positions, _state_rank(event_types), event_timestamps,
+                                      event_types, event_counts, data.timezone)
+
+    @staticmethod
+    def merge(stores, timezone):
+        """
+        /**
+         * Сливает хранилища последовательных порций файла в одно.
+         * Порядок событий внутри seq сохраняется (порции идут в порядке файла).
+         * @param stores Список SeqInfoStore в порядке порций.
+         * @param timezone Часовой пояс захвата.
+         * @return SeqInfoStore.
+         */
+        """
+        if len(stores) == 1:
+            return stores[0]
+        if not stores:
+            return SeqInfoStore._assemble(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64),
+                                          np.empty(0, dtype=np.int8), np.empty(0, dtype=np.int64),
+                                          np.empty(0, dtype=np.int8), np.empty(0, dtype=np.int32), timezone)
+
+        seqs = np.unique(np.concatenate([store.seqs for store in stores]))
+        event_seqs = np.concatenate([np.repeat(store.seqs, np.diff(store.event_offsets)) for store in stores])
+        order = np.argsort(event_seqs, kind="stable")
+        positions = np.searchsorted(seqs, event_seqs[order])
+
+        # Итоговое состояние – максимум приоритетов по всем порциям
+        rank = np.zeros(len(seqs), dtype=np.int8)
+        for store in stores:
+            store_positions = np.searchsorted(seqs, store.seqs)
+            rank[store_positions] = np.maximum(rank[store_positions], _state_rank(store.final_state))
+
+        store = SeqInfoStore._assemble(
+            seqs, positions, np.empty(0, dtype=np.int8),
+            np.concatenate([store.event_timestamps for store in stores])[order],
+            np.concatenate([store.event_types for store in stores])[order],
+            np.concatenate([store.event_counts for store in stores])[order],
+            timezone)
+        store.final_state = _RANK_TO_STATE[rank]
+        return store
+
+    def extend(self, other):
+        """
+        /**
+         * Добавляет события хранилища other (новые строки файла) в режиме слежения за файлом.
+         * Пересобирается только хвост, начиная с позиции split первого seq из other:
+         * префикс [0, split) не меняется, а для растущего захвата новые seq лежат у конца,
+         * поэтому стоимость пропорциональна объёму новых данных и расстоянию до конца.
+         * Массивы растут с запасом (arrayBuffer); после вызова self можно использовать только в [0, split).
+         * Префиксные суммы состояний дописываются так же, начиная с split.
+         * @param other SeqInfoStore новых строк.
+         * @return (SeqInfoStore, split).
+         */
+        """
+        if len(other) == 0:
+            return self, len(self)
+        split = int(np.searchsorted(self.seqs, other.seqs[0]))
+        event_split = int(self.event_offsets[split])
+        suffix = SeqInfoStore(self.seqs[split:], self.final_state[split:],
+                              self.event_offsets[split:] - event_split, self.event_timestamps[event_split:],
+                              self.event_types[event_split:], self.event_counts[event_split:], self.timezone)
+        merged = SeqInfoStore.merge([suffix, other], self.timezone)
+
+        state_prefix = None
+        if self._state_prefix is not None:
+            tail = _state_prefix(merged.final_state)[1:] + self._state_prefix[split]
+            state_prefix = arrayBuffer.replace_tail(self._state_prefix, split + 1, tail)
+        store = SeqInfoStore(arrayBuffer.replace_tail(self.seqs, split, merged.seqs),
+                             arrayBuffer.replace_tail(self.final_state, split, merged.final_state),
+                             arrayBuffer.replace_tail(self.event_offsets, split, merged.event_offsets + event_split),
+                             arrayBuffer.replace_tail(self.event_timestamps, event_split, merged.event_timestamps),
+                             arrayBuffer.replace_tail(self.event_types, event_split, merged.event_types),
+                             arrayBuffer.replace_tail(self.event_counts, event_split, merged.event_counts),
+                             self.timezone, state_prefix)
+        return store, split
+
+    @staticmethod
+    def _assemble(seqs, positions, event_ranks, event_timestamps, event_types, event_counts, timezone):
+        """Считает смещения событий и итоговые состояния по позициям событий (positions отсортированы)."""
+        per_seq = np.bincount(positions, minlength=len(seqs))
+        event_offsets = np.zeros(len(seqs) + 1, dtype=np.int64)
+        np.cumsum(per_seq, out=event_offsets[1:])
+
+        rank = np.zeros(len(seqs), dtype=np.int8)
+        if len(event_ranks):
+            # Максимум приоритета по группам событий одного seq
+            has_events = per_seq > 0
+            rank[has_events] = np.maximum.reduceat(event_ranks, event_offsets[:-1][has_events])
+        return SeqInfoStore(seqs, _RANK_TO_STATE[rank], event_offsets, event_timestamps,
+                            event_types, event_counts, timezone)
+
+
+def _state_prefix(final_state):
+    """Префиксные суммы (len + 1, 2): число lost и resent среди первых i позиций."""
+    prefix = np.zeros((len(final_state) + 1, 2), dtype=np.int32)
+    np.cumsum(final_state == STATE_LOST, out=prefix[1:, PREFIX_LOST])
+    np.cumsum(final_state == STATE_RESENT, out=prefix[1:, PREFIX_RESENT])
+    return prefix
@@ -1,37 +1,150 @@
+import atexit
+import bisect
 import functools
+import json
+import os
 import time
-from collections import defaultdict
 
-# Храним вызовы методов
-call_stats = defaultdict(lambda: {"count": 0, "total_time": 0.0, "last_log": 0})
+# GRAPHAPP_METRICS=0 отключает замеры: profile_time возвращает функцию без обёртки
+METRICS_ENABLED = os.environ.get("GRAPHAPP_METRICS", "1") != "0"
+# Если задан GRAPHAPP_METRICS_JSON, при выходе метрики сохраняются в этот файл
+METRICS_JSON_ENV = "GRAPHAPP_METRICS_JSON"
+
+# Верхние границы бакетов гистограммы (нс): от 1 мкс до ~134 с, по 4 бакета на удвоение
+BUCKET_BOUNDS_NS = [int(1000 * 2 ** (step / 4)) for step in range(4 * 27 + 1)]
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyHistogram:
+    """
+    /**
+     * Гистограмма задержек с фиксированными логарифмическими бакетами BUCKET_BOUNDS_NS.
+     * Запись – бинарный поиск бакета и три сложения, без выделения памяти;
+     * перцентили оцениваются верхней границей бакета (погрешность не больше 19%).
+     */
+    """
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS_NS) + 1)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, elapsed_ns):
+        """Добавляет один замер (нс)."""
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS_NS, elapsed_ns)] += 1
+        self.count += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+
+    def percentile(self, percent):
+        """Оценка перцентиля percent (нс): граница бакета, в котором набирается percent% замеров."""
+        if self.count == 0:
+            return 0
+        threshold = self.count * percent / 100
+        cumulative = 0
+        for index, bucket_count in enumerate(self.buckets):
+            cumulative += bucket_count
+            if cumulative >= threshold:
+                bound = BUCKET_BOUNDS_NS[index] if index < len(BUCKET_BOUNDS_NS) else self.max_ns
+                return min(bound, self.max_ns)
+        return self.max_ns
+
+    def snapshot(self):
+        """Сводка в миллисекундах: count, mean, p50/p95/p99, max и ненулевые бакеты."""
+        to_ms = 1e-6
+        summary = {"count": self.count, "mean_ms": self.total_ns / self.count * to_ms if self.count else 0.0}
+        for percent in PERCENTILES:
+            summary[f"p{percent}_ms"] = self.percentile(percent) * to_ms
+        summary["max_ms"] = self.max_ns * to_ms
+        summary["buckets"] = {str(BUCKET_BOUNDS_NS[index]) if index < len(BUCKET_BOUNDS_NS) else "inf": bucket_count
+                              for index, bucket_count in enumerate(self.buckets) if bucket_count}
+        return summary
+
+
+class MetricsRegistry:
+    """
+    /**
+     * Реестр гистограмм задержек по полному имени функции (module.Class.method).
+     * Вывод – JSON (dump_json) или текстовая таблица для панели статистики (format_table), не stdout.
+     */
+    """
+
+    def __init__(self):
+        self.histograms = {}
+
+    def histogram(self, name):
+        """Гистограмма name (создаётся при первом обращении)."""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        return histogram
+
+    def reset(self):
+        """Обнуляет все гистограммы (имена сохраняются)."""
+        for name in self.histograms:
+            self.histograms[name].__init__()
+
+    def snapshot(self):
+        """{имя: сводка} по всем функциям, у которых есть замеры."""
+        return {name: histogram.snapshot() for name, histogram in sorted(self.histograms.items())
+                if histogram.count}
+
+    def dump_json(self, path):
+        """Сохраняет snapshot в JSON-файл path."""
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(self.snapshot(), handle, ensure_ascii=False, indent=2)
+            handle.write("\n")
+
+    def format_table(self):
+        """Текстовая таблица: имя, count, p50/p95/p99/max в миллисекундах."""
+        snapshot = self.snapshot()
+        if not snapshot:
+            return "Нет замеров"
+        width = max(len(name) for name in snapshot)
+        lines = [f"{'function':<{width}} {'count':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+        for name, summary in snapshot.items():
+            lines.append(f"{name:<{width}} {summary['count']:>8} {summary['p50_ms']:9.3f} {summary['p95_ms']:9.3f} "
+                         f"{summary['p99_ms']:9.3f} {summary['max_ms']:9.3f}")
+        return "\n".join(lines)
+
+
+registry = MetricsRegistry()
+
 
 def profile_time(func):
-    """Декоратор для замера времени выполнения метода с группировкой повторных вызовов."""
+    """
+    /**
+     * Декоратор замера задержки: каждый вызов попадает в гистограмму registry под именем
+     * module.qualname (одноимённые методы разных классов не смешиваются). Ничего не печатает.
+     * При GRAPHAPP_METRICS=0 возвращает func как есть – без накладных расходов.
+     */
+    """
+    if not METRICS_ENABLED:
+        return func
+    histogram = registry.histogram(f"{func.__module__}.{func.__qualname__}")
+    perf_counter_ns = time.perf_counter_ns
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        global call_stats
-
-        start_time = time.perf_counter()
-        result = func(*args, **kwargs)
-        end_time = time.perf_counter()
-
-        exec_time = end_time - start_time
-        func_name = func.__name__
-
-        # Обновляем статистику вызовов
-        call_stats[func_name]["count"] += 1
-        call_stats[func_name]["total_time"] += exec_time
-
-        # Логируем раз в секунду
-        current_time = time.time()
-        if current_time - call_stats[func_name]["last_log"] >= 1:
-            avg_time = call_stats[func_name]["total_time"] / call_stats[func_name]["count"]
-            print(f"[PROFILE] {func_name} вызван {call_stats[func_name]['count']} раз. "
-                  f"Среднее время: {avg_time:.6f} сек. "
-                  f"Общее время: {call_stats[func_name]['total_time']:.6f} сек.")
-            call_stats[func_name]["count"] = 0
-            call_stats[func_name]["total_time"] = 0.0
-            call_stats[func_name]["last_log"] = current_time
-
-        return result
+        start = perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            histogram.record(perf_counter_ns() - start)
     return wrapper
+
+
+def _dump_at_exit():
+    """Сохраняет метрики в файл из GRAPHAPP_METRICS_JSON при выходе из программы."""
+    path = os.environ.get(METRICS_JSON_ENV)
+    if path:
+        try:
+            registry.dump_json(path)
+        except OSError as e:
+            print(f"[ERROR] Не удалось сохранить метрики в {path}: {e}")
+
+
+if METRICS_ENABLED:
+    atexit.register(_dump_at_exit)
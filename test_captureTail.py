@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from captureCache import cache_path, load_capture_cached
+from captureGenerator import generate_capture
+from captureTail import CaptureTail, TailReset
+from csvLoader import load_capture
+
+
+def _assert_same_capture(actual, expected):
+    """Захват после слежения совпадает с полной загрузкой того же файла."""
+    for name in ("timestamps", "types", "counts", "seq_offsets", "seq_values"):
+        assert np.array_equal(getattr(actual.data, name), getattr(expected.data, name)), name
+    for name in ("seqs", "final_state", "event_offsets", "event_timestamps", "event_types", "event_counts"):
+        assert np.array_equal(getattr(actual.seq_store, name), getattr(expected.seq_store, name)), name
+    assert np.array_equal(actual.nack_index.rows, expected.nack_index.rows)
+    assert actual.source_size == expected.source_size
+
+
+def test_tail_after_load_cut_mid_line_matches_full_reload(tmp_path):
+    source = tmp_path / "source.csv"
+    generate_capture(str(source), 30_000, seed=1)
+    content = source.read_bytes()
+    line_start = content.index(b"\n", len(content) // 2) + 1
+
+    capture_path = tmp_path / "capture.csv"
+    # Писатель остановился в 12 байтах от начала строки (посреди timestamp)
+    capture_path.write_bytes(content[:line_start + 12])
+    # Обычная загрузка разбирает недописанную строку, поэтому слежение от неё требует перезагрузки
+    with pytest.raises(TailReset):
+        CaptureTail(load_capture(str(capture_path)))
+    capture = load_capture(str(capture_path), complete_lines_only=True)
+    assert capture.source_size == line_start
+    assert len(capture.data) == content[:line_start].count(b"\n") - 1
+
+    tail = CaptureTail(capture)
+    with open(capture_path, "ab") as handle:
+        handle.write(content[line_start + 12:])
+    followed = tail.poll()
+
+    _assert_same_capture(followed, load_capture(str(capture_path)))
+
+
+def test_tail_without_cut_matches_full_reload(tmp_path):
+    source = tmp_path / "source.csv"
+    generate_capture(str(source), 30_000, seed=2)
+    content = source.read_bytes()
+    line_start = content.index(b"\n", len(content) // 3) + 1
+
+    capture_path = tmp_path / "capture.csv"
+    capture_path.write_bytes(content[:line_start])
+    tail = CaptureTail(load_capture(str(capture_path)))
+    with open(capture_path, "ab") as handle:
+        handle.write(content[line_start:])
+
+    _assert_same_capture(tail.poll(), load_capture(str(capture_path)))
+
+
+def test_static_file_without_trailing_newline_loads_last_row(tmp_path):
+    capture_path = tmp_path / "capture.csv"
+    capture_path.write_bytes(b"timestamp,seq,type\n1,5,1\n2,6,-1")
+
+    capture = load_capture(str(capture_path))
+    assert len(capture.data) == len(pd.read_csv(capture_path)) == 2
+    assert capture.seq_store.seqs.tolist() == [5, 6]
+    assert capture.source_size == capture_path.stat().st_size
+
+    load_capture_cached(str(capture_path))
+    assert os.path.isdir(cache_path(str(capture_path)))
+    assert len(load_capture_cached(str(capture_path)).data) == 2
@@ -0,0 +1,91 @@
+import numpy as np
+from matplotlib.ticker import FuncFormatter, MaxNLocator
+
+from timeFormat import format_timestamp_ms
+from timeIndex import TimeIndex
+
+# Строки оси времени (y): интенсивность событий, потери, resend
+RATE_Y = 0
+LOST_Y = 1
+RESENT_Y = 2
+
+
+class TimeAxisView:
+    """
+    /**
+     * Режим оси времени на отдельной оси matplotlib, без зависимости от Tk.
+     * X – реальное время (epoch-миллисекунды, подписи в часовом поясе захвата).
+     * Потери и resend рисуются маркерами в моменты событий; если их в окне больше MAX_MARKERS,
+     * маркер ставится в каждый непустой из BINS интервалов окна. Нижняя строка – число событий по интервалам.
+     * Все выборки – np.searchsorted по отсортированным массивам TimeIndex, поэтому стоимость
+     * окна логарифмическая по числу событий и не зависит от длины интервала.
+     * @param ax Ось matplotlib.
+     * @param colors Цвета итоговых состояний {state: color}, как на timeline.
+     */
+    """
+
+    MAX_MARKERS = 5000
+    BINS = 1000
+
+    def __init__(self, ax, colors):
+        self.ax = ax
+        self.timezone = None
+        self.rate_line, = ax.plot([], [], drawstyle="steps-post", color=colors[1], linewidth=1)
+        self.lost_points = ax.scatter(np.empty(0), np.empty(0), s=80, marker="|", color=colors[-1])
+        self.resent_points = ax.scatter(np.empty(0), np.empty(0), s=80, marker="|", color=colors[2])
+        ax.set_yticks([RATE_Y, LOST_Y, RESENT_Y], ["События", "Lost", "Resend"])
+        ax.set_ylim(RATE_Y - 0.6, RESENT_Y + 0.6)
+        ax.xaxis.set_major_locator(MaxNLocator(5))
+        ax.xaxis.set_major_formatter(FuncFormatter(self._format_tick))
+        self.clear()
+
+    def clear(self):
+        """Прячет содержимое окна."""
+        self.rate_line.set_data([], [])
+        self.lost_points.set_offsets(np.empty((0, 2)))
+        self.resent_points.set_offsets(np.empty((0, 2)))
+
+    def render(self, time_index, t0, t1, timezone):
+        """
+        /**
+         * Обновляет artist-ы под окно времени [t0, t1).
+         * @param time_index timeIndex.TimeIndex.
+         * @param t0 Начало окна (мс).
+         * @param t1 Конец окна (мс), t1 > t0.
+         * @param timezone Часовой пояс подписей.
+         */
+        """
+        self.timezone = timezone
+        # Интервал не короче миллисекунды – точности времени событий. Границы int64, как times:
+        # с float-границами searchsorted переводил бы весь массив времён во float64 (O(n) на кадр)
+        t0, t1 = int(t0), int(t1)
+        bins = int(min(self.BINS, max(1, t1 - t0)))
+        edges = t0 + np.arange(bins + 1, dtype=np.int64) * (t1 - t0) // bins
+        rate = TimeIndex.bin_counts(time_index.times, edges)
+        peak = rate.max() if len(rate) else 0
+        levels = (rate / peak - 0.5) * 0.8 if peak > 0 else np.full(len(rate), -0.4)
+        self.rate_line.set_data(edges, np.append(levels, levels[-1]) + RATE_Y)
+
+        self.lost_points.set_offsets(self._marker_offsets(time_index.lost_times, edges, LOST_Y))
+        self.resent_points.set_offsets(self._marker_offsets(time_index.resent_times, edges, RESENT_Y))
+        self.ax.set_xlim(t0, t1)
+
+    def _marker_offsets(self, times, edges, y):
+        """Точки маркеров окна: реальные времена или центры непустых интервалов, если событий много."""
+        lo, hi = np.searchsorted(times, edges[[0, -1]])
+        if hi - lo <= self.MAX_MARKERS:
+            x = times[lo:hi].astype(float)
+        else:
+            counts = TimeIndex.bin_counts(times, edges)
+            x = ((edges[:-1] + edges[1:]) / 2)[counts > 0]
+        return np.column_stack((x, np.full(len(x), y, dtype=float)))
+
+    def time_at(self, x):
+        """Время (мс) под координатой x оси."""
+        return int(round(x))
+
+    def _format_tick(self, x, _):
+        """Подпись оси X: время суток в часовом поясе захвата (дата – в метке слайдера)."""
+        if self.timezone is None:
+            return ""
+        return format_timestamp_ms(x, self.timezone).split(" ")[1]
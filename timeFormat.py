@@ -0,0 +1,99 @@
+import functools
+
+import numpy as np
+import pandas as pd
+
+# Смещение часового пояса определяется один раз на интервал OFFSET_BUCKET_MS: переходы
+# на летнее/зимнее время во всех поясах tz database приходятся на границы 15 минут UTC
+OFFSET_BUCKET_MS = 15 * 60 * 1000
+# 'YYYY-mm-ddTHH:MM:SS.mmm' из np.datetime_as_string: позиции символов, заменяемых на ' ' и ':'
+_DATE_SEPARATOR = 10
+_MS_SEPARATOR = 19
+_FORMATTED_LENGTH = 23
+# Допустимые timestamp (мс) – диапазон pd.Timestamp (datetime64[ns]), как у прежнего pd.to_datetime:
+# за его пределами не работает перевод в часовой пояс, а int64 мс переполняется
+MIN_EPOCH_MS = -(pd.Timestamp.min.value // -1_000_000)
+MAX_EPOCH_MS = pd.Timestamp.max.value // 1_000_000
+
+
+def parse_epoch_ms(values):
+    """
+    /**
+     * Переводит столбец timestamp (epoch-миллисекунды: целые, дробные или строки) в int64.
+     * Дробные миллисекунды отбрасываются; нечисловые, пустые и вне [MIN_EPOCH_MS, MAX_EPOCH_MS] – невалидны.
+     * @param values pd.Series или массив.
+     * @return (int64 мс, bool-маска валидных строк); у невалидных строк значение 0.
+     */
+    """
+    numbers = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    with np.errstate(invalid="ignore"):
+        valid = (numbers >= MIN_EPOCH_MS) & (numbers <= MAX_EPOCH_MS)
+    if valid.all():
+        return np.floor(numbers).astype(np.int64), valid
+    return np.floor(np.where(valid, numbers, 0)).astype(np.int64), valid
+
+
+class TimeFormatter:
+    """
+    /**
+     * Форматирование epoch-миллисекунд в часовом поясе захвата без pd.Timestamp на каждое значение.
+     * Смещение пояса для интервала OFFSET_BUCKET_MS вычисляется один раз (одним векторным tz_convert
+     * на все новые интервалы) и кешируется: захват в пределах суток обычно укладывается в одно смещение.
+     * Строки собираются numpy-массивом целиком (np.datetime_as_string).
+     * @param timezone Имя часового пояса (None – UTC).
+     */
+    """
+
+    def __init__(self, timezone):
+        self.timezone = timezone
+        self.fixed_offset = 0 if timezone is None or timezone == "UTC" else None
+        self._offsets = {}
+
+    def offsets_ms(self, timestamps_ms):
+        """Смещения пояса (мс) для каждого значения timestamps_ms (int64 массив)."""
+        if self.fixed_offset is not None:
+            return np.full(len(timestamps_ms), self.fixed_offset, dtype=np.int64)
+        buckets = timestamps_ms // OFFSET_BUCKET_MS
+        unique, inverse = np.unique(buckets, return_inverse=True)
+        missing = [bucket for bucket in unique.tolist() if bucket not in self._offsets]
+        if missing:
+            utc = pd.DatetimeIndex(np.array(missing, dtype=np.int64) * OFFSET_BUCKET_MS * 1_000_000, tz="UTC")
+            local = utc.tz_convert(self.timezone).tz_localize(None)
+            for bucket, offset_ns in zip(missing, (local.asi8 - utc.asi8).tolist()):
+                self._offsets[bucket] = offset_ns // 1_000_000
+        bucket_offsets = np.array([self._offsets[bucket] for bucket in unique.tolist()], dtype=np.int64)
+        return bucket_offsets[inverse.reshape(-1)]
+
+    def format(self, timestamps_ms):
+        """
+        /**
+         * Форматирует массив epoch-миллисекунд как 'YYYY-mm-dd HH:MM:SS:mmm'.
+         * @param timestamps_ms Массив или список целых мс.
+         * @return Список строк.
+         */
+        """
+        timestamps_ms = np.asarray(timestamps_ms, dtype=np.int64).reshape(-1)
+        if len(timestamps_ms) == 0:
+            return []
+        local = (timestamps_ms + self.offsets_ms(timestamps_ms)).astype("datetime64[ms]")
+        characters = np.datetime_as_string(local, unit="ms").astype(f"U{_FORMATTED_LENGTH}")
+        characters = characters.view("U1").reshape(len(local), _FORMATTED_LENGTH)
+        characters[:, _DATE_SEPARATOR] = " "
+        characters[:, _MS_SEPARATOR] = ":"
+        return characters.reshape(-1).view(f"U{_FORMATTED_LENGTH}").tolist()
+
+
+@functools.lru_cache(maxsize=None)
+def time_formatter(timezone):
+    """Общий TimeFormatter часового пояса: кеш смещений живёт между загрузками и окнами."""
+    return TimeFormatter(timezone)
+
+
+def format_timestamps_ms(timestamps_ms, timezone):
+    """Форматирует массив epoch-миллисекунд как 'YYYY-mm-dd HH:MM:SS:mmm' в часовом поясе захвата."""
+    return time_formatter(timezone).format(timestamps_ms)
+
+
+def format_timestamp_ms(timestamp_ms, timezone):
+    """Форматирует epoch-миллисекунды как 'YYYY-mm-dd HH:MM:SS:mmm' в часовом поясе захвата."""
+    return time_formatter(timezone).format([int(timestamp_ms)])[0]
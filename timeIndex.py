@@ -0,0 +1,144 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+import arrayBuffer
+from seqStore import STATE_LOST, STATE_RESENT
+
+
+class TimeIndex:
+    """
+    /**
+     * События захвата (строки type != 3), отсортированные по времени, для режима оси времени.
+     * times – int64 epoch-миллисекунды по возрастанию; seqs и types выровнены с times.
+     * Потери и resend дополнительно лежат в отдельных отсортированных массивах (маркеры),
+     * поэтому любой запрос окна [t0, t1) – это np.searchsorted, O(log n) по числу событий.
+     * Хранятся значения seq, а не позиции индекса seq: позиции сдвигаются при дописывании
+     * файла, а seq – нет (позиция ищется через SeqIndex по требованию).
+     * @param times int64, отсортированные времена событий.
+     * @param seqs int64, seq события.
+     * @param types int8, тип события.
+     * @param lost_times, resent_times Времена потерь и resend (None – выбрать из times).
+     */
+    """
+
+    def __init__(self, times, seqs, types, lost_times=None, resent_times=None):
+        self.times = times
+        self.seqs = seqs
+        self.types = types
+        self.lost_times = times[types == STATE_LOST] if lost_times is None else lost_times
+        self.resent_times = times[types == STATE_RESENT] if resent_times is None else resent_times
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def start(self):
+        """Время первого события (мс)."""
+        return int(self.times[0])
+
+    @property
+    def end(self):
+        """Время последнего события (мс)."""
+        return int(self.times[-1])
+
+    def window(self, t0, t1):
+        """Границы [lo, hi) событий с временем в [t0, t1)."""
+        return int(np.searchsorted(self.times, t0)), int(np.searchsorted(self.times, t1))
+
+    def seq_at(self, t):
+        """seq первого события не раньше t (или последнего события, если t позже всех); None без событий."""
+        if len(self.times) == 0:
+            return None
+        pos = min(int(np.searchsorted(self.times, t)), len(self.times) - 1)
+        return int(self.seqs[pos])
+
+    @staticmethod
+    def bin_counts(times, edges):
+        """Количество событий times в каждом интервале [edges[i], edges[i + 1]) – O(len(edges) · log n)."""
+        return np.diff(np.searchsorted(times, edges))
+
+    @staticmethod
+    def from_capture(data):
+        """
+        /**
+         * Строит индекс по CaptureData: стабильная сортировка строк по времени.
+         * @param data csvLoader.CaptureData.
+         * @return TimeIndex.
+         */
+        """
+        times, seqs, types = _row_events(data, 0)
+        order = np.argsort(times, kind="stable")
+        return TimeIndex(times[order], seqs[order], types[order])
+
+    def extend(self, data, first_new_row):
+        """
+        /**
+         * Добавляет события строк data начиная с first_new_row (режим слежения за файлом).
+         * Если новые события не раньше последнего известного (обычный случай для журнала),
+         * они дописываются в конец за время, пропорциональное их числу; иначе пересобирается
+         * хвост, начиная с самого раннего нового времени.
+         * После вызова прежний индекс использовать нельзя (массивы растут на месте, arrayBuffer).
+         * @param data Дополненный csvLoader.CaptureData.
+         * @param first_new_row Первая новая строка.
+         * @return TimeIndex.
+         */
+        """
+        times, seqs, types = _row_events(data, first_new_row)
+        if len(times) == 0:
+            return self
+        order = np.argsort(times, kind="stable")
+        times, seqs, types = times[order], seqs[order], types[order]
+        # Прежние события с тем же временем остаются раньше новых (порядок строк файла)
+        split = int(np.searchsorted(self.times, times[0], side="right"))
+        if split < len(self.times):
+            order = np.argsort(np.concatenate((self.times[split:], times)), kind="stable")
+            times = np.concatenate((self.times[split:], times))[order]
+            seqs = np.concatenate((self.seqs[split:], seqs))[order]
+            types = np.concatenate((self.types[split:], types))[order]
+        start = times[0]
+        return TimeIndex(arrayBuffer.replace_tail(self.times, split, times),
+                         arrayBuffer.replace_tail(self.seqs, split, seqs),
+                         arrayBuffer.replace_tail(self.types, split, types),
+                         _replace_marker_tail(self.lost_times, start, times[types == STATE_LOST]),
+                         _replace_marker_tail(self.resent_times, start, times[types == STATE_RESENT]))
+
+
+def _row_events(data, first_row):
+    """События строк data с first_row: (times мс, seqs, types) строк type != 3 с непустым seq."""
+    types = data.types[first_row:]
+    rows = np.flatnonzero((types != 3) & (np.diff(data.seq_offsets[first_row:]) > 0)) + first_row
+    times = data.timestamps[rows]
+    return times, data.seq_values[data.seq_offsets[rows]].astype(np.int64), data.types[rows]
+
+
+def _replace_marker_tail(marker_times, start, tail):
+    """Заменяет времена маркеров строго позже start (равные остаются, как события в extend) на tail."""
+    return arrayBuffer.replace_tail(marker_times, int(np.searchsorted(marker_times, start, side="right")), tail)
+
+
+def parse_time(text, timezone, reference_ms):
+    """
+    /**
+     * Разбирает время, введённое пользователем, в epoch-миллисекунды.
+     * Принимает дату и время ('2024-05-01 12:00:01.250') или только время ('12:00:01'),
+     * в том числе в формате tooltip-ов ('... 12:00:01:250'); время без даты берётся в дне reference_ms.
+     * Время без явного часового пояса считается в часовом поясе захвата.
+     * @param text Строка.
+     * @param timezone Часовой пояс захвата.
+     * @param reference_ms Время захвата, по которому выбирается дата (мс).
+     * @return int, мс.
+     * @throws ValueError Строку не удалось разобрать.
+     */
+    """
+    text = re.sub(r"(\d{1,2}:\d{2}:\d{2}):(\d{1,3})$", r"\1.\2", text.strip())
+    if re.match(r"^\d{1,2}:\d{2}", text):
+        day = pd.Timestamp(int(reference_ms), unit="ms", tz="UTC").tz_convert(timezone)
+        text = f"{day.strftime('%Y-%m-%d')} {text}"
+    timestamp = pd.Timestamp(text)
+    if pd.isna(timestamp):
+        raise ValueError(f"Пустое время: {text!r}")
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize(timezone)
+    return int(timestamp.value // 1_000_000)
@@ -0,0 +1,93 @@
+import bisect
+import math
+
+# Геометрия timeline в координатах данных оси.
+# Нормальные объекты – сетка квадратов x = idx * (square_width + gap), полоса y ∈ [NORM_Y, NORM_Y + NORM_HEIGHT].
+NORM_Y = 0.5
+NORM_HEIGHT = 0.5
+# Frame-боксы над нормальными объектами: по FRAME_BLOCK_SIZE seq в боксе
+FRAME_Y = 1.1
+FRAME_HEIGHT = 0.2
+FRAME_BLOCK_SIZE = 10
+# NACK-линии под нормальными объектами, линия 0 – самая верхняя
+NACK_RECT_HEIGHT = 0.07
+NACK_LINE_SPACING = 0.01
+NACK_FIRST_LINE_OFFSET = 0.075
+
+
+def nack_lane_y(lane):
+    """Нижняя координата y прямоугольников NACK-линии lane."""
+    return NORM_Y - NACK_FIRST_LINE_OFFSET - lane * (NACK_RECT_HEIGHT + NACK_LINE_SPACING)
+
+
+class HitTester:
+    """
+    /**
+     * Арифметический hit-test для timeline: переводит координаты курсора (в данных оси)
+     * в (тип объекта, индекс в коллекции) без обхода патчей.
+     * Нормальные объекты и Frame-боксы ищутся делением по сетке, NACK – по номеру линии
+     * из y и бинарным поиском среди непересекающихся интервалов этой линии.
+     * @param square_width Ширина квадрата seq.
+     * @param gap Промежуток между квадратами.
+     */
+    """
+
+    def __init__(self, square_width, gap):
+        self.square_width = square_width
+        self.pitch = square_width + gap
+        self.visible_total = 0
+        # lane -> (начала, концы в индексах окна, индексы в NACK-коллекции), отсортировано по началу
+        self.nack_lanes = {}
+
+    def set_window(self, visible_total):
+        """Запоминает размер текущего окна (количество отрисованных seq)."""
+        self.visible_total = visible_total
+
+    def set_nack_boxes(self, starts, ends, lanes):
+        """
+        Запоминает NACK-боксы текущего окна в порядке NACK-коллекции.
+        starts/ends – индексы первого и последнего seq бокса в окне, lanes – линии.
+        """
+        per_lane = {}
+        for collection_index, (start, end, lane) in enumerate(zip(starts, ends, lanes)):
+            per_lane.setdefault(lane, []).append((start, end, collection_index))
+        self.nack_lanes = {}
+        for lane, boxes in per_lane.items():
+            boxes.sort()
+            self.nack_lanes[lane] = ([box[0] for box in boxes], [box[1] for box in boxes],
+                                     [box[2] for box in boxes])
+
+    def hit(self, x, y):
+        """
+        /**
+         * Ищет объект под точкой (x, y) за O(1) для сетки и O(log k) для NACK.
+         * @return ("norm" | "nack" | "frame", индекс в коллекции) или (None, None).
+         */
+        """
+        if x is None or y is None or x < 0 or self.visible_total == 0:
+            return None, None
+
+        idx = int(x // self.pitch)
+        if idx >= self.visible_total:
+            return None, None
+        in_square = x - idx * self.pitch <= self.square_width
+
+        if NORM_Y <= y <= NORM_Y + NORM_HEIGHT:
+            return ("norm", idx) if in_square else (None, None)
+
+        if FRAME_Y <= y <= FRAME_Y + FRAME_HEIGHT:
+            return "frame", idx // FRAME_BLOCK_SIZE
+
+        if y < NORM_Y:
+            step = NACK_RECT_HEIGHT + NACK_LINE_SPACING
+            lane = math.floor((nack_lane_y(0) + NACK_RECT_HEIGHT - y) / step)
+            if lane < 0 or lane not in self.nack_lanes or not (
+                    nack_lane_y(lane) <= y <= nack_lane_y(lane) + NACK_RECT_HEIGHT):
+                return None, None
+            starts, ends, indices = self.nack_lanes[lane]
+            i = bisect.bisect_right(starts, idx) - 1
+            # Бокс тянется от начала квадрата start до конца квадрата end (промежутки внутри – его часть)
+            if i >= 0 and (idx < ends[i] or (idx == ends[i] and in_square)):
+                return "nack", indices[i]
+
+        return None, None
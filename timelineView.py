@@ -0,0 +1,368 @@
+import numpy as np
+from matplotlib.collections import PolyCollection
+from matplotlib.colors import to_rgba
+from matplotlib.patches import Rectangle
+
+from seqStore import STATE_LOST, STATE_RESENT
+from timelineLayout import (FRAME_BLOCK_SIZE, FRAME_HEIGHT, FRAME_Y, NACK_RECT_HEIGHT, NORM_HEIGHT, NORM_Y, HitTester,
+                            nack_lane_y)
+
+# Окна больше RASTER_THRESHOLD seq рисуются растром (imshow), а не патчами
+RASTER_THRESHOLD = 1000
+# Ширина растра в столбцах: более длинное окно сворачивается по максимуму приоритета отображения
+RASTER_MAX_COLUMNS = 4096
+# Не больше MAX_TICK_LABELS подписей seq на оси X (в растровом режиме – RASTER_TICK_LABELS)
+MAX_TICK_LABELS = 200
+RASTER_TICK_LABELS = 20
+
+
+def rect_verts(x, y, width, height):
+    """Вершины прямоугольников (N, 4, 2) по массивам x, y, width, height (скаляры или длины N)."""
+    x = np.asarray(x, dtype=float)
+    x, y, width, height = np.broadcast_arrays(x, np.asarray(y, dtype=float), np.asarray(width, dtype=float),
+                                              np.asarray(height, dtype=float))
+    verts = np.empty((len(x), 4, 2))
+    verts[:, 0, 0] = x
+    verts[:, 0, 1] = y
+    verts[:, 1, 0] = x + width
+    verts[:, 1, 1] = y
+    verts[:, 2, 0] = x + width
+    verts[:, 2, 1] = y + height
+    verts[:, 3, 0] = x
+    verts[:, 3, 1] = y + height
+    return verts
+
+
+def _fold_columns(values):
+    """Сворачивает ряд значений не более чем в RASTER_MAX_COLUMNS столбцов по максимуму."""
+    if len(values) <= RASTER_MAX_COLUMNS:
+        return values
+    bounds = np.linspace(0, len(values), RASTER_MAX_COLUMNS, endpoint=False).astype(np.int64)
+    return np.maximum.reduceat(values, bounds)
+
+
+class TimelineView:
+    """
+    /**
+     * Отрисовка окна timeline на оси matplotlib (без зависимости от Tk).
+     * Набор artist-ов создаётся один раз и при каждой отрисовке обновляется на месте:
+     * вершины, цвета и смещения меняются, новые патчи и подписи не создаются.
+     * Подписи Frame-боксов берутся из пула фиксированного размера.
+     * Окна больше RASTER_THRESHOLD seq рисуются растровым режимом: итоговые состояния и Frame-боксы
+     * превращаются в RGBA-картинки (imshow), точки NACK и подписи Frame-боксов не рисуются.
+     * Выделение объекта под курсором – отдельный animated-прямоугольник поверх графика,
+     * который перерисуется через blit по сохранённому фону оси, без полной перерисовки canvas.
+     * @param ax Ось matplotlib.
+     * @param square_width Ширина квадрата seq.
+     * @param gap Промежуток между квадратами.
+     */
+    """
+
+    def __init__(self, ax, square_width, gap):
+        self.ax = ax
+        self.square_width = square_width
+        self.gap = gap
+        self.pitch = square_width + gap
+        self.hit_tester = HitTester(square_width, gap)
+
+        self.colors = {
+            -1: "#FF0000",  # lost – красный
+            1: "#00FF00",  # received – зеленый
+            2: "#FFD700"  # resend – желтый
+        }
+        self.generated_color = 'lime'
+        self.un_generated_color = 'orangered'
+        # Палитра по приоритету состояния: 0 – received, 1 – lost, 2 – resend
+        self._state_palette = np.array([to_rgba(self.colors[1]), to_rgba(self.colors[-1]), to_rgba(self.colors[2])])
+        self._frame_palette = np.array([to_rgba(self.generated_color), to_rgba(self.un_generated_color)])
+        # Растр: приоритет отображения при свёртке столбцов – lost > resend > received, чтобы потери не терялись
+        self._raster_palette = self._state_palette[[0, 2, 1]]
+        self.raster = False  # текущее окно нарисовано растром
+
+        # Tooltip-ы строятся лениво при наведении: при отрисовке запоминаются только ключи объектов
+        self.norm_tooltip_keys = []  # seq нормальных объектов
+        self.nack_tooltip_keys = []  # номера NACK-строк
+        self.frame_tooltip_keys = []  # (состояние, первый seq, последний seq) Frame-боксов
+        self.nack_lane_count = 0  # сколько линий NACK занято в текущем окне
+
+        self.norm_collection = None
+        self.nack_collection = None
+        self.nack_points_collection = None
+        self.frame_collection = None
+        self.frame_labels = []
+        self.highlight = None
+        self.background = None  # фон оси без выделения (canvas.copy_from_bbox), обновляется после каждой отрисовки
+        self._nack_bounds = (np.empty(0), np.empty(0), np.empty(0))  # (min_idx, max_idx, lane) NACK-боксов окна
+        self.create_artists()
+
+    def create_artists(self):
+        """Создаёт постоянный набор artist-ов (после ax.clear() вызывается заново)."""
+        self.norm_collection = PolyCollection([], edgecolors="none")
+        self.nack_collection = PolyCollection([], facecolors="cyan", alpha=0.7, edgecolors="none")
+        self.frame_collection = PolyCollection([], alpha=0.5, edgecolors="none")
+        for collection in (self.norm_collection, self.nack_collection, self.frame_collection):
+            self.ax.add_collection(collection, autolim=False)
+        self.nack_points_collection = self.ax.scatter(np.empty(0), np.empty(0), s=25, marker="o", color="red",
+                                                      zorder=3)
+        self.norm_image = self.ax.imshow(np.zeros((1, 1, 4)), aspect="auto", interpolation="nearest", origin="lower",
+                                         extent=(0, 1, NORM_Y, NORM_Y + NORM_HEIGHT), visible=False)
+        self.frame_image = self.ax.imshow(np.zeros((1, 1, 4)), aspect="auto", interpolation="nearest", origin="lower",
+                                          extent=(0, 1, FRAME_Y, FRAME_Y + FRAME_HEIGHT), alpha=0.5, visible=False)
+        self.frame_labels = []
+        self.highlight = Rectangle((0, 0), 0, 0, fill=False, edgecolor="white", linewidth=3, zorder=4,
+                                   animated=True, visible=False)
+        self.ax.add_patch(self.highlight)
+        self.background = None
+        self.clear()
+
+    def clear(self):
+        """Прячет содержимое окна, не удаляя artist-ы."""
+        self.norm_collection.set_verts([])
+        self.nack_collection.set_verts([])
+        self.frame_collection.set_verts([])
+        self.nack_points_collection.set_offsets(np.empty((0, 2)))
+        for label in self.frame_labels:
+            label.set_visible(False)
+        self.norm_image.set_visible(False)
+        self.frame_image.set_visible(False)
+        self.ax.set_xticks([])
+        self.highlight.set_visible(False)
+        self._nack_bounds = (np.empty(0), np.empty(0), np.empty(0))
+        self.norm_tooltip_keys = []
+        self.nack_tooltip_keys = []
+        self.frame_tooltip_keys = []
+        self.nack_lane_count = 0
+        self.hit_tester.set_window(0)
+        self.hit_tester.set_nack_boxes([], [], [])
+
+    def render(self, seq_store, nack_index, data, start, visible_seq):
+        """
+        /**
+         * Отрисовывает окно seq [start, start + len(visible_seq)).
+         * @param seq_store seqStore.SeqInfoStore.
+         * @param nack_index nackIndex.NackIndex.
+         * @param data csvLoader.CaptureData.
+         * @param start Позиция первого видимого seq в индексе.
+         * @param visible_seq Список видимых seq (срез индекса).
+         */
+        """
+        self.hit_tester.set_window(len(visible_seq))
+        self.highlight.set_visible(False)  # окно сменилось – прежнее выделение неактуально
+        # visible_seq – срез индекса seq, поэтому итоговые состояния берём тем же срезом хранилища
+        final_states = seq_store.final_state[start:start + len(visible_seq)]
+        self.set_raster(len(visible_seq) > RASTER_THRESHOLD)
+
+        if self.raster:
+            self.draw_normal_raster(visible_seq, final_states)
+        else:
+            self.draw_normal_events(visible_seq, final_states)
+        self.draw_nack_events(nack_index, data, seq_store.index, start, len(visible_seq))
+        if self.raster:
+            self.draw_frame_raster(visible_seq, final_states)
+        else:
+            self.draw_frame_boxes(visible_seq, final_states)
+        self.nack_lane_count = nack_index.lane_count(start, start + len(visible_seq) - 1)
+        self.update_axes(visible_seq, self.nack_lane_count)
+
+    def set_raster(self, raster):
+        """Переключает видимость artist-ов патчевого и растрового режимов."""
+        self.raster = raster
+        self.norm_collection.set_visible(not raster)
+        self.frame_collection.set_visible(not raster)
+        self.nack_points_collection.set_visible(not raster)
+        self.norm_image.set_visible(raster)
+        self.frame_image.set_visible(raster)
+        if raster:
+            for label in self.frame_labels:
+                label.set_visible(False)
+
+    def draw_normal_raster(self, visible_seq, final_states):
+        """Отрисовывает нормальные события одной RGBA-картинкой."""
+        display_rank = np.where(final_states == STATE_LOST, 2, np.where(final_states == STATE_RESENT, 1, 0))
+        self.norm_image.set_data(self._raster_palette[_fold_columns(display_rank)][np.newaxis])
+        self.norm_image.set_extent((0, len(visible_seq) * self.pitch, NORM_Y, NORM_Y + NORM_HEIGHT))
+        self.norm_tooltip_keys = visible_seq
+
+    def draw_frame_raster(self, visible_seq, final_states):
+        """Отрисовывает Frame-боксы одной RGBA-картинкой (без подписей)."""
+        total = len(visible_seq)
+        block_starts = np.arange(0, total, FRAME_BLOCK_SIZE)
+        block_lost = np.logical_or.reduceat(final_states == STATE_LOST, block_starts).astype(np.int8)
+        self.frame_image.set_data(self._frame_palette[_fold_columns(block_lost)][np.newaxis])
+        self.frame_image.set_extent((0, len(block_starts) * FRAME_BLOCK_SIZE * self.pitch,
+                                     FRAME_Y, FRAME_Y + FRAME_HEIGHT))
+        self.frame_tooltip_keys = [(("UnGenerated" if lost else "Generated"), visible_seq[i],
+                                    visible_seq[min(i + FRAME_BLOCK_SIZE, total) - 1])
+                                   for lost, i in zip(block_lost.tolist(), block_starts.tolist())]
+
+    def draw_normal_events(self, visible_seq, final_states):
+        """Отрисовывает нормальные события."""
+        x_coords = np.arange(len(visible_seq)) * self.pitch
+        rank = np.where(final_states == STATE_RESENT, 2, np.where(final_states == STATE_LOST, 1, 0))
+        self.norm_collection.set_verts(rect_verts(x_coords, NORM_Y, self.square_width, NORM_HEIGHT))
+        self.norm_collection.set_facecolor(self._state_palette[rank])
+        self.norm_tooltip_keys = visible_seq
+
+    def draw_nack_events(self, nack_index, data, seq_index, first_pos, visible_total):
+        """Отрисовывает NACK-события с корректным растяжением за границы."""
+        if visible_total == 0:
+            self.nack_collection.set_verts([])
+            self.nack_points_collection.set_offsets(np.empty((0, 2)))
+            self.hit_tester.set_nack_boxes([], [], [])
+            self._nack_bounds = (np.empty(0), np.empty(0), np.empty(0))
+            self.nack_tooltip_keys = []
+            return
+        last_pos = first_pos + visible_total - 1
+
+        # Только NACK, пересекающие окно; линии назначены заранее для всего захвата
+        hits = nack_index.query(first_pos, last_pos)
+        rows = nack_index.rows[hits]
+        lanes = nack_index.lanes[hits]
+
+        # Границы NACK в окне: если NACK выходит влево – тянем с начала области,
+        # если уходит вправо – продолжаем до конца текущей области
+        min_idx = np.maximum(nack_index.starts[hits], first_pos) - first_pos
+        max_idx = np.minimum(nack_index.ends[hits], last_pos) - first_pos
+        x_start = min_idx * self.pitch
+        x_end = max_idx * self.pitch + self.square_width
+        rect_y = nack_lane_y(lanes)
+        self.nack_collection.set_verts(rect_verts(x_start, rect_y, x_end - x_start, NACK_RECT_HEIGHT))
+
+        self.nack_tooltip_keys = rows.tolist()
+        self._nack_bounds = (min_idx, max_idx, lanes)
+        self.hit_tester.set_nack_boxes(min_idx.tolist(), max_idx.tolist(), lanes.tolist())
+        if self.raster:
+            return  # В растровом режиме точки под каждым seq не различимы
+
+        # Точки (расположены строго под seq): все seq пересекающих NACK-строк разом
+        lengths = data.seq_offsets[rows + 1] - data.seq_offsets[rows]
+        value_index = np.repeat(data.seq_offsets[rows] - np.cumsum(lengths) + lengths, lengths) + np.arange(
+            lengths.sum())
+        point_idx = seq_index.positions(data.seq_values[value_index]) - first_pos
+        point_y = np.repeat(rect_y, lengths) + NACK_RECT_HEIGHT / 2
+        inside = (point_idx >= 0) & (point_idx < visible_total)
+        points = np.column_stack((point_idx[inside] * self.pitch + self.square_width / 2, point_y[inside]))
+        self.nack_points_collection.set_offsets(points)
+
+    def draw_frame_boxes(self, visible_seq, final_states):
+        """Отрисовывает Frame-боксы и подписи из пула."""
+        total = len(visible_seq)
+        block_starts = np.arange(0, total, FRAME_BLOCK_SIZE)
+        block_lengths = np.minimum(FRAME_BLOCK_SIZE, total - block_starts)
+        if total:
+            block_lost = np.logical_or.reduceat(final_states == STATE_LOST, block_starts)
+        else:
+            block_lost = np.zeros(0, dtype=bool)
+
+        x_start = block_starts * self.pitch
+        block_width = block_lengths * self.pitch
+        self.frame_collection.set_verts(rect_verts(x_start, FRAME_Y, block_width, FRAME_HEIGHT))
+        self.frame_collection.set_facecolor(self._frame_palette[block_lost.astype(int)])
+
+        block_states = ["UnGenerated" if lost else "Generated" for lost in block_lost.tolist()]
+        self.frame_tooltip_keys = [(state, visible_seq[i], visible_seq[i + length - 1])
+                                   for state, i, length in zip(block_states, block_starts.tolist(),
+                                                               block_lengths.tolist())]
+
+        self._ensure_label_pool(len(block_states))
+        centers = (x_start + block_width / 2).tolist()
+        for label, state, x_center in zip(self.frame_labels, block_states, centers):
+            label.set_position((x_center, FRAME_Y + FRAME_HEIGHT / 2))
+            label.set_text(f"Frame: {state}")
+            label.set_visible(True)
+        for label in self.frame_labels[len(block_states):]:
+            label.set_visible(False)
+
+    def _ensure_label_pool(self, size):
+        """Дополняет пул подписей Frame-боксов до size (пул только растёт при увеличении окна)."""
+        while len(self.frame_labels) < size:
+            self.frame_labels.append(self.ax.text(0, 0, "", color="white", fontsize=10, ha="center", va="center",
+                                                  zorder=2, visible=False))
+
+    def update_axes(self, visible_seq, lane_count):
+        """Обновляет оси графика с динамическим нижним пределом для nack-событий."""
+        total_visible = len(visible_seq)
+        total_width = total_visible * self.pitch
+
+        # Если nack-события есть, вычисляем нижнюю границу оси Y
+        if lane_count > 0:
+            lowest_line_index = lane_count - 1
+            # Координата y нижней nack-линии (rect_y)
+            lowest_y = nack_lane_y(lowest_line_index)
+            margin = 0.05  # Дополнительный запас
+            min_y = lowest_y - margin
+        else:
+            # Если нет nack, нижняя граница чуть ниже нормальных объектов
+            min_y = NORM_Y - 0.05
+
+        self.ax.set_xlim(0, total_width)
+        self.ax.set_ylim(min_y, 1.5)
+        self.ax.get_yaxis().set_visible(False)
+
+        # Большие окна подписываются каждым step-ым seq
+        max_labels = RASTER_TICK_LABELS if self.raster else MAX_TICK_LABELS
+        step = max(1, -(-total_visible // max_labels))
+        x_ticks = np.arange(0, total_visible, step) * self.pitch + self.square_width / 2
+        x_labels = [str(seq) for seq in visible_seq[::step]]
+
+        self.ax.set_xticks(x_ticks)
+        self.ax.set_xticklabels(x_labels, color="white", fontsize=10, rotation=90)
+
+    # ============================================================================
+    # Выделение объекта под курсором (blit)
+    # ============================================================================
+
+    def capture_background(self):
+        """Сохраняет фон оси после полной отрисовки (обработчик draw_event) и возвращает выделение поверх."""
+        canvas = self.ax.figure.canvas
+        if not canvas.supports_blit:
+            self.background = None
+            return
+        self.background = canvas.copy_from_bbox(self.ax.bbox)
+        if self.highlight.get_visible():
+            self._blit_highlight()
+
+    def show_highlight(self, kind, idx):
+        """
+        /**
+         * Выделяет объект окна белым контуром.
+         * @param kind "norm", "nack" или "frame" (как в HitTester.hit).
+         * @param idx Индекс объекта в соответствующей коллекции.
+         */
+        """
+        x, y, width, height = self.highlight_bounds(kind, idx)
+        self.highlight.set_bounds(x, y, width, height)
+        self.highlight.set_visible(True)
+        self._blit_highlight()
+
+    def hide_highlight(self):
+        """Снимает выделение (если оно было)."""
+        if not self.highlight.get_visible():
+            return
+        self.highlight.set_visible(False)
+        self._blit_highlight()
+
+    def highlight_bounds(self, kind, idx):
+        """Прямоугольник (x, y, ширина, высота) объекта kind с индексом idx в координатах данных."""
+        if kind == "norm":
+            return idx * self.pitch, NORM_Y, self.square_width, NORM_HEIGHT
+        if kind == "frame":
+            block_start = idx * FRAME_BLOCK_SIZE
+            block_length = min(FRAME_BLOCK_SIZE, self.hit_tester.visible_total - block_start)
+            return block_start * self.pitch, FRAME_Y, block_length * self.pitch, FRAME_HEIGHT
+        min_idx, max_idx, lanes = self._nack_bounds
+        x_start = min_idx[idx] * self.pitch
+        x_end = max_idx[idx] * self.pitch + self.square_width
+        return x_start, nack_lane_y(lanes[idx]), x_end - x_start, NACK_RECT_HEIGHT
+
+    def _blit_highlight(self):
+        """Восстанавливает сохранённый фон и рисует поверх только выделение."""
+        canvas = self.ax.figure.canvas
+        if self.background is None:
+            # Фон ещё не сохранён (или backend без blit) – обычная отложенная перерисовка
+            canvas.draw_idle()
+            return
+        canvas.restore_region(self.background)
+        if self.highlight.get_visible():
+            self.ax.draw_artist(self.highlight)
+        canvas.blit(self.ax.bbox)